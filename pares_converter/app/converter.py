@@ -18,14 +18,25 @@ Design goals
 from __future__ import annotations
 import argparse
 import hashlib
+import os
+import pickle
 import re
+import sys
 import unicodedata
 from dataclasses import dataclass
+from graphlib import TopologicalSorter
+from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
 
+try:
+    import python_calamine  # noqa: F401  (Rust XLSX reader, pandas >= 2.2)
+    EXCEL_READ_ENGINE = "calamine"
+except ImportError:
+    EXCEL_READ_ENGINE = "openpyxl"
+
 
 # ---------------------------
 # CONFIG (exact sheet names)
@@ -257,7 +268,7 @@ def diagnose_file(path) -> List[DiagnosticIssue]:
     issues: List[DiagnosticIssue] = []
     
     try:
-        xls = pd.ExcelFile(path, engine="openpyxl")
+        xls = pd.ExcelFile(path, engine=EXCEL_READ_ENGINE)
     except Exception as e:
         issues.append(DiagnosticIssue(
             sheet="",
@@ -516,18 +527,23 @@ def normalize_columns(df: pd.DataFrame, sheet_name: str = "") -> pd.DataFrame:
         return df.rename(columns=rename_map)
     return df
 
+def _drop_duplicate_columns(df: pd.DataFrame) -> pd.DataFrame:
+    dup = df.columns.duplicated()
+    return df.loc[:, ~dup] if dup.any() else df
+
 def read_workbook(path: str) -> Dict[str, pd.DataFrame]:
-    xls = pd.ExcelFile(path, engine="openpyxl")
+    xls = pd.ExcelFile(path, engine=EXCEL_READ_ENGINE)
     raw: Dict[str, pd.DataFrame] = {}
     for sh in SHEETS:
         if sh in xls.sheet_names:
             df = pd.read_excel(xls, sh, dtype=object)
-            # Deduplicate columns (keep first)
-            df = df.loc[:, ~df.columns.duplicated()]
+            # Deduplicate columns (keep first); only slice when needed so the
+            # parsed frame is passed through (and later into RAW output) uncopied
+            df = _drop_duplicate_columns(df)
             # Normalize column names (sheet-aware)
             df = normalize_columns(df, sheet_name=sh)
             # Deduplicate again in case normalization caused collisions
-            df = df.loc[:, ~df.columns.duplicated()]
+            df = _drop_duplicate_columns(df)
             raw[sh] = df
     return raw
     return raw
@@ -922,18 +938,15 @@ def attach_context_id(df: pd.DataFrame, cmap: Dict[Tuple[str,str,str,str], str])
     tmp = df.copy()
     # Safely get fecha_iso
     if "fecha" in tmp.columns:
-        tmp["fecha_iso"] = tmp["fecha"].apply(coerce_date_iso)
+        tmp["fecha_iso"] = tmp["fecha"].map(coerce_date_iso)
     else:
         tmp["fecha_iso"] = "2024-01-01" # Safe fallback
-        
-    def key(r):
-        return (
-            canonical_text(r.get("admin0", "N/A")), 
-            canonical_text(r.get("paisaje", "N/A")), 
-            canonical_text(r.get("grupo", "N/A")), 
-            str(r.get("fecha_iso", "2024-01-01"))
-        )
-    tmp["context_id"] = tmp.apply(lambda r: cmap.get(key(r), "ctx_unknown"), axis=1)
+
+    # Build keys column-wise; absent geo columns key as "N/A"
+    parts = [tmp[c].map(canonical_text) if c in tmp.columns else [canonical_text("N/A")] * len(tmp)
+             for c in ("admin0","paisaje","grupo")]
+    keys = zip(*parts, tmp["fecha_iso"].astype(str))
+    tmp["context_id"] = [cmap.get(k, "ctx_unknown") for k in keys]
     return tmp
 
 def mdv_id_map(lookup_mdv: pd.DataFrame) -> Dict[str,str]:
@@ -960,11 +973,10 @@ def ecosistema_id_map(lookup_eco: pd.DataFrame) -> Dict[str,str]:
 # TIDY TRANSFORMS
 # ---------------------------
 
-def tidy_3_1_brainstorm(raw, geo, ctx, mdv_lk, eco_lk) -> pd.DataFrame:
+def tidy_3_1_brainstorm(raw, cmap, mdv_lk, eco_lk) -> pd.DataFrame:
     sh = "3.1. Lluvia MdV&SE"
     if sh not in raw:
         return pd.DataFrame(columns=["brainstorm_id","context_id","elemento_SES","nombre","uso_fin_mdv","mdv_id","ecosistema_id"])
-    cmap = build_context_map(geo, ctx)
     df = attach_context_id(raw[sh], cmap)
 
     # Normalize column name variants
@@ -987,11 +999,10 @@ def tidy_3_1_brainstorm(raw, geo, ctx, mdv_lk, eco_lk) -> pd.DataFrame:
     out = df[["brainstorm_id","context_id","elemento_SES","nombre","uso_fin_mdv","mdv_id","ecosistema_id"]].copy()
     return out
 
-def tidy_3_2_priorizacion(raw, geo, ctx, mdv_lk) -> pd.DataFrame:
+def tidy_3_2_priorizacion(raw, cmap, mdv_lk) -> pd.DataFrame:
     sh = "3.2. Priorización"
     if sh not in raw:
         return pd.DataFrame(columns=["priorizacion_id","context_id","mdv_id","mdv_name","producto_principal","i_seg_alim","i_area","i_des_loc","i_ambiente","i_inclusion","i_total"])
-    cmap = build_context_map(geo, ctx)
     
     df = raw[sh].copy()
     
@@ -1020,8 +1031,7 @@ def tidy_3_2_priorizacion(raw, geo, ctx, mdv_lk) -> pd.DataFrame:
     keep = ["priorizacion_id","context_id","mdv_id","mdv_name","producto_principal"] + num_cols
     return df[keep].copy()
 
-def tidy_3_3_car(raw, geo, ctx, mdv_lk) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame,pd.DataFrame,pd.DataFrame]:
-    cmap = build_context_map(geo, ctx)
+def tidy_3_3_car(raw, cmap, mdv_lk) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame,pd.DataFrame,pd.DataFrame]:
     mdvmap = mdv_id_map(mdv_lk)
 
     def base(sheet):
@@ -1101,9 +1111,8 @@ def tidy_3_3_car(raw, geo, ctx, mdv_lk) -> Tuple[pd.DataFrame,pd.DataFrame,pd.Da
     tidyLong = pd.DataFrame(long_rows) if long_rows else pd.DataFrame(columns=["car_long_id","module","record_id","context_id","mdv_id","mdv","codigo_mapa","codigo_mdv","field","value"])
     return tidyA, tidyB, tidyC, tidyD, tidyLong
 
-def tidy_3_4_ecosistemas(raw, geo, ctx, eco_lk, se_lk, mdv_lk) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]:
+def tidy_3_4_ecosistemas(raw, cmap, eco_lk, se_lk, mdv_lk) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]:
     sh = "3.4. Ecosistemas"
-    cmap = build_context_map(geo, ctx)
     ecomap = ecosistema_id_map(eco_lk)
     semap = se_id_map(se_lk)
     mdvmap = mdv_id_map(mdv_lk)
@@ -1132,9 +1141,8 @@ def tidy_3_4_ecosistemas(raw, geo, ctx, eco_lk, se_lk, mdv_lk) -> Tuple[pd.DataF
 
     return main, se_df, mdv_df
 
-def tidy_3_5_se_mdv(raw, geo, ctx, eco_lk, se_lk, elemento_se_lk, mdv_lk) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]:
+def tidy_3_5_se_mdv(raw, cmap, eco_lk, se_lk, elemento_se_lk, mdv_lk) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]:
     sh = "3.5. SE y MdV"
-    cmap = build_context_map(geo, ctx)
     ecomap = ecosistema_id_map(eco_lk)
     semap = se_id_map(se_lk)
     elem_map = dict(zip(elemento_se_lk["elemento_se"].map(canonical_text), elemento_se_lk["elemento_se_id"]))
@@ -1209,9 +1217,8 @@ def tidy_3_5_se_mdv(raw, geo, ctx, eco_lk, se_lk, elemento_se_lk, mdv_lk) -> Tup
 
     return main, months, inclusion
 
-def tidy_4_1_amenazas(raw, geo, ctx, amen_lk) -> pd.DataFrame:
+def tidy_4_1_amenazas(raw, cmap, amen_lk) -> pd.DataFrame:
     sh = "4.1. Amenazas"
-    cmap = build_context_map(geo, ctx)
     if sh not in raw:
         return pd.DataFrame(columns=["amenaza_obs_id","context_id","amenaza_id","tipo_amenaza","amenaza","magnitud","frequencia","tendencia","suma","sitios_afect","cod_mapa"])
     df = attach_context_id(raw[sh], cmap).copy()
@@ -1222,9 +1229,8 @@ def tidy_4_1_amenazas(raw, geo, ctx, amen_lk) -> pd.DataFrame:
     df["amenaza_obs_id"] = df.apply(lambda r: sha1_short("amen_obs", r["context_id"], r["amenaza_id"], r.get("cod_mapa",""), r.get("sitios_afect","")), axis=1)
     return df[["amenaza_obs_id","context_id","amenaza_id","tipo_amenaza","amenaza","magnitud","frequencia","tendencia","suma","sitios_afect","cod_mapa"]].copy()
 
-def tidy_4_2_amenaza_mdv(raw, geo, ctx, amen_lk, mdv_lk, conf_lk) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]:
+def tidy_4_2_amenaza_mdv(raw, cmap, amen_lk, mdv_lk, conf_lk) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]:
     sh = "4.2.1. Amenazas_MdV"
-    cmap = build_context_map(geo, ctx)
     mdvmap = mdv_id_map(mdv_lk)
     amen_map = dict(zip(amen_lk.apply(lambda r: canonical_text(r["tipo_amenaza"])+"|"+canonical_text(r["amenaza"]), axis=1), amen_lk["amenaza_id"]))
     conf_map = dict(zip(conf_lk["cod_conflict"].map(canonical_text), conf_lk["conflicto_id"]))
@@ -1287,9 +1293,8 @@ def tidy_4_2_amenaza_mdv(raw, geo, ctx, amen_lk, mdv_lk, conf_lk) -> Tuple[pd.Da
 
     return main, dif, mapdf
 
-def tidy_4_2_amenaza_se(raw, geo, ctx, amen_lk, se_lk, conf_lk) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]:
+def tidy_4_2_amenaza_se(raw, cmap, amen_lk, se_lk, conf_lk) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]:
     sh = "4.2.2. Amenazas_SE"
-    cmap = build_context_map(geo, ctx)
     semap = se_id_map(se_lk)
     amen_map = dict(zip(amen_lk.apply(lambda r: canonical_text(r["tipo_amenaza"])+"|"+canonical_text(r["amenaza"]), axis=1), amen_lk["amenaza_id"]))
     conf_map = dict(zip(conf_lk["cod_conflict"].map(canonical_text), conf_lk["conflicto_id"]))
@@ -1350,9 +1355,8 @@ def tidy_4_2_amenaza_se(raw, geo, ctx, amen_lk, se_lk, conf_lk) -> Tuple[pd.Data
 
     return main, dif, mapdf
 
-def tidy_5_1_actores(raw, geo, ctx, actor_lk) -> Tuple[pd.DataFrame,pd.DataFrame]:
+def tidy_5_1_actores(raw, cmap, actor_lk) -> Tuple[pd.DataFrame,pd.DataFrame]:
     sh = "5.1. Actores"
-    cmap = build_context_map(geo, ctx)
     amap = actor_id_map(actor_lk)
 
     if sh not in raw:
@@ -1386,9 +1390,8 @@ def tidy_5_1_actores(raw, geo, ctx, actor_lk) -> Tuple[pd.DataFrame,pd.DataFrame
     rel = pd.DataFrame(rel_rows) if rel_rows else pd.DataFrame(columns=["rel_id","context_id","actor_id","other_actor_id","other_actor_name","rel_type"])
     return main, rel
 
-def tidy_5_2_dialogo(raw, geo, ctx, espacio_lk, actor_lk) -> Tuple[pd.DataFrame,pd.DataFrame]:
+def tidy_5_2_dialogo(raw, cmap, espacio_lk, actor_lk) -> Tuple[pd.DataFrame,pd.DataFrame]:
     sh = "5.2. Diálogo"
-    cmap = build_context_map(geo, ctx)
     esp_map = dict(zip(espacio_lk["nombre_espacio"].map(canonical_text), espacio_lk["espacio_id"]))
     act_map = actor_id_map(actor_lk)
 
@@ -1410,9 +1413,8 @@ def tidy_5_2_dialogo(raw, geo, ctx, espacio_lk, actor_lk) -> Tuple[pd.DataFrame,
     bridges = bridges[["bridge_id","dialogo_id","actor_id","actor_name"]].copy()
     return main, bridges
 
-def tidy_6_1_conflict_events(raw, geo, ctx, conf_lk) -> pd.DataFrame:
+def tidy_6_1_conflict_events(raw, cmap, conf_lk) -> pd.DataFrame:
     sh = "6.1. Evolución_conflict"
-    cmap = build_context_map(geo, ctx)
     conf_map = dict(zip(conf_lk["cod_conflict"].map(canonical_text), conf_lk["conflicto_id"]))
 
     if sh not in raw:
@@ -1431,9 +1433,8 @@ def tidy_6_1_conflict_events(raw, geo, ctx, conf_lk) -> pd.DataFrame:
     out = base.rename(columns={"cod_conflict_item":"cod_conflict"})
     return out[["event_id","context_id","conflicto_id","cod_conflict","evento","ano_evento","diferencias","dif_factor","cooperacion","coop_factor","suma"]].copy()
 
-def tidy_6_2_conflict_actor(raw, geo, ctx, conf_lk, actor_lk) -> pd.DataFrame:
+def tidy_6_2_conflict_actor(raw, cmap, conf_lk, actor_lk) -> pd.DataFrame:
     sh = "6.2. Actores_conflict"
-    cmap = build_context_map(geo, ctx)
     conf_map = dict(zip(conf_lk["cod_conflict"].map(canonical_text), conf_lk["conflicto_id"]))
     act_map = actor_id_map(actor_lk)
 
@@ -1554,48 +1555,263 @@ def tidy_7_1_ca(raw, survey_ctx_lk, mdv_lk, ca_q_lk) -> Tuple[pd.DataFrame,pd.Da
 # QA
 # ---------------------------
 
-def qa_table_summary(tables: Dict[str,pd.DataFrame]) -> pd.DataFrame:
-    return pd.DataFrame([{"table":k,"rows":int(v.shape[0]),"cols":int(v.shape[1])} for k,v in tables.items()]).sort_values("table")
+# Primary key of every LOOKUP_/TIDY_ table and the (table, fk, lookup, lookup_pk)
+# links QA checks; compile_workbook hands the QA helpers per-run copies
+QA_PK: Dict[str,Tuple[str,...]] = {
+    "LOOKUP_GEO": ("geo_id",),
+    "LOOKUP_CONTEXT": ("context_id",),
+    "LOOKUP_SURVEY_CONTEXT": ("survey_context_id",),
+    "LOOKUP_MDV": ("mdv_id",),
+    "LOOKUP_ECOSISTEMA": ("ecosistema_id",),
+    "LOOKUP_SE": ("se_id",),
+    "LOOKUP_ELEMENTO_SE": ("elemento_se_id",),
+    "LOOKUP_AMENAZA": ("amenaza_id",),
+    "LOOKUP_ACTOR": ("actor_id",),
+    "LOOKUP_ESPACIO": ("espacio_id",),
+    "LOOKUP_CONFLICTO": ("conflicto_id",),
+    "LOOKUP_CA_QUESTIONS": ("question_id",),
+
+    "TIDY_3_1_BRAINSTORM": ("brainstorm_id",),
+    "TIDY_3_2_PRIORIZACION": ("priorizacion_id",),
+    "TIDY_3_3_CAR_A": ("car_a_id",),
+    "TIDY_3_3_CAR_B": ("car_b_id",),
+    "TIDY_3_3_CAR_C": ("car_c_id",),
+    "TIDY_3_3_CAR_D": ("car_d_id",),
+    "TIDY_3_3_CAR_LONG": ("car_long_id",),
+    "TIDY_3_4_ECOSISTEMAS": ("ecosistema_obs_id",),
+    "TIDY_3_4_ECO_SE": ("eco_se_id",),
+    "TIDY_3_4_ECO_MDV": ("eco_mdv_id",),
+    "TIDY_3_5_SE_MDV": ("se_mdv_id",),
+    "TIDY_3_5_SE_MONTHS": ("se_month_id",),
+    "TIDY_3_5_SE_INCLUSION": ("se_inclusion_id",),
+    "TIDY_4_1_AMENAZAS": ("amenaza_obs_id",),
+    "TIDY_4_2_1_AMENAZA_MDV": ("amenaza_mdv_id",),
+    "TIDY_4_2_1_DIFERENCIADO": ("dif_id",),
+    "TIDY_4_2_1_MAPEO_CONFLICTO": ("map_id",),
+    "TIDY_4_2_2_AMENAZA_SE": ("amenaza_se_id",),
+    "TIDY_4_2_2_DIFERENCIADO": ("dif_id",),
+    "TIDY_4_2_2_MAPEO_CONFLICTO": ("map_id",),
+    "TIDY_5_1_ACTORES": ("actor_obs_id",),
+    "TIDY_5_1_RELACIONES": ("rel_id",),
+    "TIDY_5_2_DIALOGO": ("dialogo_id",),
+    "TIDY_5_2_DIALOGO_ACTOR": ("bridge_id",),
+    "TIDY_6_1_CONFLICT_EVENTS": ("event_id",),
+    "TIDY_6_2_CONFLICTO_ACTOR": ("conflict_actor_id",),
+    "TIDY_7_1_RESPONDENTS": ("respondent_id",),
+    "TIDY_7_1_RESPONSES": ("response_id",),
+}
 
-def qa_pk_duplicates(tables: Dict[str,pd.DataFrame], pk_map: Dict[str,List[str]]) -> pd.DataFrame:
-    rows = []
-    for t, pk in pk_map.items():
-        if t not in tables:
+QA_FK_SPECS: Tuple[Tuple[str,str,str,str],...] = (
+    ("LOOKUP_CONTEXT","geo_id","LOOKUP_GEO","geo_id"),
+
+    ("TIDY_3_1_BRAINSTORM","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_3_1_BRAINSTORM","mdv_id","LOOKUP_MDV","mdv_id"),
+    ("TIDY_3_1_BRAINSTORM","ecosistema_id","LOOKUP_ECOSISTEMA","ecosistema_id"),
+
+    ("TIDY_3_2_PRIORIZACION","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_3_2_PRIORIZACION","mdv_id","LOOKUP_MDV","mdv_id"),
+
+    ("TIDY_3_3_CAR_A","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_3_3_CAR_A","mdv_id","LOOKUP_MDV","mdv_id"),
+    ("TIDY_3_3_CAR_B","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_3_3_CAR_B","mdv_id","LOOKUP_MDV","mdv_id"),
+    ("TIDY_3_3_CAR_C","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_3_3_CAR_C","mdv_id","LOOKUP_MDV","mdv_id"),
+    ("TIDY_3_3_CAR_D","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_3_3_CAR_D","mdv_id","LOOKUP_MDV","mdv_id"),
+
+    ("TIDY_3_4_ECOSISTEMAS","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_3_4_ECOSISTEMAS","ecosistema_id","LOOKUP_ECOSISTEMA","ecosistema_id"),
+    ("TIDY_3_4_ECO_SE","se_id","LOOKUP_SE","se_id"),
+    ("TIDY_3_4_ECO_MDV","mdv_id","LOOKUP_MDV","mdv_id"),
+
+    ("TIDY_3_5_SE_MDV","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_3_5_SE_MDV","ecosistema_id","LOOKUP_ECOSISTEMA","ecosistema_id"),
+    ("TIDY_3_5_SE_MDV","se_id","LOOKUP_SE","se_id"),
+    ("TIDY_3_5_SE_MDV","elemento_se_id","LOOKUP_ELEMENTO_SE","elemento_se_id"),
+    ("TIDY_3_5_SE_MDV","mdv_id","LOOKUP_MDV","mdv_id"),
+
+    ("TIDY_4_1_AMENAZAS","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_4_1_AMENAZAS","amenaza_id","LOOKUP_AMENAZA","amenaza_id"),
+
+    ("TIDY_4_2_1_AMENAZA_MDV","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_4_2_1_AMENAZA_MDV","amenaza_id","LOOKUP_AMENAZA","amenaza_id"),
+    ("TIDY_4_2_1_AMENAZA_MDV","mdv_id","LOOKUP_MDV","mdv_id"),
+
+    ("TIDY_4_2_2_AMENAZA_SE","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_4_2_2_AMENAZA_SE","amenaza_id","LOOKUP_AMENAZA","amenaza_id"),
+    ("TIDY_4_2_2_AMENAZA_SE","se_id","LOOKUP_SE","se_id"),
+
+    ("TIDY_5_1_ACTORES","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_5_1_ACTORES","actor_id","LOOKUP_ACTOR","actor_id"),
+    ("TIDY_5_1_RELACIONES","actor_id","LOOKUP_ACTOR","actor_id"),
+
+    ("TIDY_5_2_DIALOGO","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_5_2_DIALOGO","espacio_id","LOOKUP_ESPACIO","espacio_id"),
+    ("TIDY_5_2_DIALOGO_ACTOR","actor_id","LOOKUP_ACTOR","actor_id"),
+
+    ("TIDY_6_1_CONFLICT_EVENTS","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_6_1_CONFLICT_EVENTS","conflicto_id","LOOKUP_CONFLICTO","conflicto_id"),
+
+    ("TIDY_6_2_CONFLICTO_ACTOR","context_id","LOOKUP_CONTEXT","context_id"),
+    ("TIDY_6_2_CONFLICTO_ACTOR","conflicto_id","LOOKUP_CONFLICTO","conflicto_id"),
+    ("TIDY_6_2_CONFLICTO_ACTOR","actor_id","LOOKUP_ACTOR","actor_id"),
+
+    ("TIDY_7_1_RESPONDENTS","survey_context_id","LOOKUP_SURVEY_CONTEXT","survey_context_id"),
+    ("TIDY_7_1_RESPONDENTS","mdv_id","LOOKUP_MDV","mdv_id"),
+    ("TIDY_7_1_RESPONSES","respondent_id","TIDY_7_1_RESPONDENTS","respondent_id"),
+    ("TIDY_7_1_RESPONSES","question_id","LOOKUP_CA_QUESTIONS","question_id"),
+)
+
+def categorize_id_columns(tables: Dict[str,pd.DataFrame], pk_map: Dict[str,List[str]],
+                          id_cols: Dict[str,List[str]], specs: List[Tuple[str,str,str,str]]
+                          ) -> Dict[str,pd.DataFrame]:
+    """Tables with their ID columns as categoricals, for the QA pass only.
+
+    Frames that get a categorical column are shallow copies, so the caller's tables
+    (and the output workbook) keep their original dtypes. FK columns reuse the parent's
+    categories (extended with any orphan values, so violations stay visible to QA)
+    which makes child/parent codes directly comparable.
+    """
+    out = dict(tables)
+    copied = set()
+
+    def frame(name: str) -> pd.DataFrame:
+        if name not in copied:
+            out[name] = out[name].copy(deep=False)
+            copied.add(name)
+        return out[name]
+
+    def as_category(s: pd.Series, base: pd.Index = None) -> pd.Series:
+        if base is None:
+            return s.astype("category")
+        extra = pd.Index(s.dropna().unique()).difference(base)
+        return s.astype(pd.CategoricalDtype(base.append(extra) if len(extra) else base))
+
+    for tbl,fk,lk,lkpk in specs:
+        if tbl not in tables or lk not in tables:
             continue
-        df = tables[t]
-        if any(c not in df.columns for c in pk):
-            rows.append({"table":t,"pk":",".join(pk),"duplicate_rows":np.nan,"note":"missing_pk_columns"})
+        if fk not in tables[tbl].columns or lkpk not in tables[lk].columns:
             continue
-        rows.append({"table":t,"pk":",".join(pk),"duplicate_rows":int(df.duplicated(pk, keep=False).sum()),"note":""})
-    return pd.DataFrame(rows).sort_values("table")
+        lkdf = out[lk]
+        if not isinstance(lkdf[lkpk].dtype, pd.CategoricalDtype):
+            lkdf = frame(lk)
+            lkdf[lkpk] = as_category(lkdf[lkpk])
+        df = frame(tbl)
+        df[fk] = as_category(df[fk], lkdf[lkpk].cat.categories)
+
+    for cols_map in (pk_map, id_cols):
+        for tbl, cols in cols_map.items():
+            if tbl not in out:
+                continue
+            for c in cols:
+                if c in out[tbl].columns and not isinstance(out[tbl][c].dtype, pd.CategoricalDtype):
+                    df = frame(tbl)
+                    df[c] = as_category(df[c])
+    return out
 
-def qa_missing_ids(tables: Dict[str,pd.DataFrame], id_cols: Dict[str,List[str]]) -> pd.DataFrame:
-    rows = []
-    for t, cols in id_cols.items():
+def qa_table_summary(tables: Dict[str,pd.DataFrame]) -> pd.DataFrame:
+    return pd.DataFrame([{"table":k,"rows":int(v.shape[0]),"cols":int(v.shape[1])} for k,v in tables.items()]).sort_values("table")
+
+def _shares_categories(child: pd.Series, parent: pd.Series) -> bool:
+    """True when child codes index the parent's categories (see categorize_id_columns)."""
+    if not (isinstance(child.dtype, pd.CategoricalDtype) and isinstance(parent.dtype, pd.CategoricalDtype)):
+        return False
+    n = len(parent.cat.categories)
+    return child.cat.categories[:n].equals(parent.cat.categories)
+
+def _blank_count(s: pd.Series) -> int:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # Strip the (few) categories instead of every row
+        cats = s.cat.categories
+        return int(s.isin(cats[cats.astype(str).str.strip() == ""]).sum())
+    return int((s.astype(str).str.strip() == "").sum())
+
+def qa_validate(tables: Dict[str,pd.DataFrame], pk_map: Dict[str,List[str]],
+                id_cols: Dict[str,List[str]], specs: List[Tuple[str,str,str,str]]
+                ) -> Tuple[pd.DataFrame,pd.DataFrame,pd.DataFrame]:
+    """Single validation pass: (pk duplicates, missing ids, foreign keys) QA frames.
+
+    Tables are visited parents-first; each ID column's null mask is computed once and
+    shared by the missing-id and FK checks, and each parent key set is built once.
+    """
+    by_child: Dict[str,List[Tuple[str,str,str,str]]] = {}
+    graph: Dict[str,set] = {t: set() for t in (*pk_map, *id_cols)}
+    for spec in specs:
+        by_child.setdefault(spec[0], []).append(spec)
+        graph.setdefault(spec[0], set()).add(spec[2])
+    parent_keys: Dict[Tuple[str,str,bool],object] = {}
+    pk_rows, miss_rows, fk_rows = [], [], []
+    for t in TopologicalSorter(graph).static_order():
         if t not in tables:
             continue
         df = tables[t]
-        for c in cols:
+        notna: Dict[str,pd.Series] = {}
+
+        pk = pk_map.get(t)
+        if pk is not None:
+            if any(c not in df.columns for c in pk):
+                pk_rows.append({"table":t,"pk":",".join(pk),"duplicate_rows":np.nan,"note":"missing_pk_columns"})
+            else:
+                # One hash pass per table: rows belonging to any key group of size > 1
+                sizes = df.groupby(pk, sort=False, observed=True, dropna=False).size()
+                pk_rows.append({"table":t,"pk":",".join(pk),"duplicate_rows":int(sizes[sizes > 1].sum()),"note":""})
+
+        for c in id_cols.get(t, ()):
             if c not in df.columns:
-                rows.append({"table":t,"col":c,"missing":np.nan,"note":"col_missing"})
+                miss_rows.append({"table":t,"col":c,"missing":np.nan,"note":"col_missing"})
+                continue
+            mask = notna[c] = df[c].notna()
+            miss = int(len(mask) - mask.sum()) + _blank_count(df[c])
+            miss_rows.append({"table":t,"col":c,"missing":miss,"note":""})
+
+        for tbl,fk,lk,lkpk in by_child.get(t, ()):
+            if lk not in tables:
                 continue
-            miss = int(df[c].isna().sum() + (df[c].astype(str).str.strip()=="").sum())
-            rows.append({"table":t,"col":c,"missing":miss,"note":""})
-    return pd.DataFrame(rows).sort_values(["table","col"])
+            lkdf = tables[lk]
+            if fk not in df.columns or lkpk not in lkdf.columns:
+                fk_rows.append({"table":tbl,"fk":fk,"lookup":lk,"missing_fk":np.nan,"note":"missing_columns"})
+                continue
+            if fk not in notna:
+                notna[fk] = df[fk].notna()
+            parent, vals = lkdf[lkpk], df[fk][notna[fk]]
+            shared_codes = _shares_categories(vals, parent)
+            key = (lk, lkpk, shared_codes)
+            if key not in parent_keys:
+                if shared_codes:
+                    # Presence bitmap over the parent's category codes, built once per parent
+                    codes = parent.cat.codes.to_numpy()
+                    present = np.zeros(len(parent.cat.categories), dtype=bool)
+                    present[codes[codes >= 0]] = True
+                    parent_keys[key] = present
+                else:
+                    parent_keys[key] = set(parent.dropna().astype(str))
+            valid = parent_keys[key]
+            if len(valid) == 0:
+                # Empty parent: every non-null reference dangles, no membership test needed
+                missing = len(vals)
+            elif shared_codes:
+                # Child codes beyond the parent's categories are orphans; the rest is one gather
+                codes = vals.cat.codes.to_numpy()
+                missing = len(codes) - int(valid[codes[codes < len(valid)]].sum())
+            else:
+                missing = int((~vals.astype(str).isin(valid)).sum())
+            fk_rows.append({"table":tbl,"fk":fk,"lookup":lk,"missing_fk":missing,"note":""})
+
+    return (
+        pd.DataFrame(pk_rows, columns=["table","pk","duplicate_rows","note"]).sort_values("table"),
+        pd.DataFrame(miss_rows, columns=["table","col","missing","note"]).sort_values(["table","col"]),
+        pd.DataFrame(fk_rows, columns=["table","fk","lookup","missing_fk","note"]).sort_values(["table","fk"]),
+    )
+
+def qa_pk_duplicates(tables: Dict[str,pd.DataFrame], pk_map: Dict[str,List[str]]) -> pd.DataFrame:
+    return qa_validate(tables, pk_map, {}, [])[0]
+
+def qa_missing_ids(tables: Dict[str,pd.DataFrame], id_cols: Dict[str,List[str]]) -> pd.DataFrame:
+    return qa_validate(tables, {}, id_cols, [])[1]
 
 def qa_fk(tables: Dict[str,pd.DataFrame], specs: List[Tuple[str,str,str,str]]) -> pd.DataFrame:
-    out = []
-    for tbl,fk,lk,lkpk in specs:
-        if tbl not in tables or lk not in tables:
-            continue
-        df, lkdf = tables[tbl], tables[lk]
-        if fk not in df.columns or lkpk not in lkdf.columns:
-            out.append({"table":tbl,"fk":fk,"lookup":lk,"missing_fk":np.nan,"note":"missing_columns"})
-            continue
-        valid = set(lkdf[lkpk].dropna().astype(str))
-        vals = df[fk].dropna().astype(str)
-        out.append({"table":tbl,"fk":fk,"lookup":lk,"missing_fk":int((~vals.isin(valid)).sum()),"note":""})
-    return pd.DataFrame(out).sort_values(["table","fk"])
+    return qa_validate(tables, {}, {}, specs)[2]
 
 
 # ---------------------------
@@ -1619,115 +1835,77 @@ def compile_workbook(input_path: str, strict: bool=True, copy_raw: bool=True) ->
     conflicto = build_lookup_conflicto(raw)
     ca_q = build_lookup_ca_questions(raw)
 
-    # tidy
-    t31 = tidy_3_1_brainstorm(raw, geo, ctx, mdv, eco)
-    t32 = tidy_3_2_priorizacion(raw, geo, ctx, mdv)
-    tA, tB, tC, tD, tL = tidy_3_3_car(raw, geo, ctx, mdv)
-    t34_main, t34_se, t34_mdv = tidy_3_4_ecosistemas(raw, geo, ctx, eco, se, mdv)
-    t35_main, t35_months, t35_incl = tidy_3_5_se_mdv(raw, geo, ctx, eco, se, elemento_se, mdv)
-    t41 = tidy_4_1_amenazas(raw, geo, ctx, amen)
-    t421_main, t421_dif, t421_map = tidy_4_2_amenaza_mdv(raw, geo, ctx, amen, mdv, conflicto)
-    t422_main, t422_dif, t422_map = tidy_4_2_amenaza_se(raw, geo, ctx, amen, se, conflicto)
-    t51_main, t51_rel = tidy_5_1_actores(raw, geo, ctx, actor)
-    t52_main, t52_bridge = tidy_5_2_dialogo(raw, geo, ctx, espacio, actor)
-    t61 = tidy_6_1_conflict_events(raw, geo, ctx, conflicto)
-    t62 = tidy_6_2_conflict_actor(raw, geo, ctx, conflicto, actor)
+    # tidy (the context key map is shared by every context-bearing tidy)
+    cmap = build_context_map(geo, ctx)
+    t31 = tidy_3_1_brainstorm(raw, cmap, mdv, eco)
+    t32 = tidy_3_2_priorizacion(raw, cmap, mdv)
+    tA, tB, tC, tD, tL = tidy_3_3_car(raw, cmap, mdv)
+    t34_main, t34_se, t34_mdv = tidy_3_4_ecosistemas(raw, cmap, eco, se, mdv)
+    t35_main, t35_months, t35_incl = tidy_3_5_se_mdv(raw, cmap, eco, se, elemento_se, mdv)
+    t41 = tidy_4_1_amenazas(raw, cmap, amen)
+    t421_main, t421_dif, t421_map = tidy_4_2_amenaza_mdv(raw, cmap, amen, mdv, conflicto)
+    t422_main, t422_dif, t422_map = tidy_4_2_amenaza_se(raw, cmap, amen, se, conflicto)
+    t51_main, t51_rel = tidy_5_1_actores(raw, cmap, actor)
+    t52_main, t52_bridge = tidy_5_2_dialogo(raw, cmap, espacio, actor)
+    t61 = tidy_6_1_conflict_events(raw, cmap, conflicto)
+    t62 = tidy_6_2_conflict_actor(raw, cmap, conflicto, actor)
     t71_resp, t71_ans = tidy_7_1_ca(raw, survey_ctx, mdv, ca_q)
 
     tables: Dict[str,pd.DataFrame] = {}
 
     if copy_raw:
-        for sh, df in raw.items():
-            tables[sh] = df
-
-    # LOOKUPS
-    tables["LOOKUP_GEO"] = geo
-    tables["LOOKUP_CONTEXT"] = ctx
-    tables["LOOKUP_SURVEY_CONTEXT"] = survey_ctx
-    tables["LOOKUP_MDV"] = mdv
-    tables["LOOKUP_ECOSISTEMA"] = eco
-    tables["LOOKUP_SE"] = se
-    tables["LOOKUP_ELEMENTO_SE"] = elemento_se
-    tables["LOOKUP_AMENAZA"] = amen
-    tables["LOOKUP_ACTOR"] = actor
-    tables["LOOKUP_ESPACIO"] = espacio
-    tables["LOOKUP_CONFLICTO"] = conflicto
-    tables["LOOKUP_CA_QUESTIONS"] = ca_q
-
-    # TIDY
-    tables["TIDY_3_1_BRAINSTORM"] = t31
-    tables["TIDY_3_2_PRIORIZACION"] = t32
-    tables["TIDY_3_3_CAR_A"] = tA
-    tables["TIDY_3_3_CAR_B"] = tB
-    tables["TIDY_3_3_CAR_C"] = tC
-    tables["TIDY_3_3_CAR_D"] = tD
-    tables["TIDY_3_3_CAR_LONG"] = tL
-    tables["TIDY_3_4_ECOSISTEMAS"] = t34_main
-    tables["TIDY_3_4_ECO_SE"] = t34_se
-    tables["TIDY_3_4_ECO_MDV"] = t34_mdv
-    tables["TIDY_3_5_SE_MDV"] = t35_main
-    tables["TIDY_3_5_SE_MONTHS"] = t35_months
-    tables["TIDY_3_5_SE_INCLUSION"] = t35_incl
-    tables["TIDY_4_1_AMENAZAS"] = t41
-    tables["TIDY_4_2_1_AMENAZA_MDV"] = t421_main
-    tables["TIDY_4_2_1_DIFERENCIADO"] = t421_dif
-    tables["TIDY_4_2_1_MAPEO_CONFLICTO"] = t421_map
-    tables["TIDY_4_2_2_AMENAZA_SE"] = t422_main
-    tables["TIDY_4_2_2_DIFERENCIADO"] = t422_dif
-    tables["TIDY_4_2_2_MAPEO_CONFLICTO"] = t422_map
-    tables["TIDY_5_1_ACTORES"] = t51_main
-    tables["TIDY_5_1_RELACIONES"] = t51_rel
-    tables["TIDY_5_2_DIALOGO"] = t52_main
-    tables["TIDY_5_2_DIALOGO_ACTOR"] = t52_bridge
-    tables["TIDY_6_1_CONFLICT_EVENTS"] = t61
-    tables["TIDY_6_2_CONFLICTO_ACTOR"] = t62
-    tables["TIDY_7_1_RESPONDENTS"] = t71_resp
-    tables["TIDY_7_1_RESPONSES"] = t71_ans
-
-    # QA config
-    pk_map = {
-        "LOOKUP_GEO": ["geo_id"],
-        "LOOKUP_CONTEXT": ["context_id"],
-        "LOOKUP_SURVEY_CONTEXT": ["survey_context_id"],
-        "LOOKUP_MDV": ["mdv_id"],
-        "LOOKUP_ECOSISTEMA": ["ecosistema_id"],
-        "LOOKUP_SE": ["se_id"],
-        "LOOKUP_ELEMENTO_SE": ["elemento_se_id"],
-        "LOOKUP_AMENAZA": ["amenaza_id"],
-        "LOOKUP_ACTOR": ["actor_id"],
-        "LOOKUP_ESPACIO": ["espacio_id"],
-        "LOOKUP_CONFLICTO": ["conflicto_id"],
-        "LOOKUP_CA_QUESTIONS": ["question_id"],
-
-        "TIDY_3_1_BRAINSTORM": ["brainstorm_id"],
-        "TIDY_3_2_PRIORIZACION": ["priorizacion_id"],
-        "TIDY_3_3_CAR_A": ["car_a_id"],
-        "TIDY_3_3_CAR_B": ["car_b_id"],
-        "TIDY_3_3_CAR_C": ["car_c_id"],
-        "TIDY_3_3_CAR_D": ["car_d_id"],
-        "TIDY_3_3_CAR_LONG": ["car_long_id"],
-        "TIDY_3_4_ECOSISTEMAS": ["ecosistema_obs_id"],
-        "TIDY_3_4_ECO_SE": ["eco_se_id"],
-        "TIDY_3_4_ECO_MDV": ["eco_mdv_id"],
-        "TIDY_3_5_SE_MDV": ["se_mdv_id"],
-        "TIDY_3_5_SE_MONTHS": ["se_month_id"],
-        "TIDY_3_5_SE_INCLUSION": ["se_inclusion_id"],
-        "TIDY_4_1_AMENAZAS": ["amenaza_obs_id"],
-        "TIDY_4_2_1_AMENAZA_MDV": ["amenaza_mdv_id"],
-        "TIDY_4_2_1_DIFERENCIADO": ["dif_id"],
-        "TIDY_4_2_1_MAPEO_CONFLICTO": ["map_id"],
-        "TIDY_4_2_2_AMENAZA_SE": ["amenaza_se_id"],
-        "TIDY_4_2_2_DIFERENCIADO": ["dif_id"],
-        "TIDY_4_2_2_MAPEO_CONFLICTO": ["map_id"],
-        "TIDY_5_1_ACTORES": ["actor_obs_id"],
-        "TIDY_5_1_RELACIONES": ["rel_id"],
-        "TIDY_5_2_DIALOGO": ["dialogo_id"],
-        "TIDY_5_2_DIALOGO_ACTOR": ["bridge_id"],
-        "TIDY_6_1_CONFLICT_EVENTS": ["event_id"],
-        "TIDY_6_2_CONFLICTO_ACTOR": ["conflict_actor_id"],
-        "TIDY_7_1_RESPONDENTS": ["respondent_id"],
-        "TIDY_7_1_RESPONSES": ["response_id"],
-    }
+        tables.update(raw)
+
+    # Output sheet order is the tuple order below (after RAW sheets)
+    lookup_entries = (
+        ("LOOKUP_GEO", geo),
+        ("LOOKUP_CONTEXT", ctx),
+        ("LOOKUP_SURVEY_CONTEXT", survey_ctx),
+        ("LOOKUP_MDV", mdv),
+        ("LOOKUP_ECOSISTEMA", eco),
+        ("LOOKUP_SE", se),
+        ("LOOKUP_ELEMENTO_SE", elemento_se),
+        ("LOOKUP_AMENAZA", amen),
+        ("LOOKUP_ACTOR", actor),
+        ("LOOKUP_ESPACIO", espacio),
+        ("LOOKUP_CONFLICTO", conflicto),
+        ("LOOKUP_CA_QUESTIONS", ca_q),
+    )
+    tidy_entries = (
+        ("TIDY_3_1_BRAINSTORM", t31),
+        ("TIDY_3_2_PRIORIZACION", t32),
+        ("TIDY_3_3_CAR_A", tA),
+        ("TIDY_3_3_CAR_B", tB),
+        ("TIDY_3_3_CAR_C", tC),
+        ("TIDY_3_3_CAR_D", tD),
+        ("TIDY_3_3_CAR_LONG", tL),
+        ("TIDY_3_4_ECOSISTEMAS", t34_main),
+        ("TIDY_3_4_ECO_SE", t34_se),
+        ("TIDY_3_4_ECO_MDV", t34_mdv),
+        ("TIDY_3_5_SE_MDV", t35_main),
+        ("TIDY_3_5_SE_MONTHS", t35_months),
+        ("TIDY_3_5_SE_INCLUSION", t35_incl),
+        ("TIDY_4_1_AMENAZAS", t41),
+        ("TIDY_4_2_1_AMENAZA_MDV", t421_main),
+        ("TIDY_4_2_1_DIFERENCIADO", t421_dif),
+        ("TIDY_4_2_1_MAPEO_CONFLICTO", t421_map),
+        ("TIDY_4_2_2_AMENAZA_SE", t422_main),
+        ("TIDY_4_2_2_DIFERENCIADO", t422_dif),
+        ("TIDY_4_2_2_MAPEO_CONFLICTO", t422_map),
+        ("TIDY_5_1_ACTORES", t51_main),
+        ("TIDY_5_1_RELACIONES", t51_rel),
+        ("TIDY_5_2_DIALOGO", t52_main),
+        ("TIDY_5_2_DIALOGO_ACTOR", t52_bridge),
+        ("TIDY_6_1_CONFLICT_EVENTS", t61),
+        ("TIDY_6_2_CONFLICTO_ACTOR", t62),
+        ("TIDY_7_1_RESPONDENTS", t71_resp),
+        ("TIDY_7_1_RESPONSES", t71_ans),
+    )
+    tables.update(lookup_entries + tidy_entries)
+
+    # QA config (fresh copies of the module tables: callers may edit them)
+    pk_map = {t: list(pk) for t, pk in QA_PK.items()}
+    fk_specs = list(QA_FK_SPECS)
 
     id_cols = {
         "TIDY_3_1_BRAINSTORM": ["context_id"],
@@ -1752,87 +1930,93 @@ def compile_workbook(input_path: str, strict: bool=True, copy_raw: bool=True) ->
         "TIDY_7_1_RESPONSES": ["respondent_id","question_id"],
     }
 
-    fk_specs = [
-        ("LOOKUP_CONTEXT","geo_id","LOOKUP_GEO","geo_id"),
-
-        ("TIDY_3_1_BRAINSTORM","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_3_1_BRAINSTORM","mdv_id","LOOKUP_MDV","mdv_id"),
-        ("TIDY_3_1_BRAINSTORM","ecosistema_id","LOOKUP_ECOSISTEMA","ecosistema_id"),
-
-        ("TIDY_3_2_PRIORIZACION","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_3_2_PRIORIZACION","mdv_id","LOOKUP_MDV","mdv_id"),
-
-        ("TIDY_3_3_CAR_A","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_3_3_CAR_A","mdv_id","LOOKUP_MDV","mdv_id"),
-        ("TIDY_3_3_CAR_B","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_3_3_CAR_B","mdv_id","LOOKUP_MDV","mdv_id"),
-        ("TIDY_3_3_CAR_C","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_3_3_CAR_C","mdv_id","LOOKUP_MDV","mdv_id"),
-        ("TIDY_3_3_CAR_D","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_3_3_CAR_D","mdv_id","LOOKUP_MDV","mdv_id"),
-
-        ("TIDY_3_4_ECOSISTEMAS","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_3_4_ECOSISTEMAS","ecosistema_id","LOOKUP_ECOSISTEMA","ecosistema_id"),
-        ("TIDY_3_4_ECO_SE","se_id","LOOKUP_SE","se_id"),
-        ("TIDY_3_4_ECO_MDV","mdv_id","LOOKUP_MDV","mdv_id"),
-
-        ("TIDY_3_5_SE_MDV","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_3_5_SE_MDV","ecosistema_id","LOOKUP_ECOSISTEMA","ecosistema_id"),
-        ("TIDY_3_5_SE_MDV","se_id","LOOKUP_SE","se_id"),
-        ("TIDY_3_5_SE_MDV","elemento_se_id","LOOKUP_ELEMENTO_SE","elemento_se_id"),
-        ("TIDY_3_5_SE_MDV","mdv_id","LOOKUP_MDV","mdv_id"),
-
-        ("TIDY_4_1_AMENAZAS","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_4_1_AMENAZAS","amenaza_id","LOOKUP_AMENAZA","amenaza_id"),
-
-        ("TIDY_4_2_1_AMENAZA_MDV","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_4_2_1_AMENAZA_MDV","amenaza_id","LOOKUP_AMENAZA","amenaza_id"),
-        ("TIDY_4_2_1_AMENAZA_MDV","mdv_id","LOOKUP_MDV","mdv_id"),
-
-        ("TIDY_4_2_2_AMENAZA_SE","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_4_2_2_AMENAZA_SE","amenaza_id","LOOKUP_AMENAZA","amenaza_id"),
-        ("TIDY_4_2_2_AMENAZA_SE","se_id","LOOKUP_SE","se_id"),
-
-        ("TIDY_5_1_ACTORES","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_5_1_ACTORES","actor_id","LOOKUP_ACTOR","actor_id"),
-        ("TIDY_5_1_RELACIONES","actor_id","LOOKUP_ACTOR","actor_id"),
-
-        ("TIDY_5_2_DIALOGO","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_5_2_DIALOGO","espacio_id","LOOKUP_ESPACIO","espacio_id"),
-        ("TIDY_5_2_DIALOGO_ACTOR","actor_id","LOOKUP_ACTOR","actor_id"),
-
-        ("TIDY_6_1_CONFLICT_EVENTS","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_6_1_CONFLICT_EVENTS","conflicto_id","LOOKUP_CONFLICTO","conflicto_id"),
-
-        ("TIDY_6_2_CONFLICTO_ACTOR","context_id","LOOKUP_CONTEXT","context_id"),
-        ("TIDY_6_2_CONFLICTO_ACTOR","conflicto_id","LOOKUP_CONFLICTO","conflicto_id"),
-        ("TIDY_6_2_CONFLICTO_ACTOR","actor_id","LOOKUP_ACTOR","actor_id"),
-
-        ("TIDY_7_1_RESPONDENTS","survey_context_id","LOOKUP_SURVEY_CONTEXT","survey_context_id"),
-        ("TIDY_7_1_RESPONDENTS","mdv_id","LOOKUP_MDV","mdv_id"),
-        ("TIDY_7_1_RESPONSES","respondent_id","TIDY_7_1_RESPONDENTS","respondent_id"),
-        ("TIDY_7_1_RESPONSES","question_id","LOOKUP_CA_QUESTIONS","question_id"),
-    ]
+    # Categorical IDs: QA hashing and membership tests operate on int codes
+    qa_tables = categorize_id_columns(tables, pk_map, id_cols, fk_specs)
 
     # QA sheets
     tables["QA_INPUT_SCHEMA"] = qa_schema
     tables["QA_TABLE_SUMMARY"] = qa_table_summary(tables)
-    tables["QA_PK_DUPLICATES"] = qa_pk_duplicates(tables, pk_map)
-    tables["QA_MISSING_IDS"] = qa_missing_ids(tables, id_cols)
-    tables["QA_FOREIGN_KEYS"] = qa_fk(tables, fk_specs)
+    (tables["QA_PK_DUPLICATES"], tables["QA_MISSING_IDS"],
+     tables["QA_FOREIGN_KEYS"]) = qa_validate(qa_tables, pk_map, id_cols, fk_specs)
 
     return tables
 
 
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "pares_converter"
+# Size bound for each on-disk cache folder; the least recently used entries go first
+try:
+    CACHE_MAX_BYTES = int(os.environ.get("PARES_CACHE_MB", "512")) << 20
+except ValueError:
+    CACHE_MAX_BYTES = 512 << 20  # a malformed PARES_CACHE_MB must not break the import
+
+def prune_cache(directory: Path, pattern: str, max_bytes: int = CACHE_MAX_BYTES) -> None:
+    """Delete the least recently used files matching pattern until directory fits in max_bytes."""
+    entries = []
+    for path in Path(directory).glob(pattern):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime_ns, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+def compile_workbook_cached(input_path: str, strict: bool=True, copy_raw: bool=True) -> Dict[str,pd.DataFrame]:
+    """compile_workbook memoized on disk by (size, mtime, strict, copy_raw) of the input.
+
+    The converter's own mtime and the pandas/numpy/Python versions are part of the key,
+    so edits to the compiler or library upgrades invalidate old entries. An entry that
+    cannot be loaded is deleted and rebuilt; the folder is bounded by CACHE_MAX_BYTES.
+    """
+    st = os.stat(input_path)
+    key = (os.path.abspath(input_path), st.st_size, st.st_mtime_ns, strict, copy_raw,
+           os.stat(__file__).st_mtime_ns, pd.__version__, np.__version__, sys.version_info[:2])
+    cache_path = CACHE_DIR / (hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".pkl")
+    try:
+        with open(cache_path, "rb") as f:
+            tables = pickle.load(f)
+    except FileNotFoundError:
+        tables = None
+    except Exception:
+        # Truncated entry, or pickled by a library version that no longer loads it
+        cache_path.unlink(missing_ok=True)
+        tables = None
+    if tables is not None:
+        try:
+            os.utime(cache_path)  # mark as recently used
+        except OSError:
+            pass  # the entry is still good; it just looks older to prune_cache
+        return tables
+
+    tables = compile_workbook(input_path, strict=strict, copy_raw=copy_raw)
+    tmp = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            pickle.dump(tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+        prune_cache(CACHE_DIR, "*.pkl")
+    except Exception:
+        pass  # cache is best-effort
+    finally:
+        tmp.unlink(missing_ok=True)  # only left over when the write failed
+    return tables
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--input", required=True)
     ap.add_argument("--output", required=True)
     ap.add_argument("--no-strict", action="store_true")
     ap.add_argument("--no-raw", action="store_true", help="Do not copy RAW sheets to output")
+    ap.add_argument("--no-cache", action="store_true", help=f"Always recompile (skip {CACHE_DIR})")
     args = ap.parse_args()
 
-    tables = compile_workbook(args.input, strict=not args.no_strict, copy_raw=not args.no_raw)
+    compile_fn = compile_workbook if args.no_cache else compile_workbook_cached
+    tables = compile_fn(args.input, strict=not args.no_strict, copy_raw=not args.no_raw)
     write_workbook(args.output, tables)
     print(f"Wrote analysis-ready workbook: {args.output}")
 
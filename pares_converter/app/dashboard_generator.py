@@ -4,15 +4,27 @@ Generates an interactive SES dashboard from an analysis-ready Excel workbook.
 """
 from __future__ import annotations
 
+import hashlib
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache, partial
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
 import numpy as np
 
+from .converter import prune_cache
+
+try:
+    import python_calamine  # noqa: F401  (Rust XLSX reader, pandas >= 2.2)
+    EXCEL_READ_ENGINE = "calamine"
+except ImportError:
+    EXCEL_READ_ENGINE = "openpyxl"
+
 
 class NumpyEncoder(json.JSONEncoder):
     """Custom JSON encoder that handles numpy types."""
@@ -28,11 +40,177 @@ class NumpyEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
-def extract_meta(xl: pd.ExcelFile, file_name: str, org_name: str = "Organización") -> Dict[str, Any]:
+def dumps_json(obj: Any) -> bytes:
+    """Serialize to UTF-8 JSON with 2-space indent (json + NumpyEncoder).
+
+    Not orjson: it writes float NaN as null, and the dashboard script reads the
+    embedded bundle's NaN values as NaN.
+    """
+    return json.dumps(obj, ensure_ascii=False, indent=2, cls=NumpyEncoder).encode("utf-8")
+
+
+# ID columns are parsed straight to pandas strings so extractors never re-cast them.
+# Columns absent from a sheet are ignored by read_excel.
+_ID = "string"
+SHEET_DTYPES: Dict[str, Dict[str, str]] = {
+    "LOOKUP_CONTEXT": {"context_id": _ID, "geo_id": _ID},
+    "LOOKUP_GEO": {"geo_id": _ID},
+    "LOOKUP_MDV": {"mdv_id": _ID},
+    "TIDY_3_2_PRIORIZACION": {"context_id": _ID, "mdv_id": _ID},
+    "TIDY_3_3_CAR_A": {"context_id": _ID, "mdv_id": _ID},
+    "TIDY_3_4_ECOSISTEMAS": {"context_id": _ID},
+    "TIDY_3_5_SE_MDV": {"context_id": _ID, "se_mdv_id": _ID},
+    "TIDY_3_5_SE_MONTHS": {"se_mdv_id": _ID},
+    "TIDY_4_1_AMENAZAS": {"context_id": _ID},
+    "TIDY_4_2_1_AMENAZA_MDV": {"context_id": _ID},
+    "TIDY_4_2_2_AMENAZA_SE": {"context_id": _ID},
+    "TIDY_5_1_ACTORES": {"context_id": _ID, "actor_id": _ID},
+    "TIDY_5_2_DIALOGO": {"context_id": _ID, "dialogo_id": _ID},
+    "TIDY_5_2_DIALOGO_ACTOR": {"dialogo_id": _ID, "actor_id": _ID},
+    "TIDY_6_1_CONFLICT_EVENTS": {"context_id": _ID, "event_id": _ID, "cod_conflict": _ID},
+    "TIDY_6_2_CONFLICTO_ACTOR": {"context_id": _ID, "cod_conflict": _ID},
+}
+
+
+# Columns any extractor reads, per sheet; everything else is skipped at parse time
+_IMPACT_COLS = ("i_economia", "i_alimentaria", "i_sanitaria", "i_ambiental",
+                "i_personal", "i_comunitaria", "i_politica")
+_THREAT_COLS = frozenset(("context_id", "amenaza", "tipo_amenaza", "nr_familias") + _IMPACT_COLS)
+# extract_contexts reads these from LOOKUP_CONTEXT merged with LOOKUP_GEO, so either
+# sheet may supply them (and a column present in both comes out suffixed, as before)
+_LOOKUP_COLS = frozenset({"context_id", "geo_id", "fecha_iso", "admin0", "paisaje", "grupo"})
+SHEET_COLUMNS: Dict[str, frozenset] = {
+    "LOOKUP_CONTEXT": _LOOKUP_COLS,
+    "LOOKUP_GEO": _LOOKUP_COLS,
+    "LOOKUP_MDV": frozenset({"mdv_id", "mdv_name"}),
+    "TIDY_3_2_PRIORIZACION": frozenset({"context_id", "mdv_id", "i_total", "rank_in_zona"}),
+    "TIDY_3_3_CAR_A": frozenset({"context_id", "mdv_id", "sistema", "uso_final", "cv_importancia",
+                                 "cv_producto", "cv_mercado"}),
+    "TIDY_3_4_ECOSISTEMAS": frozenset({"context_id", "ecosistema", "tipo", "es_salud", "causas_deg"}),
+    "TIDY_3_5_SE_MDV": frozenset({"se_mdv_id", "context_id", "elemento_se", "mdv_name", "nr_usuarios",
+                                  "accesso", "barreras"}),
+    "TIDY_3_5_SE_MONTHS": frozenset({"se_mdv_id", "month_num", "month_type"}),
+    "TIDY_4_1_AMENAZAS": frozenset({"context_id", "amenaza", "tipo_amenaza", "magnitud", "frequencia",
+                                    "tendencia"}),
+    "TIDY_4_2_1_AMENAZA_MDV": _THREAT_COLS,
+    "TIDY_4_2_2_AMENAZA_SE": _THREAT_COLS,
+    "TIDY_5_1_ACTORES": frozenset({"context_id", "actor_id", "nombre_actor", "tipo_actor", "rol_paisaje",
+                                   "poder", "interes"}),
+    "TIDY_5_2_DIALOGO": frozenset({"dialogo_id", "context_id", "nombre_espacio", "tipo", "alcance",
+                                   "funcion", "incidencia", "fortalezas", "debilidades"}),
+    "TIDY_5_2_DIALOGO_ACTOR": frozenset({"dialogo_id", "actor_id", "actor_name"}),
+    "TIDY_6_1_CONFLICT_EVENTS": frozenset({"event_id", "context_id", "cod_conflict", "evento", "ano_evento",
+                                           "diferencias", "dif_factor", "cooperacion", "coop_factor", "suma"}),
+    "TIDY_6_2_CONFLICTO_ACTOR": frozenset({"context_id", "cod_conflict", "actor", "i_en_actor",
+                                           "i_en_conflicto"}),
+}
+
+
+# Repeated labels in TIDY_* sheets, held as categoricals (small integer codes, faster groupby)
+LOW_CARD_COLS = ("context_id", "tipo_amenaza", "grupo", "tipo_actor")
+
+
+def _read_sheet(xl: pd.ExcelFile, sheet: str) -> pd.DataFrame:
+    cols = SHEET_COLUMNS.get(sheet)
+    df = pd.read_excel(xl, sheet, dtype=SHEET_DTYPES.get(sheet),
+                       usecols=(lambda c: c in cols) if cols else None)
+    if cols and df.shape[1] == 0:
+        # None of the expected columns: the projection also drops the rows, which extractors count
+        df = pd.read_excel(xl, sheet, dtype=SHEET_DTYPES.get(sheet))
+    if sheet.startswith("TIDY_"):
+        for c in LOW_CARD_COLS:
+            if c in df.columns:
+                df[c] = df[c].astype("category")
+    return df
+
+
+class SheetCache:
+    """Parses each workbook sheet at most once; extractors share the (read-only) frames."""
+    def __init__(self, xl: pd.ExcelFile):
+        self._xl = xl
+        self._cache: Dict[str, pd.DataFrame] = {}
+        self.sheet_names = xl.sheet_names
+        self.names = frozenset(self.sheet_names)  # O(1) membership tests
+        self._found: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()  # the shared reader handle is not re-entrant
+
+    def get(self, sheet: str) -> pd.DataFrame:
+        with self._lock:
+            if sheet not in self._cache:
+                self._cache[sheet] = _read_sheet(self._xl, sheet)
+            return self._cache[sheet]
+
+    def find(self, fragment: str) -> Optional[str]:
+        """First sheet whose name contains `fragment` (memoized per fragment)."""
+        if fragment not in self._found:
+            self._found[fragment] = next((s for s in self.sheet_names if fragment in s), None)
+        return self._found[fragment]
+
+    def preload(self, source: Any, sheets: List[str], max_workers: Optional[int] = None) -> None:
+        """Parse `sheets` concurrently from `source` (a path or bytes).
+
+        Each worker opens its own ExcelFile: a reader handle is not safe to share
+        across threads. Without spare cores this is a no-op and get() parses lazily.
+        """
+        todo = [s for s in sheets if s in self.names and s not in self._cache]
+        workers = min(len(todo), max_workers or os.cpu_count() or 1)
+        if workers < 2:
+            return
+
+        def parse(chunk: List[str]) -> List[Tuple[str, pd.DataFrame]]:
+            with pd.ExcelFile(source, engine=self._xl.engine) as xl:
+                return [(s, _read_sheet(xl, s)) for s in chunk]
+
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            for parsed in ex.map(parse, [todo[i::workers] for i in range(workers)]):
+                self._cache.update(parsed)
+
+
+def _records(df: pd.DataFrame, cols: List[str], str_cols=(), blank_cols=()) -> List[Dict[str, Any]]:
+    """Column-wise replacement for building one dict per iterrows() row.
+
+    Non-null values in str_cols are str()'d; nulls become "" in blank_cols and 0 elsewhere.
+    Filling per column also replaces df[cols].fillna("").to_dict("records"), which copied
+    the whole projection to object dtype first.
+    """
+    columns = []
+    for c in cols:
+        s = df[c].astype(object)
+        present = s.notna()
+        if c in str_cols:
+            s = s.map(str)
+        columns.append(s.where(present, "" if c in blank_cols else 0).tolist())
+    if not columns:
+        return [{} for _ in range(len(df))]
+    return [dict(zip(cols, vals)) for vals in zip(*columns)]
+
+
+def _column(df: pd.DataFrame, col: str, default: Any) -> List[Any]:
+    """Column values as Python objects, or `default` per row when the column is absent."""
+    return df[col].astype(object).tolist() if col in df.columns else [default] * len(df)
+
+
+def _str_column(df: pd.DataFrame, col: str) -> List[str]:
+    """str() of each value (missing -> "nan", as str(row.get(col, "")) did), "" when absent."""
+    if col not in df.columns:
+        return [""] * len(df)
+    s = df[col]
+    return s.astype(object).where(s.notna(), "nan").map(str).tolist()
+
+
+def _text_column(df: pd.DataFrame, col: str) -> List[str]:
+    """str() of each non-null value, "" for nulls or when the column is absent."""
+    if col not in df.columns:
+        return [""] * len(df)
+    s = df[col].astype(object)
+    return s.where(s.notna(), "").map(str).tolist()
+
+
+def extract_meta(sheets: SheetCache, file_name: str, org_name: str = "Organización") -> Dict[str, Any]:
     """Extract metadata from workbook."""
     # Try to get geo info
-    geo_df = pd.read_excel(xl, "LOOKUP_GEO") if "LOOKUP_GEO" in xl.sheet_names else pd.DataFrame()
-    ctx_df = pd.read_excel(xl, "LOOKUP_CONTEXT") if "LOOKUP_CONTEXT" in xl.sheet_names else pd.DataFrame()
+    geo_df = sheets.get("LOOKUP_GEO") if "LOOKUP_GEO" in sheets.names else pd.DataFrame()
+    ctx_df = sheets.get("LOOKUP_CONTEXT") if "LOOKUP_CONTEXT" in sheets.names else pd.DataFrame()
     
     # Get first paisaje and admin0
     paisaje = geo_df["paisaje"].iloc[0] if len(geo_df) > 0 and "paisaje" in geo_df.columns else "Paisaje"
@@ -49,30 +227,32 @@ def extract_meta(xl: pd.ExcelFile, file_name: str, org_name: str = "Organizació
     }
 
 
+# Checked in order: a label mentioning several zones resolves to the first listed here
+_GRUPO_ZONES = (("alta", "Zona Alta"), ("media", "Zona Media"), ("baja", "Zona Baja"))
+
+
 def normalize_grupo(grupo: str) -> str:
     """Normalize grupo/zona labels."""
     if not grupo or pd.isna(grupo):
         return "Sin especificar"
-    g = str(grupo).lower().strip()
-    if "alta" in g:
-        return "Zona Alta"
-    elif "media" in g:
-        return "Zona Media"
-    elif "baja" in g:
-        return "Zona Baja"
-    return str(grupo).strip()
+    label = str(grupo).strip()
+    g = label.lower()
+    for key, zone in _GRUPO_ZONES:
+        if key in g:
+            return zone
+    return label
 
 
-def extract_contexts(xl: pd.ExcelFile) -> List[Dict[str, Any]]:
+def extract_contexts(sheets: SheetCache) -> List[Dict[str, Any]]:
     """Extract context options for dropdown."""
     contexts = []
     
-    if "LOOKUP_CONTEXT" not in xl.sheet_names or "LOOKUP_GEO" not in xl.sheet_names:
+    if "LOOKUP_CONTEXT" not in sheets.names or "LOOKUP_GEO" not in sheets.names:
         # Try to find a context_id from common data sheets if lookup is missing
         first_ctx_id = ""
         for s in ["TIDY_3_5_SE_MDV", "TIDY_4_1_AMENAZAS", "TIDY_3_3_CAR_A"]:
-            if s in xl.sheet_names:
-                df_tmp = pd.read_excel(xl, s)
+            if s in sheets.names:
+                df_tmp = sheets.get(s)
                 if "context_id" in df_tmp.columns and not df_tmp["context_id"].empty:
                     first_ctx_id = str(df_tmp["context_id"].iloc[0])
                     if first_ctx_id.lower() == "nan": first_ctx_id = ""
@@ -89,8 +269,8 @@ def extract_contexts(xl: pd.ExcelFile) -> List[Dict[str, Any]]:
             "label": "Vista General"
         }]
     
-    ctx_df = pd.read_excel(xl, "LOOKUP_CONTEXT")
-    geo_df = pd.read_excel(xl, "LOOKUP_GEO")
+    ctx_df = sheets.get("LOOKUP_CONTEXT")
+    geo_df = sheets.get("LOOKUP_GEO")
     
     # Merge to get full context info
     if "geo_id" in ctx_df.columns and "geo_id" in geo_df.columns:
@@ -98,14 +278,19 @@ def extract_contexts(xl: pd.ExcelFile) -> List[Dict[str, Any]]:
     else:
         merged = ctx_df
     
-    for _, row in merged.iterrows():
-        paisaje = row.get("paisaje", "Paisaje")
-        grupo = row.get("grupo", "")
-        fecha = row.get("fecha_iso", "")
+    # Null masks and str() casts are computed per column, not per cell
+    def has(col: str) -> List[bool]:
+        return merged[col].notna().tolist() if col in merged.columns else [True] * len(merged)
+    
+    rows = zip(_text_column(merged, "context_id"), _text_column(merged, "geo_id"),
+               _str_column(merged, "admin0"), _column(merged, "paisaje", "Paisaje"),
+               _column(merged, "grupo", ""), has("grupo"),
+               _column(merged, "fecha_iso", ""), has("fecha_iso"))
+    for ctx_id, geo_id, admin0, paisaje, grupo, has_grupo, fecha, has_fecha in rows:
         grupo_norm = normalize_grupo(grupo)
         
         # Format date for display
-        if fecha and not pd.isna(fecha):
+        if fecha and has_fecha:
             if isinstance(fecha, str):
                 fecha_display = fecha[:7]  # YYYY-MM
             else:
@@ -113,16 +298,15 @@ def extract_contexts(xl: pd.ExcelFile) -> List[Dict[str, Any]]:
         else:
             fecha_display = ""
         
-        ctx_id = str(row.get("context_id", "")) if not pd.isna(row.get("context_id")) else ""
         if ctx_id.lower() == "nan": ctx_id = ""
         
         contexts.append({
             "context_id": ctx_id,
-            "geo_id": str(row.get("geo_id", "")) if not pd.isna(row.get("geo_id")) else "",
-            "fecha_iso": str(fecha) if fecha and not pd.isna(fecha) else "",
-            "admin0": str(row.get("admin0", "")),
+            "geo_id": geo_id,
+            "fecha_iso": str(fecha) if fecha and has_fecha else "",
+            "admin0": admin0,
             "paisaje": str(paisaje) if paisaje else "Paisaje",
-            "grupo": str(grupo) if grupo and not pd.isna(grupo) else "",
+            "grupo": str(grupo) if grupo and has_grupo else "",
             "grupo_normalized": grupo_norm,
             "label": f"{paisaje} — {grupo_norm} — {fecha_display}".strip(" —")
         })
@@ -142,7 +326,7 @@ def extract_contexts(xl: pd.ExcelFile) -> List[Dict[str, Any]]:
     return contexts
 
 
-def compute_kpis(xl: pd.ExcelFile, contexts: List[Dict]) -> Dict[str, Dict[str, int]]:
+def compute_kpis(sheets: SheetCache, contexts: List[Dict]) -> Dict[str, Dict[str, int]]:
     """Compute KPI counts per context."""
     kpis = {}
     
@@ -155,76 +339,67 @@ def compute_kpis(xl: pd.ExcelFile, contexts: List[Dict]) -> Dict[str, Dict[str,
             "n_actors": 0
         }
     
-    # Count services from TIDY_3_5_SE_MDV
-    if "TIDY_3_5_SE_MDV" in xl.sheet_names:
-        df = pd.read_excel(xl, "TIDY_3_5_SE_MDV")
-        for ctx in contexts:
-            ctx_id = ctx["context_id"]
-            subset = df[df["context_id"].astype(str) == ctx_id]
-            if not subset.empty:
-                if "elemento_se" in subset.columns:
-                    kpis[ctx_id]["n_services"] = subset["elemento_se"].nunique()
-                if "mdv_name" in subset.columns:
-                    kpis[ctx_id]["n_livelihoods"] = subset["mdv_name"].nunique()
-    
-    # Count threats from TIDY_4_1_AMENAZAS
-    if "TIDY_4_1_AMENAZAS" in xl.sheet_names:
-        df = pd.read_excel(xl, "TIDY_4_1_AMENAZAS")
-        for ctx in contexts:
-            ctx_id = ctx["context_id"]
-            if "context_id" in df.columns:
-                subset = df[df["context_id"].astype(str).fillna("") == ctx_id]
-                if not subset.empty and "amenaza" in subset.columns:
-                    kpis[ctx_id]["n_threats"] = subset["amenaza"].nunique()
-    
-    # Count actors from TIDY_5_1_ACTORES
-    if "TIDY_5_1_ACTORES" in xl.sheet_names:
-        df = pd.read_excel(xl, "TIDY_5_1_ACTORES")
-        for ctx in contexts:
-            ctx_id = ctx["context_id"]
-            subset = df[df["context_id"].astype(str) == ctx_id]
-            if not subset.empty and "nombre_actor" in subset.columns:
-                kpis[ctx_id]["n_actors"] = subset["nombre_actor"].nunique()
+    # Distinct values per context: one hash groupby per KPI instead of a mask per context
+    # (threat rows without a context_id count towards the "" context, as the old
+    # fillna("") comparison did; other sheets leave them out)
+    kpi_sources = [
+        ("TIDY_3_5_SE_MDV", "elemento_se", "n_services", False),
+        ("TIDY_3_5_SE_MDV", "mdv_name", "n_livelihoods", False),
+        ("TIDY_4_1_AMENAZAS", "amenaza", "n_threats", True),
+        ("TIDY_5_1_ACTORES", "nombre_actor", "n_actors", False),
+    ]
+    for sheet, col, kpi, blank_missing in kpi_sources:
+        if sheet not in sheets.names:
+            continue
+        df = sheets.get(sheet)
+        if "context_id" not in df.columns or col not in df.columns:
+            continue
+        keys = df["context_id"]
+        if blank_missing and keys.isna().any():
+            keys = keys.astype(object).where(keys.notna(), "")
+        counts = df.groupby(keys, sort=False, observed=True)[col].nunique().to_dict()
+        for ctx_id, counters in kpis.items():
+            if ctx_id in counts:
+                counters[kpi] = counts[ctx_id]
     
     return kpis
 
 
-def extract_lifelines(xl: pd.ExcelFile) -> Dict[str, Any]:
+def extract_lifelines(sheets: SheetCache) -> Dict[str, Any]:
     """Extract SE→MdV relationships and seasonality data."""
     lifelines = {"se_mdv": [], "se_months": []}
     
-    if "TIDY_3_5_SE_MDV" in xl.sheet_names:
-        df = pd.read_excel(xl, "TIDY_3_5_SE_MDV")
+    if "TIDY_3_5_SE_MDV" in sheets.names:
+        df = sheets.get("TIDY_3_5_SE_MDV")
         cols = ["se_mdv_id", "context_id", "elemento_se", "mdv_name", "nr_usuarios", "accesso", "barreras"]
         available_cols = [c for c in cols if c in df.columns]
-        lifelines["se_mdv"] = df[available_cols].fillna("").to_dict("records")
+        lifelines["se_mdv"] = _records(df, available_cols, blank_cols=available_cols)
     
-    if "TIDY_3_5_SE_MONTHS" in xl.sheet_names:
-        df = pd.read_excel(xl, "TIDY_3_5_SE_MONTHS")
+    if "TIDY_3_5_SE_MONTHS" in sheets.names:
+        df = sheets.get("TIDY_3_5_SE_MONTHS")
         cols = ["se_mdv_id", "month_num", "month_type"]
         available_cols = [c for c in cols if c in df.columns]
         if available_cols:
-            lifelines["se_months"] = df[available_cols].fillna("").to_dict("records")
+            lifelines["se_months"] = _records(df, available_cols, blank_cols=available_cols)
     
     return lifelines
 
 
-def extract_threats(xl: pd.ExcelFile) -> Dict[str, Any]:
+def extract_threats(sheets: SheetCache) -> Dict[str, Any]:
     """Extract threat data and compute scores."""
     threats = {"amenazas": [], "threat_scores": []}
     
-    impact_cols = ["i_economia", "i_alimentaria", "i_sanitaria", "i_ambiental", 
-                   "i_personal", "i_comunitaria", "i_politica"]
+    impact_cols = list(_IMPACT_COLS)
     
     # Try TIDY_4_2_1_AMENAZA_MDV first, then TIDY_4_2_2_AMENAZA_SE
     sheet = None
-    if "TIDY_4_2_1_AMENAZA_MDV" in xl.sheet_names:
+    if "TIDY_4_2_1_AMENAZA_MDV" in sheets.names:
         sheet = "TIDY_4_2_1_AMENAZA_MDV"
-    elif "TIDY_4_2_2_AMENAZA_SE" in xl.sheet_names:
+    elif "TIDY_4_2_2_AMENAZA_SE" in sheets.names:
         sheet = "TIDY_4_2_2_AMENAZA_SE"
     
     if sheet:
-        df = pd.read_excel(xl, sheet)
+        df = sheets.get(sheet)
         # Get relevant columns
         base_cols = ["context_id", "amenaza", "tipo_amenaza", "nr_familias"]
         available_cols = [c for c in base_cols + impact_cols if c in df.columns]
@@ -232,180 +407,157 @@ def extract_threats(xl: pd.ExcelFile) -> Dict[str, Any]:
         # Add impact column names for reference
         available_impacts = [c for c in impact_cols if c in df.columns]
         
-        for _, row in df.iterrows():
-            record = {c: row[c] if not pd.isna(row.get(c)) else 0 for c in available_cols}
+        records = _records(df, available_cols)
+        # Threat score: mean of the non-null impact values (0 when none). Coercing to
+        # numeric keeps the reduction on float64 arrays; stray text counts as missing.
+        impacts = df[available_impacts].apply(pd.to_numeric, errors="coerce")
+        scores = impacts.mean(axis=1, skipna=True).fillna(0).to_numpy().tolist()
+        for record, score in zip(records, scores):
+            # After the 0 fill, as before: a missing id reads "0", an absent column ""
             record["context_id"] = str(record.get("context_id", ""))
-            
-            # Compute threat score (mean of impact values)
-            impact_values = [row.get(c, 0) for c in available_impacts if not pd.isna(row.get(c, 0))]
-            record["threat_score"] = sum(impact_values) / len(impact_values) if impact_values else 0
-            
-            threats["amenazas"].append(record)
+            record["threat_score"] = score
+        threats["amenazas"] = records
         
-        # Aggregate scores by threat
-        if threats["amenazas"]:
-            by_threat = {}
-            for rec in threats["amenazas"]:
-                key = (rec.get("context_id"), rec.get("amenaza"))
-                if key not in by_threat:
-                    by_threat[key] = {"scores": [], "nr_familias": 0}
-                by_threat[key]["scores"].append(rec["threat_score"])
-                by_threat[key]["nr_familias"] += rec.get("nr_familias", 0) or 0
-            
-            for (ctx_id, amenaza), data in by_threat.items():
-                threats["threat_scores"].append({
-                    "context_id": ctx_id,
-                    "amenaza": amenaza,
-                    "mean_score": sum(data["scores"]) / len(data["scores"]) if data["scores"] else 0,
-                    "total_familias": data["nr_familias"]
-                })
+        # Aggregate scores by threat (first-seen key order, like the old dict accumulation)
+        if records:
+            tmp = pd.DataFrame({
+                "context_id": [rec["context_id"] for rec in records],
+                "amenaza": [rec.get("amenaza") for rec in records],
+                "threat_score": scores,
+                "nr_familias": [rec.get("nr_familias", 0) or 0 for rec in records],
+            })
+            agg = (tmp.groupby(["context_id", "amenaza"], sort=False, dropna=False)
+                      .agg(mean_score=("threat_score", "mean"), total_familias=("nr_familias", "sum"))
+                      .reset_index())
+            threats["threat_scores"] = agg.astype(object).where(agg.notna(), None).to_dict("records")
     
     # Also get threat metadata from TIDY_4_1_AMENAZAS
-    if "TIDY_4_1_AMENAZAS" in xl.sheet_names:
-        df = pd.read_excel(xl, "TIDY_4_1_AMENAZAS")
+    if "TIDY_4_1_AMENAZAS" in sheets.names:
+        df = sheets.get("TIDY_4_1_AMENAZAS")
         meta_cols = ["context_id", "amenaza", "tipo_amenaza", "magnitud", "frequencia", "tendencia"]
         available_cols = [c for c in meta_cols if c in df.columns]
-        threats["amenazas_meta"] = df[available_cols].fillna("").to_dict("records")
+        threats["amenazas_meta"] = _records(df, available_cols, blank_cols=available_cols)
     
     return threats
 
 
-def extract_actors(xl: pd.ExcelFile) -> List[Dict[str, Any]]:
+def extract_actors(sheets: SheetCache) -> List[Dict[str, Any]]:
     """Extract actor data for power-interest scatter."""
     actors = []
     
-    sheet_name = next((s for s in xl.sheet_names if "5_1_ACTORES" in s), None)
+    sheet_name = sheets.find("5_1_ACTORES")
     if not sheet_name:
         return actors
     
-    df = pd.read_excel(xl, sheet_name)
+    df = sheets.get(sheet_name)
     cols = ["context_id", "actor_id", "nombre_actor", "tipo_actor", "rol_paisaje", "poder", "interes"]
     available_cols = [c for c in cols if c in df.columns]
     
-    for _, row in df.iterrows():
-        record = {}
-        for c in available_cols:
-            val = row.get(c)
-            if pd.isna(val):
-                record[c] = "" if c in ["nombre_actor", "tipo_actor", "rol_paisaje"] else 0
-            else:
-                record[c] = str(val) if c in ["context_id", "actor_id", "nombre_actor", "tipo_actor", "rol_paisaje"] else val
-        actors.append(record)
-    
-    return actors
+    return _records(df, available_cols,
+                    str_cols=("context_id", "actor_id", "nombre_actor", "tipo_actor", "rol_paisaje"),
+                    blank_cols=("nombre_actor", "tipo_actor", "rol_paisaje"))
 
 
-def extract_ecosystems(xl: pd.ExcelFile) -> List[Dict[str, Any]]:
+def extract_ecosystems(sheets: SheetCache) -> List[Dict[str, Any]]:
     """Extract ecosystem health data."""
     ecosystems = []
     
-    if "TIDY_3_4_ECOSISTEMAS" not in xl.sheet_names:
+    if "TIDY_3_4_ECOSISTEMAS" not in sheets.names:
         return ecosystems
     
-    df = pd.read_excel(xl, "TIDY_3_4_ECOSISTEMAS")
+    df = sheets.get("TIDY_3_4_ECOSISTEMAS")
     cols = ["context_id", "ecosistema", "tipo", "es_salud", "causas_deg"]
     available_cols = [c for c in cols if c in df.columns]
     
-    for _, row in df.iterrows():
-        record = {c: str(row[c]) if not pd.isna(row.get(c)) else "" for c in available_cols}
-        record["context_id"] = str(row.get("context_id", "")) if not pd.isna(row.get("context_id")) else ""
-        ecosystems.append(record)
+    ecosystems = _records(df, available_cols, str_cols=available_cols, blank_cols=available_cols)
+    for record in ecosystems:
+        record.setdefault("context_id", "")
     
     return ecosystems
 
 
-def extract_conflicts(xl: pd.ExcelFile) -> Dict[str, Any]:
+def extract_conflicts(sheets: SheetCache) -> Dict[str, Any]:
     """Extract conflict events for timeline."""
     conflicts = {"events": [], "actors": []}
     
     # Try finding the events sheet
-    events_sheet = next((s for s in xl.sheet_names if "6_1_CONFLICT_EVENTS" in s), None)
+    events_sheet = sheets.find("6_1_CONFLICT_EVENTS")
     if events_sheet:
-        df = pd.read_excel(xl, events_sheet)
+        df = sheets.get(events_sheet)
         cols = ["event_id", "context_id", "cod_conflict", "evento", "ano_evento", 
                 "diferencias", "dif_factor", "cooperacion", "coop_factor", "suma"]
         available_cols = [c for c in cols if c in df.columns]
         
-        for _, row in df.iterrows():
-            record = {}
-            for c in available_cols:
-                val = row.get(c)
-                if pd.isna(val):
-                    record[c] = "" if c in ["evento", "diferencias", "dif_factor", "cooperacion", "coop_factor"] else 0
-                else:
-                    record[c] = str(val) if c in ["event_id", "context_id", "cod_conflict", "evento", 
-                                                   "diferencias", "dif_factor", "cooperacion", "coop_factor"] else val
-            conflicts["events"].append(record)
+        conflicts["events"] = _records(
+            df, available_cols,
+            str_cols=("event_id", "context_id", "cod_conflict", "evento",
+                      "diferencias", "dif_factor", "cooperacion", "coop_factor"),
+            blank_cols=("evento", "diferencias", "dif_factor", "cooperacion", "coop_factor"))
     
     # Try finding the actors sheet
-    actors_sheet = next((s for s in xl.sheet_names if "6_2_CONFLICTO_ACTOR" in s), None)
+    actors_sheet = sheets.find("6_2_CONFLICTO_ACTOR")
     if actors_sheet:
-        df = pd.read_excel(xl, actors_sheet)
+        df = sheets.get(actors_sheet)
         cols = ["context_id", "cod_conflict", "actor", "i_en_actor", "i_en_conflicto"]
         available_cols = [c for c in cols if c in df.columns]
-        conflicts["actors"] = df[available_cols].fillna("").to_dict("records")
+        conflicts["actors"] = _records(df, available_cols, blank_cols=available_cols)
     
     return conflicts
 
 
-def extract_dialogue(xl: pd.ExcelFile) -> Dict[str, Any]:
+def extract_dialogue(sheets: SheetCache) -> Dict[str, Any]:
     """Extract dialogue spaces data."""
     dialogue = {"spaces": [], "actors": []}
     
-    if "TIDY_5_2_DIALOGO" in xl.sheet_names:
-        df = pd.read_excel(xl, "TIDY_5_2_DIALOGO")
+    if "TIDY_5_2_DIALOGO" in sheets.names:
+        df = sheets.get("TIDY_5_2_DIALOGO")
         cols = ["dialogo_id", "context_id", "nombre_espacio", "tipo", "alcance", 
                 "funcion", "incidencia", "fortalezas", "debilidades"]
         available_cols = [c for c in cols if c in df.columns]
         
-        for _, row in df.iterrows():
-            record = {c: str(row[c]) if not pd.isna(row.get(c)) else "" for c in available_cols}
-            dialogue["spaces"].append(record)
+        dialogue["spaces"] = _records(df, available_cols, str_cols=available_cols, blank_cols=available_cols)
     
-    if "TIDY_5_2_DIALOGO_ACTOR" in xl.sheet_names:
-        df = pd.read_excel(xl, "TIDY_5_2_DIALOGO_ACTOR")
+    if "TIDY_5_2_DIALOGO_ACTOR" in sheets.names:
+        df = sheets.get("TIDY_5_2_DIALOGO_ACTOR")
         cols = ["dialogo_id", "actor_id", "actor_name"]
         available_cols = [c for c in cols if c in df.columns]
-        dialogue["actors"] = df[available_cols].fillna("").to_dict("records")
+        dialogue["actors"] = _records(df, available_cols, blank_cols=available_cols)
     
     return dialogue
 
 
-def extract_livelihoods(xl: pd.ExcelFile) -> List[Dict[str, Any]]:
+def extract_livelihoods(sheets: SheetCache) -> List[Dict[str, Any]]:
     """Extract livelihood details from characterization and prioritization tables."""
     livelihoods = []
     
     # Get unique livelihoods from LOOKUP_MDV
-    if "LOOKUP_MDV" in xl.sheet_names:
-        df = pd.read_excel(xl, "LOOKUP_MDV")
-        for _, row in df.iterrows():
-            livelihoods.append({
-                "mdv_id": str(row.get("mdv_id", "")),
-                "mdv_name": str(row.get("mdv_name", "")),
-                "context_id": "",
-                "i_total": 0,
-                "rank": 999
-            })
+    if "LOOKUP_MDV" in sheets.names:
+        df = sheets.get("LOOKUP_MDV")
+        livelihoods = [
+            {"mdv_id": mdv_id, "mdv_name": mdv_name, "context_id": "", "i_total": 0, "rank": 999}
+            for mdv_id, mdv_name in zip(_str_column(df, "mdv_id"), _str_column(df, "mdv_name"))
+        ]
     
     # Add prioritization data if available (TIDY_3_2_PRIORIZACION)
     prio_map = {}
-    if "TIDY_3_2_PRIORIZACION" in xl.sheet_names:
-        prio_df = pd.read_excel(xl, "TIDY_3_2_PRIORIZACION")
-        for _, row in prio_df.iterrows():
-            key = (str(row.get("context_id", "")), str(row.get("mdv_id", "")))
-            prio_map[key] = {
-                "i_total": row.get("i_total", 0),
-                "rank": row.get("rank_in_zona", 999)
-            }
+    if "TIDY_3_2_PRIORIZACION" in sheets.names:
+        prio_df = sheets.get("TIDY_3_2_PRIORIZACION")
+        keys = zip(_str_column(prio_df, "context_id"), _str_column(prio_df, "mdv_id"))
+        values = zip(_column(prio_df, "i_total", 0), _column(prio_df, "rank_in_zona", 999))
+        prio_map = {key: {"i_total": i_total, "rank": rank} for key, (i_total, rank) in zip(keys, values)}
     
     # Enrich with characterization data if available
-    car_a_sheet = next((s for s in xl.sheet_names if "3_3_CAR_A" in s), None)
+    car_a_sheet = sheets.find("3_3_CAR_A")
     if car_a_sheet:
-        car_a = pd.read_excel(xl, car_a_sheet)
+        car_a = sheets.get(car_a_sheet)
+        # First characterization row per mdv_id, hashed once instead of a scan per livelihood
+        car_a_cols = [c for c in ["context_id", "sistema", "uso_final", "cv_importancia", "cv_producto", "cv_mercado"]
+                      if c in car_a.columns]
+        first = car_a[car_a_cols].assign(_mdv_key=_str_column(car_a, "mdv_id")).drop_duplicates("_mdv_key")
+        row_by_mdv = dict(zip(first["_mdv_key"], first[car_a_cols].to_dict("records")))
         for liv in livelihoods:
-            subset = car_a[car_a["mdv_id"].astype(str) == liv["mdv_id"]]
-            if len(subset) > 0:
-                row = subset.iloc[0]
+            row = row_by_mdv.get(liv["mdv_id"])
+            if row is not None:
                 ctx_id = str(row.get("context_id", ""))
                 liv.update({
                     "context_id": ctx_id,
@@ -428,7 +580,7 @@ def extract_livelihoods(xl: pd.ExcelFile) -> List[Dict[str, Any]]:
     return livelihoods
 
 
-def build_qa_summary(xl: pd.ExcelFile) -> Dict[str, Any]:
+def build_qa_summary(sheets: SheetCache) -> Dict[str, Any]:
     """Build QA summary from available data."""
     qa = {
         "missing_optional": [],
@@ -447,19 +599,19 @@ def build_qa_summary(xl: pd.ExcelFile) -> Dict[str, Any]:
     ]
     
     for sheet in required_sheets:
-        if sheet in xl.sheet_names:
+        if sheet in sheets.names:
             qa["available_sheets"].append(sheet)
         else:
             qa["data_quality_notes"].append(f"CRITICAL: Missing required sheet {sheet}")
     
     for sheet in recommended_sheets:
-        if sheet in xl.sheet_names:
+        if sheet in sheets.names:
             qa["available_sheets"].append(sheet)
         else:
             qa["missing_optional"].append(sheet)
     
     for sheet in optional_sheets:
-        if sheet in xl.sheet_names:
+        if sheet in sheets.names:
             qa["available_sheets"].append(sheet)
         else:
             qa["missing_optional"].append(sheet)
@@ -467,49 +619,103 @@ def build_qa_summary(xl: pd.ExcelFile) -> Dict[str, Any]:
     return qa
 
 
-def build_bundle(xl: pd.ExcelFile, file_name: str, org_name: str = "Organización") -> Dict[str, Any]:
-    """Build the complete dashboard data bundle."""
-    meta = extract_meta(xl, file_name, org_name)
-    contexts = extract_contexts(xl)
-    
-    bundle = {
-        "meta": meta,
-        "contexts": contexts,
-        "kpis": compute_kpis(xl, contexts),
-        "lifelines": extract_lifelines(xl),
-        "threats": extract_threats(xl),
-        "actors": extract_actors(xl),
-        "ecosystems": extract_ecosystems(xl),
-        "livelihoods": extract_livelihoods(xl),
-        "conflicts": extract_conflicts(xl),
-        "dialogue": extract_dialogue(xl),
-        "qa": build_qa_summary(xl)
+def build_bundle(xl: pd.ExcelFile, file_name: str, org_name: str = "Organización",
+                 source: Any = None) -> Dict[str, Any]:
+    """Build the complete dashboard data bundle.
+
+    When `source` (the workbook path or bytes) is given, the dashboard sheets are
+    parsed in parallel up front.
+    """
+    sheets = SheetCache(xl)
+    if source is not None:
+        sheets.preload(source, list(SHEET_DTYPES))
+    meta = extract_meta(sheets, file_name, org_name)
+    contexts = extract_contexts(sheets)
+    
+    # The remaining sections only read the (shared, read-only) sheet cache
+    jobs = {
+        "kpis": partial(compute_kpis, contexts=contexts),
+        "lifelines": extract_lifelines,
+        "threats": extract_threats,
+        "actors": extract_actors,
+        "ecosystems": extract_ecosystems,
+        "livelihoods": extract_livelihoods,
+        "conflicts": extract_conflicts,
+        "dialogue": extract_dialogue,
+        "qa": build_qa_summary,
     }
+    workers = min(len(jobs), os.cpu_count() or 1)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = {key: ex.submit(fn, sheets) for key, fn in jobs.items()}
+            sections = {key: fut.result() for key, fut in futures.items()}
+    else:
+        sections = {key: fn(sheets) for key, fn in jobs.items()}
+    
+    bundle = {"meta": meta, "contexts": contexts, **sections}
     
     return bundle
 
 
-def generate_dashboard_html(bundle: Dict[str, Any]) -> str:
-    """Generate the dashboard HTML from bundle data."""
-    # Read the template
-    template_path = os.path.join(os.path.dirname(__file__), "templates", "dashboard_template.html")
-    
-    with open(template_path, "r", encoding="utf-8") as f:
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "templates", "dashboard_template.html")
+BUNDLE_SENTINEL = "/* __BUNDLE_DATA__ */"
+
+
+@lru_cache(maxsize=1)
+def _template_parts() -> Tuple[str, Optional[str]]:
+    """Dashboard template split around the bundle sentinel; read from disk once per process.
+
+    `post` is None when the template has no sentinel.
+    """
+    with open(TEMPLATE_PATH, "r", encoding="utf-8") as f:
         template = f.read()
-    
+    pre, found, post = template.partition(BUNDLE_SENTINEL)
+    return pre, (post if found else None)
+
+
+def generate_dashboard_html(bundle: Dict[str, Any], bundle_json: Optional[bytes] = None) -> str:
+    """Generate the dashboard HTML from bundle data (or its already-serialized JSON)."""
     # Embed the bundle as JSON
-    bundle_json = json.dumps(bundle, ensure_ascii=False, indent=2, cls=NumpyEncoder)
-    
-    # Replace placeholder in template
-    html = template.replace("/* __BUNDLE_DATA__ */", f"const BUNDLE = {bundle_json};")
+    if bundle_json is None:
+        bundle_json = dumps_json(bundle)
     
-    return html
+    pre, post = _template_parts()
+    if post is None:
+        return pre
+    return f"{pre}const BUNDLE = {bundle_json.decode('utf-8')};{post}"
+
+
+def write_dashboard_html(html_path: str, bundle_json: bytes) -> None:
+    """Stream template head, bundle JSON and template tail to disk without joining them in memory."""
+    pre, post = _template_parts()
+    with open(html_path, "wb") as f:
+        f.write(pre.encode("utf-8"))
+        if post is None:
+            return
+        f.write(b"const BUNDLE = ")
+        f.write(bundle_json)
+        f.write(b";")
+        f.write(post.encode("utf-8"))
+
+
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "pares_converter" / "dashboard"
+
+
+def _bundle_cache_path(cache_dir: str, excel_path: str, file_name: str, org_name: str) -> Path:
+    """Cache entry keyed on the workbook bytes (blake2b), display inputs and this module's mtime."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(excel_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    h.update(f"|{file_name}|{org_name}|{os.stat(__file__).st_mtime_ns}".encode("utf-8"))
+    return Path(cache_dir) / f"{h.hexdigest()}.bundle.json"
 
 
 def generate_dashboard(
     excel_path: str,
     output_dir: str,
-    org_name: str = "Organización"
+    org_name: str = "Organización",
+    cache_dir: Optional[str] = None
 ) -> Tuple[str, str, str]:
     """
     Generate dashboard from Excel workbook.
@@ -518,34 +724,62 @@ def generate_dashboard(
         excel_path: Path to analysis-ready Excel workbook
         output_dir: Directory to write output files
         org_name: Organization name for display
+        cache_dir: Where bundles of already-seen workbooks are kept, e.g. CACHE_DIR
+            (default None: no cache). The folder is pruned to CACHE_MAX_BYTES.
     
     Returns:
         Tuple of (html_path, bundle_path, qa_path)
     """
-    # Read workbook
     file_name = os.path.basename(excel_path)
-    xl = pd.ExcelFile(excel_path)
-    
-    # Build bundle
-    bundle = build_bundle(xl, file_name, org_name)
+    cache_path = _bundle_cache_path(cache_dir, excel_path, file_name, org_name) if cache_dir else None
+    
+    bundle = None
+    if cache_path is not None:
+        try:
+            with open(cache_path, "rb") as f:
+                bundle = json.loads(f.read())
+            bundle["meta"]["export_date"] = datetime.now().strftime("%Y-%m-%d")
+        except (OSError, ValueError, KeyError, TypeError):
+            bundle = None
+        else:
+            try:
+                os.utime(cache_path)  # mark as recently used
+            except OSError:
+                pass  # the entry is still good; it just looks older to prune_cache
+    
+    if bundle is None:
+        # Read workbook
+        with pd.ExcelFile(excel_path, engine=EXCEL_READ_ENGINE) as xl:
+            # Build bundle
+            bundle = build_bundle(xl, file_name, org_name, source=excel_path)
+        if cache_path is not None:
+            tmp = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp.write_bytes(dumps_json(bundle))
+                os.replace(tmp, cache_path)
+                prune_cache(cache_path.parent, "*.bundle.json")
+            except Exception:
+                pass  # cache is best-effort
+            finally:
+                tmp.unlink(missing_ok=True)  # only left over when the write failed
     
     # Create output directory
     os.makedirs(output_dir, exist_ok=True)
     
-    # Write bundle JSON
+    # Write bundle JSON (serialized once, reused for the HTML embed)
+    bundle_json = dumps_json(bundle)
     bundle_path = os.path.join(output_dir, "bundle.json")
-    with open(bundle_path, "w", encoding="utf-8") as f:
-        json.dump(bundle, f, ensure_ascii=False, indent=2, cls=NumpyEncoder)
+    with open(bundle_path, "wb") as f:
+        f.write(bundle_json)
     
     # Write QA JSON
     qa_path = os.path.join(output_dir, "qa_dashboard.json")
-    with open(qa_path, "w", encoding="utf-8") as f:
-        json.dump(bundle["qa"], f, ensure_ascii=False, indent=2, cls=NumpyEncoder)
+    with open(qa_path, "wb") as f:
+        f.write(dumps_json(bundle["qa"]))
     
     # Generate and write HTML
-    html = generate_dashboard_html(bundle)
     html_path = os.path.join(output_dir, "dashboard.html")
-    with open(html_path, "w", encoding="utf-8") as f:
-        f.write(html)
+    write_dashboard_html(html_path, bundle_json)
     
     return html_path, bundle_path, qa_path
@@ -1,41 +1,195 @@
 from __future__ import annotations
 
+import asyncio
 import base64
-import gc
+import hashlib
+import importlib.util
 import io
+import logging
+import mmap
+import multiprocessing
 import os
-import shutil
 import sys
 import tempfile
 import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Literal
 
+import openpyxl
 import pandas as pd
-from fastapi import FastAPI, File, Form, UploadFile
+from fastapi import FastAPI, File, Form, Request, UploadFile
 from fastapi.responses import StreamingResponse, JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from .converter import compile_workbook, write_workbook, ValidationError, diagnose_file, format_diagnostic_report
+from .converter import EXCEL_READ_ENGINE
+
+logger = logging.getLogger(__name__)
+
+# Each storylineN package lives in <repo>/storylineN_pipeline/storylineN
+PIPELINES_ROOT = Path(__file__).resolve().parents[2]
+
+
+@lru_cache(maxsize=None)
+def _load_storyline(sid: int):
+    """Import the storyline<sid> package from its pipeline folder, once per process.
+
+    Registering the package in sys.modules lets `from storylineN.io import ...` work
+    without putting five pipeline folders on sys.path for every import in the process.
+    """
+    name = f"storyline{sid}"
+    if name in sys.modules:
+        return sys.modules[name]
+    pkg_dir = PIPELINES_ROOT / f"{name}_pipeline" / name
+    if not (pkg_dir / "__init__.py").is_file():
+        raise ImportError(f"No module named {name!r} (looked in {pkg_dir})")
+    spec = importlib.util.spec_from_file_location(
+        name, pkg_dir / "__init__.py", submodule_search_locations=[str(pkg_dir)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson when installed.
+
+    Analysis responses carry multi-MB base64 strings; orjson encodes them several
+    times faster than json.dumps. (fastapi's own ORJSONResponse is deprecated.)
+    """
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+# Storyline analyses are CPU-bound pandas/matplotlib work: run them in worker
+# processes so a long analysis does not stall every other request on the loop.
+# The pool starts on the first analysis request; PARES_WARM_POOL=1 (or true/yes)
+# starts it at boot.
+_PROCESS_POOL: ProcessPoolExecutor | None = None
+WARM_POOL_AT_STARTUP = os.environ.get("PARES_WARM_POOL", "").strip().lower() in {"1", "true", "yes"}
+
+
+# Storyline submodules a worker imports before taking requests (not every
+# storyline has all of them)
+WARM_MODULES = ("io", "metrics", "metrics_local", "portfolio", "monitoring", "plots", "report")
+
+
+def _warm_worker():
+    """Process pool initializer: pay the pandas/matplotlib/storyline imports at
+    spawn time instead of on the first analysis request a worker serves."""
+    for sid in range(1, 6):
+        try:
+            _load_storyline(sid)
+        except ImportError:
+            continue
+        for name in WARM_MODULES:
+            try:
+                importlib.import_module(f"storyline{sid}.{name}")
+            except ImportError:
+                pass
+    try:
+        import matplotlib.pyplot as plt
+        plt.close(plt.figure())  # first figure sets up the backend and font cache
+    except Exception:
+        pass  # an initializer error would break the whole pool
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _PROCESS_POOL
+    if _PROCESS_POOL is None:
+        # spawn: forking a process that already runs the event loop and its threads is unsafe
+        _PROCESS_POOL = ProcessPoolExecutor(
+            max_workers=int(os.environ.get("PARES_ANALYSIS_WORKERS", 0)) or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+    return _PROCESS_POOL
+
+
+async def run_in_process_pool(fn, *args):
+    """Run a picklable top-level function in the worker pool without blocking the loop."""
+    global _PROCESS_POOL
+    pool = _process_pool()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM): release the broken pool and start a fresh one
+        # next time. Another request may already have replaced it.
+        pool.shutdown(wait=False, cancel_futures=True)
+        if _PROCESS_POOL is pool:
+            _PROCESS_POOL = None
+        raise
 
-# Add storylines to path
-storyline1_path = os.path.join(os.path.dirname(__file__), "..", "..", "storyline1_pipeline")
-storyline2_path = os.path.join(os.path.dirname(__file__), "..", "..", "storyline2_pipeline")
-storyline3_path = os.path.join(os.path.dirname(__file__), "..", "..", "storyline3_pipeline")
-storyline4_path = os.path.join(os.path.dirname(__file__), "..", "..", "storyline4_pipeline")
-storyline5_path = os.path.join(os.path.dirname(__file__), "..", "..", "storyline5_pipeline")
-if storyline1_path not in sys.path:
-    sys.path.insert(0, storyline1_path)
-if storyline2_path not in sys.path:
-    sys.path.insert(0, storyline2_path)
-if storyline3_path not in sys.path:
-    sys.path.insert(0, storyline3_path)
-if storyline4_path not in sys.path:
-    sys.path.insert(0, storyline4_path)
-if storyline5_path not in sys.path:
-    sys.path.insert(0, storyline5_path)
-
-app = FastAPI(title="PARES Excel Converter & Analyzer")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARM_POOL_AT_STARTUP:
+        # Start a worker (and its warm-up imports) in the background at boot, so
+        # the first analysis request does not wait for it
+        _process_pool().submit(int)
+    yield
+    if _PROCESS_POOL is not None:
+        _PROCESS_POOL.shutdown(cancel_futures=True)
+
+
+app = FastAPI(
+    title="PARES Excel Converter & Analyzer",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
+
+MAX_UPLOAD_BYTES = int(os.environ.get("PARES_MAX_UPLOAD_MB", "200")) << 20
+
+
+class UploadTooLarge(Exception):
+    """An upload went past MAX_UPLOAD_BYTES while it was being spooled."""
+
+
+def _upload_too_large_response() -> FastJSONResponse:
+    return FastJSONResponse(
+        status_code=413,
+        content={"error": f"El archivo supera el tamaño máximo permitido ({MAX_UPLOAD_BYTES >> 20} MB)."},
+    )
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject oversized uploads from Content-Length, before any of the body is read.
+
+    Chunked bodies and missing or bogus headers get through here; spool_upload
+    counts the bytes it copies and raises UploadTooLarge for those.
+    """
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > MAX_UPLOAD_BYTES:
+        return _upload_too_large_response()
+    return await call_next(request)
+
+
+@app.exception_handler(UploadTooLarge)
+async def upload_too_large(request: Request, exc: UploadTooLarge):
+    return _upload_too_large_response()
 
 @app.get("/health")
 def health():
@@ -127,6 +281,100 @@ STORYLINE_REQUIREMENTS = {
     }
 }
 
+# Freeze the sheet lists once at import; tuples keep the spec order for the response
+for _reqs in STORYLINE_REQUIREMENTS.values():
+    _reqs["required"] = tuple(_reqs["required"])
+    _reqs["recommended"] = tuple(_reqs["recommended"])
+
+# Raw (unconverted) databases number their sheets "1. ...", "2. ...", "3. ..."
+RAW_SHEET_PREFIXES = ("1.", "2.", "3.")
+
+
+def _partition_sheets(names: tuple, available: set) -> tuple[list[str], list[str]]:
+    """(present, missing) in spec order, from a single pass over `names`."""
+    present, missing = [], []
+    for name in names:
+        (present if name in available else missing).append(name)
+    return present, missing
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
+def _copy_upload(src, out, digest=None, limit=None) -> None:
+    copied = 0
+    while chunk := src.read(UPLOAD_CHUNK_SIZE):
+        copied += len(chunk)
+        if limit is not None and copied > limit:
+            raise UploadTooLarge(f"upload exceeds {limit} bytes")
+        out.write(chunk)
+        if digest is not None:
+            digest.update(chunk)
+
+
+async def spool_upload(file: UploadFile, dest: Path | None = None, digest=None) -> Path:
+    """Copy an upload to `dest` (default: a new temp file) chunk by chunk.
+
+    The workbook never sits in memory as one bytes object; readers open it from disk.
+    The whole copy runs in one worker thread hop so a slow disk does not stall the loop.
+    If `digest` (a hashlib object) is given it is fed the same chunks on the way.
+    Raises UploadTooLarge (answered with a 413) once more than MAX_UPLOAD_BYTES
+    have been read, whatever the request's Content-Length said.
+    """
+    if dest is None:
+        fd, name = tempfile.mkstemp(suffix=Path(file.filename or "").suffix or ".xlsx")
+        out, dest = os.fdopen(fd, "wb"), Path(name)
+    else:
+        out = open(dest, "wb")
+    try:
+        with out:
+            # The request body is already spooled by the time the handler runs: read the
+            # underlying file directly instead of one to_thread per chunk via file.read
+            await file.seek(0)
+            await asyncio.to_thread(_copy_upload, file.file, out, digest, MAX_UPLOAD_BYTES)
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    return dest
+
+
+class UploadCache:
+    """LRU of per-upload results keyed by content hash, bounded by total bytes.
+
+    Users typically post the same workbook to /validate and then /convert (often
+    repeatedly); a repeat upload skips parsing and rendering altogether.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[Any, int]] = OrderedDict()
+        self._size = 0
+
+    def get(self, key: tuple) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: tuple, value: Any, nbytes: int) -> None:
+        if nbytes > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= old[1]
+        self._entries[key] = (value, nbytes)
+        self._size += nbytes
+        while self._size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= evicted
+
+
+UPLOAD_CACHE = UploadCache(int(os.environ.get("PARES_UPLOAD_CACHE_MB", "256")) << 20)
+
+
+def _upload_digest():
+    return hashlib.blake2b(digest_size=16)
+
+
 @app.post("/diagnose")
 async def diagnose_upload(
     file: UploadFile = File(...),
@@ -144,11 +392,10 @@ async def diagnose_upload(
     - warning_count: Number of warnings
     - can_convert: Whether file can be converted (no critical errors)
     """
-    content = await file.read()
-    input_buffer = io.BytesIO(content)
+    input_path = await spool_upload(file)
     
     try:
-        issues = diagnose_file(input_buffer)
+        issues = diagnose_file(str(input_path))
         formatted = format_diagnostic_report(issues, lang=lang)
         
         error_count = sum(1 for i in issues if i.severity == "error")
@@ -158,7 +405,7 @@ async def diagnose_upload(
         errors = [i for i in formatted if i["severity"] == "error"]
         warnings = [i for i in formatted if i["severity"] == "warning"]
         
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "success": True,
             "can_convert": error_count == 0,
             "error_count": error_count,
@@ -172,7 +419,7 @@ async def diagnose_upload(
         
     except Exception as e:
         import traceback
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -180,6 +427,29 @@ async def diagnose_upload(
                 "traceback": traceback.format_exc()
             }
         )
+    finally:
+        input_path.unlink(missing_ok=True)
+
+def _sheet_names(path: Path) -> list[str]:
+    """Sheet names of an uploaded workbook, without parsing any cell data."""
+    if CalamineWorkbook is not None:
+        try:
+            # calamine only reads the workbook part to list sheets; closing the
+            # workbook releases the file handle straight away
+            with CalamineWorkbook.from_path(str(path)) as wb:
+                return wb.sheet_names
+        except Exception:
+            pass  # let openpyxl have a go (and raise its usual errors)
+    # data_only=True returns cached formula values instead of formula strings;
+    # the tidy sheets only need the values.
+    # read_only streams the archive instead of building the cell grid, and
+    # keep_links=False stops openpyxl from chasing external workbook links,
+    # which can stall on files exported from shared drives.
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
 
 @app.post("/validate")
 
@@ -191,48 +461,52 @@ async def validate_file(
     Validate an uploaded file for a specific storyline.
     Returns which required and recommended sheets are present/missing.
     """
-    content = await file.read()
+    digest = _upload_digest()
+    input_path = await spool_upload(file, digest=digest)
     
     try:
-        xl = pd.ExcelFile(io.BytesIO(content), engine="openpyxl")
-        available_sheets = set(xl.sheet_names)
+        key = ("sheets", digest.digest())
+        sheet_names = UPLOAD_CACHE.get(key)
+        if sheet_names is None:
+            sheet_names = _sheet_names(input_path)
+            UPLOAD_CACHE.put(key, sheet_names, sum(map(len, sheet_names)))
+        available_sheets = set(sheet_names)
     except ValueError as e:
         # Capture validation errors
         error_msg = str(e)
         if "Input validation failed" in error_msg:
             # Try to return the raw message which contains the table
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=400,
                 content={
                     "error": "Validación fallida. Revise las columnas faltantes.",
                     "details": error_msg
                 }
             )
-        return JSONResponse(status_code=400, content={"error": f"Error de validación: {str(e)}"})
+        return FastJSONResponse(status_code=400, content={"error": f"Error de validación: {str(e)}"})
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return JSONResponse(status_code=500, content={
+        return FastJSONResponse(status_code=500, content={
             "valid": False,
             "error": f"Error interno del servidor: {str(e)}",
             "available_sheets": [],
             "missing_required": [],
             "missing_recommended": [],
         })
+    finally:
+        input_path.unlink(missing_ok=True)
     
     reqs = STORYLINE_REQUIREMENTS.get(storyline, STORYLINE_REQUIREMENTS[1])
     
-    missing_required = [s for s in reqs["required"] if s not in available_sheets]
-    missing_recommended = [s for s in reqs["recommended"] if s not in available_sheets]
-    present_required = [s for s in reqs["required"] if s in available_sheets]
-    present_recommended = [s for s in reqs["recommended"] if s in available_sheets]
+    present_required, missing_required = _partition_sheets(reqs["required"], available_sheets)
+    present_recommended, missing_recommended = _partition_sheets(reqs["recommended"], available_sheets)
     
     is_valid = len(missing_required) == 0
     
     # Check if this looks like a raw database vs converted file
     is_raw_database = "LOOKUP_CONTEXT" not in available_sheets and any(
-        s.startswith("1.") or s.startswith("2.") or s.startswith("3.") 
-        for s in available_sheets
+        s.startswith(RAW_SHEET_PREFIXES) for s in available_sheets
     )
     
     message = ""
@@ -245,7 +519,7 @@ async def validate_file(
     else:
         message = "All required and recommended sheets present. Ready to analyze!"
     
-    return JSONResponse(content={
+    return FastJSONResponse(content={
         "valid": is_valid,
         "is_raw_database": is_raw_database,
         "storyline": storyline,
@@ -258,6 +532,34 @@ async def validate_file(
         "present_recommended": present_recommended,
     })
 
+# QA tables and the count column each contributes to X-Converter-QAIssues
+QA_ISSUE_COLUMNS = (
+    ("QA_MISSING_IDS", "missing"),
+    ("QA_PK_DUPLICATES", "duplicate_rows"),
+    ("QA_FOREIGN_KEYS", "missing_fk"),
+)
+
+
+def _qa_total(tables: dict, key: str, col: str) -> int:
+    t = tables.get(key)
+    # Series.sum skips the NaN counts of missing-column rows
+    return 0 if t is None or t.empty else int(t[col].sum())
+
+
+def _convert_output(tables: dict) -> tuple[bytes, str, int, int]:
+    """Rendered workbook plus the values /convert reports in its headers."""
+    output_buffer = io.BytesIO()
+    write_workbook(output_buffer, tables)
+
+    total_tables = len(tables)
+    qa_issues = sum(_qa_total(tables, key, col) for key, col in QA_ISSUE_COLUMNS)
+
+    geo_id = ""
+    if "LOOKUP_GEO" in tables and not tables["LOOKUP_GEO"].empty:
+        geo_id = str(tables["LOOKUP_GEO"]["geo_id"].iloc[0])
+    return output_buffer.getvalue(), geo_id, qa_issues, total_tables
+
+
 @app.post("/convert")
 async def convert(
     file: UploadFile = File(...),
@@ -273,19 +575,25 @@ async def convert(
     - **strict**: If True, fail on missing columns. If False, continue with warnings.
     - **copy_raw**: If True, include RAW sheets in output.
     """
-    content = await file.read()
-    input_buffer = io.BytesIO(content)
+    digest = _upload_digest()
+    input_path = await spool_upload(file, digest=digest)
     
     try:
-        tables = compile_workbook(
-            input_path=input_buffer,
-            strict=strict,
-            copy_raw=copy_raw,
-        )
+        # Writing the workbook costs far more than compiling it, so cache the output
+        key = ("convert", digest.digest(), strict, copy_raw)
+        converted = UPLOAD_CACHE.get(key)
+        if converted is None:
+            # Compiling and writing are blocking work: keep them off the loop
+            tables = await asyncio.to_thread(
+                compile_workbook,
+                input_path=str(input_path),
+                strict=strict,
+                copy_raw=copy_raw,
+            )
     except ValidationError as e:
         # Structured validation error
         issues = e.df.to_dict(orient="records")
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=400,
             content={
                 "error": "Validación fallida. Se detectaron problemas en el archivo.",
@@ -294,37 +602,26 @@ async def convert(
             }
         )
     except ValueError as e:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=400,
             content={"error": str(e)},
         )
     except Exception as e:
         import traceback
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "error": f"Error interno inesperado: {str(e)}",
                 "detail": traceback.format_exc()
             }
         )
+    finally:
+        input_path.unlink(missing_ok=True)
 
-    output_buffer = io.BytesIO()
-    write_workbook(output_buffer, tables)
-    data = output_buffer.getvalue()
-
-    qa_summary = tables.get("QA_TABLE_SUMMARY")
-    total_tables = len(tables)
-    qa_issues = 0
-    if "QA_MISSING_IDS" in tables:
-        qa_issues += int(tables["QA_MISSING_IDS"]["missing"].sum()) if not tables["QA_MISSING_IDS"].empty else 0
-    if "QA_PK_DUPLICATES" in tables:
-        qa_issues += int(tables["QA_PK_DUPLICATES"]["duplicate_rows"].sum()) if not tables["QA_PK_DUPLICATES"].empty else 0
-    if "QA_FOREIGN_KEYS" in tables:
-        qa_issues += int(tables["QA_FOREIGN_KEYS"]["missing_fk"].sum()) if not tables["QA_FOREIGN_KEYS"].empty else 0
-
-    geo_id = ""
-    if "LOOKUP_GEO" in tables and not tables["LOOKUP_GEO"].empty:
-        geo_id = str(tables["LOOKUP_GEO"]["geo_id"].iloc[0])
+    if converted is None:
+        converted = await asyncio.to_thread(_convert_output, tables)
+        UPLOAD_CACHE.put(key, converted, len(converted[0]))
+    data, geo_id, qa_issues, total_tables = converted
 
     filename = f"FINAL_{org_slug}_analysis_ready.xlsx"
     return StreamingResponse(
@@ -339,709 +636,509 @@ async def convert(
     )
 
 
-@app.post("/analyze/storyline1")
-async def analyze_storyline1(
-    file: UploadFile = File(...),
-    top_n: int = Form(10),
-    include_figures: bool = Form(True),
-    include_report: bool = Form(True),
-    lang: str = Form("es"),
-    org_name: str = Form("Organización"),
-):
+# ============================================================
+# STORYLINE ANALYSIS
+# ============================================================
+
+QA_SHEETS = ("QA_INPUT_SCHEMA", "QA_PK_DUPLICATES", "QA_MISSING_IDS", "QA_FOREIGN_KEYS")
+
+
+def _table_stats(tables: dict) -> tuple[dict, dict]:
+    """Runlog sheet_availability and row_counts (non-empty sheets only), in one walk over `tables`."""
+    availability, row_counts = {}, {}
+    for name, df in tables.items():
+        n = df.shape[0]
+        availability[name] = n > 0
+        if n:
+            row_counts[name] = n
+    return availability, row_counts
+
+
+def _qa_summary(row_counts: dict) -> dict:
+    return {name: row_counts.get(name, 0) for name in QA_SHEETS}
+
+
+# Which downloads an analysis response carries (the XLSX, the ZIP bundle, or both)
+ResponseFormat = Literal["xlsx", "zip", "both"]
+
+
+# Text outputs are worth deflating; PNG figures and XLSX workbooks are already
+# DEFLATE-compressed inside, so recompressing them burns CPU for nothing
+ZIP_DEFLATE_SUFFIXES = (".html", ".json", ".csv", ".txt")
+# Level 1 gets most of the ratio on CSV/HTML for a fraction of the default
+# level 6 CPU time; the archive is only a download bundle
+ZIP_COMPRESSLEVEL = 1
+
+
+def _iter_files(path: str):
+    """Yield the path of every regular file under `path`.
+
+    scandir reuses the entry type from readdir, so unlike os.walk this needs
+    no extra stat per entry.
     """
-    Run Storyline 1 analysis: "Where to Act First?"
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry.path
+
+
+def _zip_directory(root: Path) -> io.BytesIO:
+    """ZIP every file under `root` (sorted relative names, text members deflated)."""
+    paths = sorted(Path(p) for p in _iter_files(str(root)))
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w", compresslevel=ZIP_COMPRESSLEVEL) as zf:
+        for path in paths:
+            compress = zipfile.ZIP_DEFLATED if path.suffix.lower() in ZIP_DEFLATE_SUFFIXES else zipfile.ZIP_STORED
+            zf.write(path, path.relative_to(root), compress_type=compress)
+    return zip_buffer
+
+
+def _b64encode_file(path) -> str:
+    """Base64 of a file, encoded straight from a read-only mmap of it.
+
+    The encoder reads the page cache directly, so the raw bytes are never
+    copied onto the heap.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""  # mmap cannot map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return base64.b64encode(mm).decode("ascii")
+
+
+def _analysis_payload(outdir: Path, output_paths: dict, *, tables_count: int, figures_count: int,
+                      start_time: datetime, end_time: datetime, warnings: list,
+                      report_html: str | None, response_format: ResponseFormat = "both",
+                      **extra) -> dict:
+    """Response body shared by every storyline: counts, base64 workbook and base64 ZIP of outdir.
+
+    `response_format` drops whichever of the two downloads the client does
+    not want (its key is still present, as None).
+    """
+    # Read outputs into memory
+    xlsx_base64 = None
+    xlsx_path = output_paths.get("xlsx")
+    if response_format != "zip" and xlsx_path and Path(xlsx_path).exists():
+        xlsx_base64 = _b64encode_file(xlsx_path)
     
-    - **file**: Analysis-ready Excel workbook (with LOOKUP_* and TIDY_* sheets)
-    - **top_n**: Number of top items in rankings (default: 10)
-    - **include_figures**: Generate visualization figures (default: True)
-    - **include_report**: Generate HTML report (default: True)
+    zip_base64 = None
+    if response_format != "xlsx":
+        zip_buffer = _zip_directory(outdir)
+        # getbuffer() exposes the archive without copying it out of the BytesIO
+        zip_base64 = base64.b64encode(zip_buffer.getbuffer()).decode("ascii")
+        del zip_buffer  # only the encoded str is returned
     
-    Returns JSON with base64-encoded outputs.
+    return {
+        "success": True,
+        "tables_count": tables_count,
+        "figures_count": figures_count,
+        "duration": f"{(end_time - start_time).total_seconds():.1f}s",
+        "warnings": warnings,
+        **extra,
+        "xlsx_base64": xlsx_base64,
+        "report_html": report_html,
+        "zip_base64": zip_base64,
+    }
+
+
+def _load_all_sheets(path: Path) -> dict[str, pd.DataFrame]:
+    """Parse every sheet of the workbook through a single ExcelFile handle.
+
+    The storyline loaders would otherwise reopen the file (ZIP directory,
+    shared strings, styles) once per sheet. Like _sheet_names this reads
+    cached formula values only (pandas opens openpyxl with read_only,
+    data_only and keep_links=False).
     """
-    try:
-        from storyline1.io import create_runlog, load_tables, write_outputs
-        from storyline1.metrics import compute_all_metrics
-        from storyline1.plots import generate_all_plots
-        from storyline1.report import generate_report
-    except ImportError as e:
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to import storyline1 module: {e}"},
+    with pd.ExcelFile(path, engine=EXCEL_READ_ENGINE) as xl:
+        return {name: xl.parse(name) for name in xl.sheet_names}
+
+
+def _run_storyline1(input_path: Path, outdir: Path, top_n: int, include_figures: bool,
+                    include_report: bool, org_name: str,
+                    response_format: ResponseFormat = "both") -> dict:
+    """Storyline 1: "Where to Act First?" """
+    _load_storyline(1)
+    from storyline1.io import create_runlog, load_tables, write_outputs
+    from storyline1.metrics import compute_all_metrics
+    from storyline1.plots import generate_all_plots
+    from storyline1.report import generate_report
+
+    start_time = datetime.now()
+    tables, warnings = load_tables(str(input_path), sheets=_load_all_sheets(input_path))
+    metrics_tables = compute_all_metrics(tables, top_n=top_n, top_n_drivers=5)
+    
+    figures = {}
+    if include_figures:
+        figures = generate_all_plots(metrics_tables, str(outdir))
+    
+    report_html = None
+    if include_report:
+        report_html = generate_report(
+            metrics_tables, figures, str(input_path), warnings,
+            org_name=org_name
         )
     
-    content = await file.read()
+    end_time = datetime.now()
+    row_counts = _table_stats(tables)[1]
+    runlog = create_runlog(
+        input_path=str(input_path),
+        output_dir=str(outdir),
+        warnings=warnings,
+        qa_summary=_qa_summary(row_counts),
+        tables_generated=list(metrics_tables.keys()),
+        figures_generated=list(figures.keys()),
+        start_time=start_time,
+        end_time=end_time,
+    )
+    output_paths = write_outputs(
+        str(outdir), metrics_tables, figures, report_html, runlog
+    )
+    return _analysis_payload(
+        outdir, output_paths, tables_count=len(metrics_tables), figures_count=len(figures),
+        start_time=start_time, end_time=end_time, warnings=warnings, report_html=report_html,
+        response_format=response_format,
+    )
+
+
+@lru_cache(maxsize=1)
+def _s2_params() -> dict:
+    """storyline2 params.yaml, parsed once per worker process (copy before mutating)."""
+    _load_storyline(2)
+    from storyline2.metrics import load_params
+    return load_params()
+
+
+def _run_storyline2(input_path: Path, outdir: Path, top_n: int, include_figures: bool,
+                    include_report: bool, org_name: str,
+                    response_format: ResponseFormat = "both") -> dict:
+    """Storyline 2: "Ecosystem-service lifelines" """
+    _load_storyline(2)
+    from storyline2.io import create_runlog, load_tables, write_outputs
+    from storyline2.metrics import compute_all_metrics
+    from storyline2.plots import generate_all_plots
+    from storyline2.report import generate_report
+
+    start_time = datetime.now()
+    tables, warnings = load_tables(str(input_path), sheets=_load_all_sheets(input_path))
+    metrics_tables = compute_all_metrics(tables, top_n=top_n)
     
-    # Create temp directory
-    tmpdir = tempfile.mkdtemp()
+    figures = {}
+    if include_figures:
+        figures = generate_all_plots(metrics_tables, str(outdir), tables=tables)
     
-    try:
-        # Save uploaded file
-        input_path = Path(tmpdir) / file.filename
-        input_path.write_bytes(content)
-        
-        outdir = Path(tmpdir) / "output"
-        outdir.mkdir()
-        
-        start_time = datetime.now()
-        
-        # Step 1: Load tables
-        tables, warnings = load_tables(str(input_path))
-        
-        # Step 2: Compute metrics
-        metrics_tables = compute_all_metrics(tables, top_n=top_n, top_n_drivers=5)
-        
-        # Step 3: Generate figures
-        figures = {}
-        if include_figures:
-            figures = generate_all_plots(metrics_tables, str(outdir))
-        
-        # Step 4: Generate report
-        report_html = None
-        if include_report:
-            report_html = generate_report(
-                metrics_tables, figures, str(input_path), warnings,
-                org_name=org_name
-            )
-        
-        # Step 5: Write outputs
-        end_time = datetime.now()
-        
-        qa_summary = {}
-        for qa_name in ["QA_INPUT_SCHEMA", "QA_PK_DUPLICATES", "QA_MISSING_IDS", "QA_FOREIGN_KEYS"]:
-            qa_df = tables.get(qa_name)
-            qa_summary[qa_name] = len(qa_df) if qa_df is not None and not qa_df.empty else 0
-        
-        runlog = create_runlog(
-            input_path=str(input_path),
-            output_dir=str(outdir),
-            warnings=warnings,
-            qa_summary=qa_summary,
-            tables_generated=list(metrics_tables.keys()),
-            figures_generated=list(figures.keys()),
-            start_time=start_time,
-            end_time=end_time,
-        )
-        
-        output_paths = write_outputs(
-            str(outdir), metrics_tables, figures, report_html, runlog
-        )
-        
-        # Read outputs into memory
-        xlsx_base64 = None
-        xlsx_path = output_paths.get("xlsx")
-        if xlsx_path and Path(xlsx_path).exists():
-            with open(xlsx_path, "rb") as f:
-                xlsx_base64 = base64.b64encode(f.read()).decode("utf-8")
-        
-        # Create ZIP
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in os.walk(outdir):
-                for file_name in files:
-                    file_path = Path(root) / file_name
-                    arcname = file_path.relative_to(outdir)
-                    zf.write(file_path, arcname)
-        zip_base64 = base64.b64encode(zip_buffer.getvalue()).decode("utf-8")
-        
-        duration = f"{(end_time - start_time).total_seconds():.1f}s"
-        
-        return JSONResponse(content={
-            "success": True,
-            "tables_count": len(metrics_tables),
-            "figures_count": len(figures),
-            "duration": duration,
-            "warnings": warnings,
-            "xlsx_base64": xlsx_base64,
-            "report_html": report_html,
-            "zip_base64": zip_base64,
-        })
-        
-    except Exception as e:
-        import traceback
-        return JSONResponse(
-            status_code=500,
-            content={"error": str(e), "traceback": traceback.format_exc()},
+    report_html = None
+    if include_report:
+        report_html = generate_report(
+            metrics_tables, figures, str(input_path), warnings, tables=tables,
+            org_name=org_name
         )
-    finally:
-        # Cleanup
-        tables = None
-        metrics_tables = None
-        figures = None
-        gc.collect()
-        
-        try:
-            shutil.rmtree(tmpdir, ignore_errors=True)
-        except Exception:
-            pass
+    
+    end_time = datetime.now()
+    sheet_availability, row_counts = _table_stats(tables)
+    params = dict(_s2_params())
+    params["top_n"] = top_n
+    runlog = create_runlog(
+        input_path=str(input_path),
+        output_dir=str(outdir),
+        warnings=warnings,
+        qa_summary=_qa_summary(row_counts),
+        tables_generated=list(metrics_tables.keys()),
+        figures_generated=list(figures.keys()),
+        params=params,
+        scenarios=["balanced", "livelihood_priority", "fragility_first"],
+        sheet_availability=sheet_availability,
+        row_counts=row_counts,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    output_paths = write_outputs(
+        str(outdir), metrics_tables, figures, report_html, runlog
+    )
+    return _analysis_payload(
+        outdir, output_paths, tables_count=len(metrics_tables), figures_count=len(figures),
+        start_time=start_time, end_time=end_time, warnings=warnings, report_html=report_html,
+        response_format=response_format,
+    )
 
 
-@app.post("/analyze/storyline4")
-async def analyze_storyline4(
-    file: UploadFile = File(...),
-    top_n: int = Form(10),
-    include_figures: bool = Form(True),
-    include_report: bool = Form(True),
-    lang: str = Form("es"),
-    org_name: str = Form("Organización"),
-):
-    """
-    Run Storyline 4 analysis: "Feasibility, Governance & Conflict Risk"
+@lru_cache(maxsize=1)
+def _s3_params() -> dict:
+    """storyline3 params.yaml, parsed once per worker process (copy before mutating)."""
+    _load_storyline(3)
+    from storyline3.metrics import load_params
+    return load_params()
+
+
+def _run_storyline3(input_path: Path, outdir: Path, top_n: int, include_figures: bool,
+                    include_report: bool, org_name: str,
+                    response_format: ResponseFormat = "both") -> dict:
+    """Storyline 3: "Equity & Differentiated Vulnerability" """
+    _load_storyline(3)
+    from storyline3.io import create_runlog, load_tables, write_outputs
+    from storyline3.metrics import process_metrics
+    from storyline3.plots import generate_plots
+    from storyline3.report import generate_report
+
+    start_time = datetime.now()
+    tables, warnings = load_tables(str(input_path), sheets=_load_all_sheets(input_path))
+    params = dict(_s3_params())
+    params["top_n"] = top_n
+    metrics_tables = process_metrics(tables, params)
     
-    - **file**: Analysis-ready Excel workbook (with LOOKUP_* and TIDY_* sheets)
-    - **top_n**: Number of top items in rankings (default: 10)
-    - **include_figures**: Generate visualization figures (default: True)
-    - **include_report**: Generate HTML report (default: True)
+    figures = {}
+    if include_figures:
+        figures = generate_plots(metrics_tables, str(outdir), params)
     
-    Returns JSON with base64-encoded outputs.
-    """
-    try:
-        from storyline4.io import create_runlog, load_tables, write_outputs, get_sheet_availability, get_row_counts
-        from storyline4.metrics import process_metrics
-        from storyline4.plots import generate_plots
-        from storyline4.report import generate_report
-    except ImportError as e:
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to import storyline4 module: {e}"},
-        )
+    report_html = None
+    if include_report:
+        report_html = generate_report(metrics_tables, figures, str(input_path), tables, org_name=org_name)
     
-    content = await file.read()
-    tmpdir = tempfile.mkdtemp()
+    end_time = datetime.now()
+    sheet_availability, row_counts = _table_stats(tables)
+    runlog = create_runlog(
+        input_path=str(input_path),
+        output_dir=str(outdir),
+        warnings=warnings,
+        qa_summary=_qa_summary(row_counts),
+        tables_generated=list(metrics_tables.keys()),
+        figures_generated=list(figures.keys()),
+        params=params,
+        sheet_availability=sheet_availability,
+        row_counts=row_counts,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    output_paths = write_outputs(
+        str(outdir), metrics_tables, figures, report_html, runlog
+    )
+    return _analysis_payload(
+        outdir, output_paths, tables_count=len(metrics_tables), figures_count=len(figures),
+        start_time=start_time, end_time=end_time, warnings=warnings, report_html=report_html,
+        response_format=response_format,
+    )
+
+
+def _run_storyline4(input_path: Path, outdir: Path, top_n: int, include_figures: bool,
+                    include_report: bool, org_name: str,
+                    response_format: ResponseFormat = "both") -> dict:
+    """Storyline 4: "Feasibility, Governance & Conflict Risk" """
+    _load_storyline(4)
+    from storyline4.io import create_runlog, load_tables, write_outputs
+    from storyline4.metrics import process_metrics
+    from storyline4.plots import generate_plots
+    from storyline4.report import generate_report
+
+    start_time = datetime.now()
+    tables, warnings = load_tables(str(input_path), sheets=_load_all_sheets(input_path))
+    params = {"top_n": top_n}
+    metrics_tables = process_metrics(tables, params)
     
-    try:
-        input_path = Path(tmpdir) / file.filename
-        input_path.write_bytes(content)
-        
-        outdir = Path(tmpdir) / "output"
-        outdir.mkdir()
-        
-        start_time = datetime.now()
-        
-        # Step 1: Load tables
-        tables, warnings = load_tables(str(input_path))
-        
-        # Step 2: Compute metrics
-        params = {"top_n": top_n}
-        metrics_tables = process_metrics(tables, params)
-        
-        # DEBUG: Print linkage keys
-        linkage_keys = [k for k in metrics_tables.keys() if 'LINK' in k or 'THREAT' in k]
-        print(f"[STORYLINE4 DEBUG] Linkage keys in metrics_tables: {linkage_keys}")
-        print(f"[STORYLINE4 DEBUG] All metrics keys: {list(metrics_tables.keys())}")
-        print(f"[STORYLINE4 DEBUG] TIDY_4_2_1_MAPEO_CONFLICTO in tables: {not tables.get('TIDY_4_2_1_MAPEO_CONFLICTO', None) is None}")
-        
-        # Step 3: Generate figures
-        figures = {}
-        if include_figures:
-            figures = generate_plots(metrics_tables, str(outdir), params)
-        
-        # Step 4: Generate report
-        report_html = None
-        if include_report:
-            report_html = generate_report(
-                metrics_tables, figures, str(input_path), warnings, tables,
-                org_name=org_name
-            )
-        
-        # Step 5: Write outputs
-        end_time = datetime.now()
-        
-        qa_summary = {}
-        for qa_name in ["QA_INPUT_SCHEMA", "QA_PK_DUPLICATES", "QA_MISSING_IDS", "QA_FOREIGN_KEYS"]:
-            qa_df = tables.get(qa_name)
-            qa_summary[qa_name] = len(qa_df) if qa_df is not None and not qa_df.empty else 0
-        
-        sheet_availability = get_sheet_availability(tables)
-        row_counts = get_row_counts(tables)
-        
-        runlog = create_runlog(
-            input_path=str(input_path),
-            output_dir=str(outdir),
-            warnings=warnings,
-            qa_summary=qa_summary,
-            tables_generated=list(metrics_tables.keys()),
-            figures_generated=list(figures.keys()),
-            params=params,
-            sheet_availability=sheet_availability,
-            row_counts=row_counts,
-            start_time=start_time,
-            end_time=end_time,
-        )
-        
-        output_paths = write_outputs(
-            str(outdir), metrics_tables, figures, report_html, runlog
-        )
-        
-        # Read outputs into memory
-        xlsx_base64 = None
-        xlsx_path = output_paths.get("xlsx")
-        if xlsx_path and Path(xlsx_path).exists():
-            with open(xlsx_path, "rb") as f:
-                xlsx_base64 = base64.b64encode(f.read()).decode("utf-8")
-        
-        # Create ZIP
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in os.walk(outdir):
-                for file_name in files:
-                    file_path = Path(root) / file_name
-                    arcname = file_path.relative_to(outdir)
-                    zf.write(file_path, arcname)
-        zip_base64 = base64.b64encode(zip_buffer.getvalue()).decode("utf-8")
-        
-        duration = f"{(end_time - start_time).total_seconds():.1f}s"
-        
-        return JSONResponse(content={
-            "success": True,
-            "tables_count": len(metrics_tables),
-            "figures_count": len(figures),
-            "duration": duration,
-            "warnings": warnings,
-            "xlsx_base64": xlsx_base64,
-            "report_html": report_html,
-            "zip_base64": zip_base64,
-        })
-        
-    except Exception as e:
-        import traceback
-        return JSONResponse(
-            status_code=500,
-            content={"error": str(e), "traceback": traceback.format_exc()},
-        )
-    finally:
-        # Cleanup
-        tables = None
-        metrics_tables = None
-        figures = None
-        gc.collect()
-        
-        try:
-            shutil.rmtree(tmpdir, ignore_errors=True)
-        except Exception:
-            pass
-@app.post("/analyze/storyline2")
-async def analyze_storyline2(
-    file: UploadFile = File(...),
-    top_n: int = Form(10),
-    include_figures: bool = Form(True),
-    include_report: bool = Form(True),
-    lang: str = Form("es"),
-    org_name: str = Form("Organización"),
-):
-    """
-    Run Storyline 2 analysis: "Ecosystem-service lifelines"
-    """
-    try:
-        from storyline2.io import create_runlog, load_tables, write_outputs
-        from storyline2.metrics import compute_all_metrics, load_params
-        from storyline2.plots import generate_all_plots
-        from storyline2.report import generate_report
-    except ImportError as e:
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to import storyline2 module: {e}"},
-        )
+    if logger.isEnabledFor(logging.DEBUG):
+        linkage_keys = [k for k in metrics_tables if 'LINK' in k or 'THREAT' in k]
+        logger.debug("Storyline 4 linkage keys in metrics_tables: %s", linkage_keys)
+        logger.debug("Storyline 4 metrics keys: %s", list(metrics_tables))
+        logger.debug("Storyline 4 TIDY_4_2_1_MAPEO_CONFLICTO loaded: %s",
+                     tables.get('TIDY_4_2_1_MAPEO_CONFLICTO') is not None)
     
-    content = await file.read()
-    tmpdir = tempfile.mkdtemp()
+    figures = {}
+    if include_figures:
+        figures = generate_plots(metrics_tables, str(outdir), params)
     
-    try:
-        input_path = Path(tmpdir) / file.filename
-        input_path.write_bytes(content)
-        
-        outdir = Path(tmpdir) / "output"
-        outdir.mkdir()
-        
-        start_time = datetime.now()
-        
-        # Step 1: Load tables
-        tables, warnings = load_tables(str(input_path))
-        
-        # Step 2: Compute metrics
-        metrics_tables = compute_all_metrics(tables, top_n=top_n)
-        
-        # Step 3: Generate figures
-        figures = {}
-        if include_figures:
-            figures = generate_all_plots(metrics_tables, str(outdir), tables=tables)
-        
-        # Step 4: Generate report
-        report_html = None
-        if include_report:
-            report_html = generate_report(
-                metrics_tables, figures, str(input_path), warnings, tables=tables,
-                org_name=org_name
-            )
-        
-        # Step 5: Write outputs
-        end_time = datetime.now()
-        
-        qa_summary = {}
-        for qa_name in ["QA_INPUT_SCHEMA", "QA_PK_DUPLICATES", "QA_MISSING_IDS", "QA_FOREIGN_KEYS"]:
-            qa_df = tables.get(qa_name)
-            qa_summary[qa_name] = len(qa_df) if qa_df is not None and not qa_df.empty else 0
-        
-        params = load_params()
-        params["top_n"] = top_n
-        
-        runlog = create_runlog(
-            input_path=str(input_path),
-            output_dir=str(outdir),
-            warnings=warnings,
-            qa_summary=qa_summary,
-            tables_generated=list(metrics_tables.keys()),
-            figures_generated=list(figures.keys()),
-            params=params,
-            scenarios=["balanced", "livelihood_priority", "fragility_first"],
-            sheet_availability={name: not tables.get(name, pd.DataFrame()).empty for name in tables},
-            row_counts={name: len(df) for name, df in tables.items() if not df.empty},
-            start_time=start_time,
-            end_time=end_time,
-        )
-        
-        output_paths = write_outputs(
-            str(outdir), metrics_tables, figures, report_html, runlog
-        )
-        
-        # Read outputs into memory
-        xlsx_base64 = None
-        xlsx_path = output_paths.get("xlsx")
-        if xlsx_path and Path(xlsx_path).exists():
-            with open(xlsx_path, "rb") as f:
-                xlsx_base64 = base64.b64encode(f.read()).decode("utf-8")
-        
-        # Create ZIP
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in os.walk(outdir):
-                for file_name in files:
-                    file_path = Path(root) / file_name
-                    arcname = file_path.relative_to(outdir)
-                    zf.write(file_path, arcname)
-        zip_base64 = base64.b64encode(zip_buffer.getvalue()).decode("utf-8")
-        
-        duration = f"{(end_time - start_time).total_seconds():.1f}s"
-        
-        return JSONResponse(content={
-            "success": True,
-            "tables_count": len(metrics_tables),
-            "figures_count": len(figures),
-            "duration": duration,
-            "warnings": warnings,
-            "xlsx_base64": xlsx_base64,
-            "report_html": report_html,
-            "zip_base64": zip_base64,
-        })
-        
-    except Exception as e:
-        import traceback
-        return JSONResponse(
-            status_code=500,
-            content={"error": str(e), "traceback": traceback.format_exc()},
+    report_html = None
+    if include_report:
+        report_html = generate_report(
+            metrics_tables, figures, str(input_path), warnings, tables,
+            org_name=org_name
         )
-    finally:
-        # Cleanup
-        tables = None
-        metrics_tables = None
-        figures = None
-        gc.collect()
-        
-        try:
-            shutil.rmtree(tmpdir, ignore_errors=True)
-        except Exception:
-            pass
+    
+    end_time = datetime.now()
+    sheet_availability, row_counts = _table_stats(tables)
+    runlog = create_runlog(
+        input_path=str(input_path),
+        output_dir=str(outdir),
+        warnings=warnings,
+        qa_summary=_qa_summary(row_counts),
+        tables_generated=list(metrics_tables.keys()),
+        figures_generated=list(figures.keys()),
+        params=params,
+        sheet_availability=sheet_availability,
+        row_counts=row_counts,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    output_paths = write_outputs(
+        str(outdir), metrics_tables, figures, report_html, runlog
+    )
+    return _analysis_payload(
+        outdir, output_paths, tables_count=len(metrics_tables), figures_count=len(figures),
+        start_time=start_time, end_time=end_time, warnings=warnings, report_html=report_html,
+        response_format=response_format,
+    )
 
 
-@app.post("/analyze/storyline3")
-async def analyze_storyline3(
-    file: UploadFile = File(...),
-    top_n: int = Form(10),
-    include_figures: bool = Form(True),
-    include_report: bool = Form(True),
-    lang: str = Form("es"),
-    org_name: str = Form("Organización"),
-):
-    """
-    Run Storyline 3 analysis: "Equity & Differentiated Vulnerability"
-    """
-    try:
-        from storyline3.io import create_runlog, load_tables, write_outputs
-        from storyline3.metrics import process_metrics, load_params
-        from storyline3.plots import generate_plots
-        from storyline3.report import generate_report
-    except ImportError as e:
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to import storyline3 module: {e}"},
-        )
+def _run_storyline5(input_path: Path, outdir: Path, top_n: int, include_figures: bool,
+                    include_report: bool, org_name: str,
+                    response_format: ResponseFormat = "both") -> dict:
+    """Storyline 5: "SbN Portfolio Design + Monitoring Plan" """
+    _load_storyline(5)
+    from storyline5.io import create_runlog, load_tables, write_outputs
+    from storyline5.metrics_local import compute_all_local_metrics
+    from storyline5.portfolio import build_portfolio
+    from storyline5.monitoring import build_monitoring_tables
+    from storyline5.plots import generate_plots
+    from storyline5.report import generate_report
+
+    start_time = datetime.now()
+    tables, warnings = load_tables(str(input_path), sheets=_load_all_sheets(input_path))
+    params = {"top_n": top_n, "bundles_per_grupo": 5}
+    metrics = compute_all_local_metrics(tables, params)
     
-    content = await file.read()
-    tmpdir = tempfile.mkdtemp()
+    weight_scenarios = {
+        "balanced": {"w_impact_potential": 0.35, "w_leverage": 0.25, "w_equity_urgency": 0.20, "w_feasibility": 0.20},
+        "equity_first": {"w_impact_potential": 0.30, "w_leverage": 0.20, "w_equity_urgency": 0.35, "w_feasibility": 0.15},
+        "feasibility_first": {"w_impact_potential": 0.30, "w_leverage": 0.20, "w_equity_urgency": 0.15, "w_feasibility": 0.35},
+    }
+    portfolio_tables, bundle_counts = build_portfolio(tables, metrics, params, weight_scenarios)
+    all_tables = {**metrics, **portfolio_tables}
     
-    try:
-        input_path = Path(tmpdir) / file.filename
-        input_path.write_bytes(content)
-        
-        outdir = Path(tmpdir) / "output"
-        outdir.mkdir()
-        
-        start_time = datetime.now()
-        
-        # Step 1: Load tables
-        tables, warnings = load_tables(str(input_path))
-        
-        # Step 2: Compute metrics
-        params = load_params()
-        params["top_n"] = top_n
-        metrics_tables = process_metrics(tables, params)
-        
-        # Step 3: Generate figures
-        figures = {}
-        if include_figures:
-            figures = generate_plots(metrics_tables, str(outdir), params)
-        
-        # Step 4: Generate report
-        report_html = None
-        if include_report:
-            report_html = generate_report(metrics_tables, figures, str(input_path), tables, org_name=org_name)
-        
-        # Step 5: Write outputs
-        end_time = datetime.now()
-        
-        qa_summary = {}
-        for qa_name in ["QA_INPUT_SCHEMA", "QA_PK_DUPLICATES", "QA_MISSING_IDS", "QA_FOREIGN_KEYS"]:
-            qa_df = tables.get(qa_name)
-            qa_summary[qa_name] = len(qa_df) if qa_df is not None and not qa_df.empty else 0
-        
-        runlog = create_runlog(
-            input_path=str(input_path),
-            output_dir=str(outdir),
-            warnings=warnings,
-            qa_summary=qa_summary,
-            tables_generated=list(metrics_tables.keys()),
-            figures_generated=list(figures.keys()),
-            params=params,
-            sheet_availability={name: not tables.get(name, pd.DataFrame()).empty for name in tables},
-            row_counts={name: len(df) for name, df in tables.items() if not df.empty},
-            start_time=start_time,
-            end_time=end_time,
-        )
-        
-        output_paths = write_outputs(
-            str(outdir), metrics_tables, figures, report_html, runlog
+    # Figures only read the portfolio tables, so render them (PNG encoding
+    # drops the GIL) while the monitoring plan is built; the report needs both
+    with ThreadPoolExecutor(max_workers=1) as figure_pool:
+        figures_future = (
+            figure_pool.submit(generate_plots, portfolio_tables, str(outdir), params)
+            if include_figures else None
         )
-        
-        # Read outputs into memory
-        xlsx_base64 = None
-        xlsx_path = output_paths.get("xlsx")
-        if xlsx_path and Path(xlsx_path).exists():
-            with open(xlsx_path, "rb") as f:
-                xlsx_base64 = base64.b64encode(f.read()).decode("utf-8")
-        
-        # Create ZIP
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in os.walk(outdir):
-                for file_name in files:
-                    file_path = Path(root) / file_name
-                    arcname = file_path.relative_to(outdir)
-                    zf.write(file_path, arcname)
-        zip_base64 = base64.b64encode(zip_buffer.getvalue()).decode("utf-8")
-        
-        duration = f"{(end_time - start_time).total_seconds():.1f}s"
-        
-        return JSONResponse(content={
-            "success": True,
-            "tables_count": len(metrics_tables),
-            "figures_count": len(figures),
-            "duration": duration,
-            "warnings": warnings,
-            "xlsx_base64": xlsx_base64,
-            "report_html": report_html,
-            "zip_base64": zip_base64,
-        })
-        
-    except Exception as e:
-        import traceback
-        return JSONResponse(
-            status_code=500,
-            content={"error": str(e), "traceback": traceback.format_exc()},
+        monitoring_tables = build_monitoring_tables(portfolio_tables, params)
+        figures = figures_future.result() if figures_future is not None else {}
+    
+    report_html = None
+    if include_report:
+        report_html = generate_report(
+            portfolio_tables, monitoring_tables, figures, str(input_path), warnings, tables,
+            org_name=org_name
         )
-    finally:
-        # Cleanup
-        tables = None
-        metrics_tables = None
-        figures = None
-        gc.collect()
-        
-        try:
-            shutil.rmtree(tmpdir, ignore_errors=True)
-        except Exception:
-            pass
+    
+    end_time = datetime.now()
+    sheet_availability, row_counts = _table_stats(tables)
+    runlog = create_runlog(
+        input_path=str(input_path),
+        output_dir=str(outdir),
+        optional_storyline_paths={},
+        warnings=warnings,
+        qa_summary=_qa_summary(row_counts),
+        tables_generated=list(all_tables.keys()),
+        figures_generated=list(figures.keys()),
+        params=params,
+        scoring_scenarios=list(weight_scenarios.keys()),
+        sheet_availability=sheet_availability,
+        row_counts=row_counts,
+        bundle_counts=bundle_counts,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    output_paths = write_outputs(
+        str(outdir), all_tables, figures, report_html, runlog, monitoring_tables
+    )
+    return _analysis_payload(
+        outdir, output_paths, tables_count=len(all_tables), figures_count=len(figures),
+        start_time=start_time, end_time=end_time, warnings=warnings, report_html=report_html,
+        response_format=response_format,
+        bundles_overall=bundle_counts.get("overall", 0),
+        bundles_by_grupo=bundle_counts.get("by_grupo", 0),
+        indicators_count=len(monitoring_tables.get("INDICATORS", pd.DataFrame())),
+    )
+
 
+# Storyline id -> pipeline run in the worker pool (top-level functions, so they pickle)
+STORYLINE_RUNNERS = {
+    1: _run_storyline1,
+    2: _run_storyline2,
+    3: _run_storyline3,
+    4: _run_storyline4,
+    5: _run_storyline5,
+}
 
-@app.post("/analyze/storyline5")
-async def analyze_storyline5(
+
+@app.post("/analyze/storyline/{sid}")
+async def analyze_storyline(
+    sid: int,
     file: UploadFile = File(...),
     top_n: int = Form(10),
     include_figures: bool = Form(True),
     include_report: bool = Form(True),
     lang: str = Form("es"),
     org_name: str = Form("Organización"),
+    response_format: ResponseFormat = Form("both"),
 ):
     """
-    Run Storyline 5 analysis: "SbN Portfolio Design + Monitoring Plan"
+    Run a storyline analysis (1-5) on an analysis-ready workbook.
     
     - **file**: Analysis-ready Excel workbook (with LOOKUP_* and TIDY_* sheets)
-    - **top_n**: Number of top bundles in rankings (default: 10)
+    - **top_n**: Number of top items in rankings (default: 10)
     - **include_figures**: Generate visualization figures (default: True)
     - **include_report**: Generate HTML report (default: True)
+    - **response_format**: "xlsx", "zip" or "both" base64 downloads (default: "both")
     
     Returns JSON with base64-encoded outputs.
     """
-    try:
-        from storyline5.io import create_runlog, load_tables, write_outputs, get_sheet_availability, get_row_counts
-        from storyline5.metrics_local import compute_all_local_metrics
-        from storyline5.portfolio import build_portfolio
-        from storyline5.monitoring import build_monitoring_tables
-        from storyline5.plots import generate_plots
-        from storyline5.report import generate_report
-    except ImportError as e:
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to import storyline5 module: {e}"},
-        )
-    
-    content = await file.read()
-    tmpdir = tempfile.mkdtemp()
+    runner = STORYLINE_RUNNERS.get(sid)
+    if runner is None:
+        return FastJSONResponse(status_code=404, content={"error": f"Unknown storyline: {sid}"})
     
-    try:
-        input_path = Path(tmpdir) / file.filename
-        input_path.write_bytes(content)
-        
-        outdir = Path(tmpdir) / "output"
-        outdir.mkdir()
-        
-        start_time = datetime.now()
-        
-        # Step 1: Load tables
-        tables, warnings = load_tables(str(input_path))
-        
-        # Step 2: Compute local metrics
-        params = {"top_n": top_n, "bundles_per_grupo": 5}
-        metrics = compute_all_local_metrics(tables, params)
-        
-        # Step 3: Build portfolio
-        weight_scenarios = {
-            "balanced": {"w_impact_potential": 0.35, "w_leverage": 0.25, "w_equity_urgency": 0.20, "w_feasibility": 0.20},
-            "equity_first": {"w_impact_potential": 0.30, "w_leverage": 0.20, "w_equity_urgency": 0.35, "w_feasibility": 0.15},
-            "feasibility_first": {"w_impact_potential": 0.30, "w_leverage": 0.20, "w_equity_urgency": 0.15, "w_feasibility": 0.35},
-        }
-        portfolio_tables, bundle_counts = build_portfolio(tables, metrics, params, weight_scenarios)
-        
-        # Step 4: Build monitoring plan
-        monitoring_tables = build_monitoring_tables(portfolio_tables, params)
-        
-        # Merge all tables
-        all_tables = {**metrics, **portfolio_tables}
-        
-        # Step 5: Generate figures
-        figures = {}
-        if include_figures:
-            figures = generate_plots(portfolio_tables, str(outdir), params)
-        
-        # Step 6: Generate report
-        report_html = None
-        if include_report:
-            report_html = generate_report(
-                portfolio_tables, monitoring_tables, figures, str(input_path), warnings, tables,
-                org_name=org_name
+    # Removed on exit even when the handler fails; TMPDIR may point at a tmpfs
+    with tempfile.TemporaryDirectory(prefix=f"s{sid}_", ignore_cleanup_errors=True) as tmpdir:
+        try:
+            input_path = await spool_upload(file, Path(tmpdir) / file.filename)
+            
+            outdir = Path(tmpdir) / "output"
+            outdir.mkdir()
+            
+            result = await run_in_process_pool(
+                runner, input_path, outdir, top_n, include_figures, include_report, org_name,
+                response_format,
             )
-        
-        # Step 7: Write outputs
-        end_time = datetime.now()
-        
-        qa_summary = {}
-        for qa_name in ["QA_INPUT_SCHEMA", "QA_PK_DUPLICATES", "QA_MISSING_IDS", "QA_FOREIGN_KEYS"]:
-            qa_df = tables.get(qa_name)
-            qa_summary[qa_name] = len(qa_df) if qa_df is not None and not qa_df.empty else 0
-        
-        sheet_availability = get_sheet_availability(tables)
-        row_counts = get_row_counts(tables)
-        
-        runlog = create_runlog(
-            input_path=str(input_path),
-            output_dir=str(outdir),
-            optional_storyline_paths={},
-            warnings=warnings,
-            qa_summary=qa_summary,
-            tables_generated=list(all_tables.keys()),
-            figures_generated=list(figures.keys()),
-            params=params,
-            scoring_scenarios=list(weight_scenarios.keys()),
-            sheet_availability=sheet_availability,
-            row_counts=row_counts,
-            bundle_counts=bundle_counts,
-            start_time=start_time,
-            end_time=end_time,
-        )
-        
-        output_paths = write_outputs(
-            str(outdir), all_tables, figures, report_html, runlog, monitoring_tables
-        )
-        
-        # Read outputs into memory
-        xlsx_base64 = None
-        xlsx_path = output_paths.get("xlsx")
-        if xlsx_path and Path(xlsx_path).exists():
-            with open(xlsx_path, "rb") as f:
-                xlsx_base64 = base64.b64encode(f.read()).decode("utf-8")
-        
-        # Create ZIP
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in os.walk(outdir):
-                for file_name in files:
-                    file_path = Path(root) / file_name
-                    arcname = file_path.relative_to(outdir)
-                    zf.write(file_path, arcname)
-        zip_base64 = base64.b64encode(zip_buffer.getvalue()).decode("utf-8")
-        
-        duration = f"{(end_time - start_time).total_seconds():.1f}s"
-        
-        return JSONResponse(content={
-            "success": True,
-            "tables_count": len(all_tables),
-            "figures_count": len(figures),
-            "duration": duration,
-            "warnings": warnings,
-            "bundles_overall": bundle_counts.get("overall", 0),
-            "bundles_by_grupo": bundle_counts.get("by_grupo", 0),
-            "indicators_count": len(monitoring_tables.get("INDICATORS", pd.DataFrame())),
-            "xlsx_base64": xlsx_base64,
-            "report_html": report_html,
-            "zip_base64": zip_base64,
-        })
-        
-    except Exception as e:
-        import traceback
-        return JSONResponse(
-            status_code=500,
-            content={"error": str(e), "traceback": traceback.format_exc()},
+            return FastJSONResponse(content=result)
+            
+        except UploadTooLarge:
+            raise
+        except ImportError as e:
+            return FastJSONResponse(
+                status_code=500,
+                content={"error": f"Failed to import storyline{sid} module: {e}"},
+            )
+        except Exception as e:
+            import traceback
+            return FastJSONResponse(
+                status_code=500,
+                content={"error": str(e), "traceback": traceback.format_exc()},
+            )
+
+
+def _storyline_alias(sid: int):
+    async def analyze(
+        file: UploadFile = File(...),
+        top_n: int = Form(10),
+        include_figures: bool = Form(True),
+        include_report: bool = Form(True),
+        lang: str = Form("es"),
+        org_name: str = Form("Organización"),
+        response_format: ResponseFormat = Form("both"),
+    ):
+        return await analyze_storyline(
+            sid, file, top_n, include_figures, include_report, lang, org_name, response_format
         )
-    finally:
-        # Cleanup
-        tables = None
-        metrics = None
-        portfolio_tables = None
-        monitoring_tables = None
-        figures = None
-        gc.collect()
-        
-        try:
-            shutil.rmtree(tmpdir, ignore_errors=True)
-        except Exception:
-            pass
+    analyze.__name__ = f"analyze_storyline{sid}"
+    return analyze
+
+
+# Original per-storyline URLs, kept for the UI and existing clients
+for _sid in STORYLINE_RUNNERS:
+    app.add_api_route(
+        f"/analyze/storyline{_sid}", _storyline_alias(_sid), methods=["POST"],
+        summary=f"Run Storyline {_sid} analysis: {STORYLINE_REQUIREMENTS[_sid]['description']}",
+    )
 
 
 # ============================================================
@@ -1054,6 +1151,37 @@ def read_dashboard():
     return FileResponse(ui_path)
 
 
+def _dashboard_payload(generate_dashboard, input_path: Path, outdir: Path, org_name: str) -> dict:
+    start_time = datetime.now()
+    
+    # Generate dashboard
+    html_path, bundle_path, qa_path = generate_dashboard(
+        str(input_path),
+        str(outdir),
+        org_name=org_name
+    )
+    
+    end_time = datetime.now()
+    duration = f"{(end_time - start_time).total_seconds():.1f}s"
+    
+    # Read outputs
+    html_content = None
+    if Path(html_path).exists():
+        with open(html_path, "r", encoding="utf-8") as f:
+            html_content = f.read()
+    
+    zip_buffer = _zip_directory(outdir)
+    # getbuffer() exposes the archive without copying it out of the BytesIO
+    zip_base64 = base64.b64encode(zip_buffer.getbuffer()).decode("ascii")
+    
+    return {
+        "success": True,
+        "duration": duration,
+        "html_content": html_content,
+        "zip_base64": zip_base64,
+    }
+
+
 @app.post("/api/dashboard")
 async def generate_dashboard_api(
     file: UploadFile = File(...),
@@ -1070,66 +1198,30 @@ async def generate_dashboard_api(
     try:
         from .dashboard_generator import generate_dashboard
     except ImportError as e:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={"error": f"Failed to import dashboard_generator module: {e}"},
         )
     
-    content = await file.read()
-    tmpdir = tempfile.mkdtemp()
-    
-    try:
-        # Save uploaded file
-        input_path = Path(tmpdir) / file.filename
-        input_path.write_bytes(content)
-        
-        outdir = Path(tmpdir) / "output"
-        outdir.mkdir()
-        
-        start_time = datetime.now()
-        
-        # Generate dashboard
-        html_path, bundle_path, qa_path = generate_dashboard(
-            str(input_path),
-            str(outdir),
-            org_name=org_name
-        )
-        
-        end_time = datetime.now()
-        duration = f"{(end_time - start_time).total_seconds():.1f}s"
-        
-        # Read outputs
-        html_content = None
-        if Path(html_path).exists():
-            with open(html_path, "r", encoding="utf-8") as f:
-                html_content = f.read()
-        
-        # Create ZIP
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in os.walk(outdir):
-                for file_name in files:
-                    file_path = Path(root) / file_name
-                    arcname = file_path.relative_to(outdir)
-                    zf.write(file_path, arcname)
-        zip_base64 = base64.b64encode(zip_buffer.getvalue()).decode("utf-8")
-        
-        return JSONResponse(content={
-            "success": True,
-            "duration": duration,
-            "html_content": html_content,
-            "zip_base64": zip_base64,
-        })
-        
-    except Exception as e:
-        import traceback
-        return JSONResponse(
-            status_code=500,
-            content={"error": str(e), "traceback": traceback.format_exc()},
-        )
-    finally:
-        gc.collect()
+    # Removed on exit even when the handler fails; TMPDIR may point at a tmpfs
+    with tempfile.TemporaryDirectory(prefix="dashboard_", ignore_cleanup_errors=True) as tmpdir:
         try:
-            shutil.rmtree(tmpdir, ignore_errors=True)
-        except Exception:
-            pass
+            input_path = await spool_upload(file, Path(tmpdir) / file.filename)
+            
+            outdir = Path(tmpdir) / "output"
+            outdir.mkdir()
+            
+            # Generation, file reads and the ZIP are blocking work: keep them off the loop
+            result = await asyncio.to_thread(
+                _dashboard_payload, generate_dashboard, input_path, outdir, org_name
+            )
+            return FastJSONResponse(content=result)
+            
+        except UploadTooLarge:
+            raise
+        except Exception as e:
+            import traceback
+            return FastJSONResponse(
+                status_code=500,
+                content={"error": str(e), "traceback": traceback.format_exc()},
+            )
@@ -13,6 +13,12 @@ def canonical_text(x: Any) -> str:
     s = re.sub(r"\s+", " ", s)
     return s.lower()
 
+def canonical_text_series(s: pd.Series) -> pd.Series:
+    """canonical_text() for a whole Series, with vectorised .str passes instead of apply."""
+    t = s.astype("string").str.normalize("NFKC").str.strip()
+    t = t.str.replace(r"\s+", " ", regex=True).str.lower()
+    return t.fillna("").astype(str)
+
 def test():
     inputs = [
         np.nan,
@@ -50,5 +56,16 @@ def test():
     except Exception as e:
         print(f"Object Series apply ERROR: {e}")
 
+    print("\nTesting vectorised canonical_text_series...")
+    try:
+        expected = s.apply(canonical_text)
+        result = canonical_text_series(s)
+        if result.equals(expected):
+            print("Vectorised result matches apply")
+        else:
+            print(f"Vectorised MISMATCH:\n{pd.DataFrame({'apply': expected, 'vectorised': result})}")
+    except Exception as e:
+        print(f"Vectorised ERROR: {e}")
+
 if __name__ == "__main__":
     test()
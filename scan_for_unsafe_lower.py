@@ -1,6 +1,21 @@
 
 import ast
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+SKIP_DIRS = {".git", ".venv", "__pycache__", "node_modules", ".agent", ".system_generated"}
+
+def is_safe_receiver(obj):
+    # 1. str(x).lower()
+    if isinstance(obj, ast.Call) and isinstance(obj.func, ast.Name) and obj.func.id == "str":
+        return True
+    # 2. "literal".lower()
+    if isinstance(obj, ast.Constant) and isinstance(obj.value, str):
+        return True
+    # 3. df['col'].str.lower()
+    if isinstance(obj, ast.Attribute) and obj.attr == "str":
+        return True
+    return False
 
 def check_file(filepath):
     with open(filepath, "r", encoding="utf-8") as f:
@@ -10,56 +25,49 @@ def check_file(filepath):
         except Exception:
             return []
     
-    unsafe_calls = []
+    unsafe_nodes = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "lower"):
+            continue
+        if not is_safe_receiver(node.func.value):
+            unsafe_nodes.append(node)
     
-    class Visitor(ast.NodeVisitor):
-        def visit_Call(self, node):
-            if isinstance(node.func, ast.Attribute) and node.func.attr == "lower":
-                obj = node.func.value
-                
-                # Check for safe patterns
-                is_safe = False
-                
-                # 1. str(x).lower()
-                if isinstance(obj, ast.Call) and isinstance(obj.func, ast.Name) and obj.func.id == "str":
-                    is_safe = True
-                
-                # 2. "literal".lower()
-                elif isinstance(obj, ast.Constant) and isinstance(obj.value, str):
-                    is_safe = True
-                
-                # 3. df['col'].str.lower()
-                elif isinstance(obj, ast.Attribute) and obj.attr == "str":
-                    is_safe = True
-                
-                if not is_safe:
-                    try:
-                        code_snippet = ast.unparse(node)
-                    except:
-                        code_snippet = "???"
-                    unsafe_calls.append((node.lineno, code_snippet))
-            self.generic_visit(node)
-
-    Visitor().visit(tree)
+    # ast.walk is breadth-first; report in source order like a visitor would
+    unsafe_nodes.sort(key=lambda n: (n.lineno, n.col_offset))
+    unsafe_calls = []
+    for node in unsafe_nodes:
+        try:
+            code_snippet = ast.unparse(node)
+        except:
+            code_snippet = "???"
+        unsafe_calls.append((node.lineno, code_snippet))
     return unsafe_calls
 
+def iter_py_files(root_dir):
+    # Same order as os.walk: a directory's files first, then its subdirectories
+    subdirs = []
+    with os.scandir(root_dir) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS:
+                    subdirs.append(entry.path)
+            elif entry.name.endswith(".py"):
+                yield entry.path
+    for path in subdirs:
+        yield from iter_py_files(path)
+
 def main():
     import sys
     root_dir = sys.argv[1] if len(sys.argv) > 1 else "."
-    skip_dirs = {".git", ".venv", "__pycache__", "node_modules", ".agent", ".system_generated"}
+    paths = list(iter_py_files(root_dir))
     
-    for root, dirs, files in os.walk(root_dir):
-        # Modify dirs in-place to skip
-        dirs[:] = [d for d in dirs if d not in skip_dirs]
-        
-        for file in files:
-            if file.endswith(".py"):
-                path = os.path.join(root, file)
-                issues = check_file(path)
-                if issues:
-                    print(f"File: {path}")
-                    for lineno, code in issues:
-                        print(f"  Line {lineno}: {code}")
+    # Files parse independently; map() keeps the output in walk order
+    with ProcessPoolExecutor() as pool:
+        for path, issues in zip(paths, pool.map(check_file, paths, chunksize=16)):
+            if issues:
+                print(f"File: {path}")
+                for lineno, code in issues:
+                    print(f"  Line {lineno}: {code}")
 
 if __name__ == "__main__":
     main()
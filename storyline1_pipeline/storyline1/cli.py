@@ -38,7 +38,7 @@ Examples:
 
 Output Structure:
   outdir/
-    tables/           - CSV files for all computed metrics
+    tables/           - CSV (and Parquet, with pyarrow) files for all computed metrics
     figures/          - PNG visualizations
     report/           - storyline1.html diagnostic report
     storyline1_outputs.xlsx - Consolidated Excel workbook
@@ -107,6 +107,20 @@ Output Structure:
         help="Number of top items to include in rankings (default: 10)",
     )
     
+    parser.add_argument(
+        "--no-csv",
+        action="store_true",
+        default=False,
+        help="Skip the per-table CSV files (Parquet files are still written when pyarrow is installed)",
+    )
+    
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        default=False,
+        help="Reuse the parsed sheets of an unchanged workbook from $XDG_CACHE_HOME/pares_converter/storyline1",
+    )
+    
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
@@ -151,7 +165,7 @@ Output Structure:
     try:
         # Step 1: Load tables
         logger.info("Step 1/5: Loading tables from workbook...")
-        tables, warnings = load_tables(str(input_path))
+        tables, warnings = load_tables(str(input_path), use_cache=args.cache)
         
         if strict_mode and warnings:
             logger.error("Strict mode: Missing required sheets. Aborting.")
@@ -202,13 +216,10 @@ Output Structure:
         end_time = datetime.now()
         
         # Build QA summary
-        qa_summary = {}
-        for qa_name in ["QA_INPUT_SCHEMA", "QA_PK_DUPLICATES", "QA_MISSING_IDS", "QA_FOREIGN_KEYS"]:
-            qa_df = tables.get(qa_name)
-            if qa_df is not None and not qa_df.empty:
-                qa_summary[qa_name] = len(qa_df)
-            else:
-                qa_summary[qa_name] = 0
+        qa_summary = {
+            qa_name: 0 if (qa_df := tables.get(qa_name)) is None else qa_df.shape[0]
+            for qa_name in ("QA_INPUT_SCHEMA", "QA_PK_DUPLICATES", "QA_MISSING_IDS", "QA_FOREIGN_KEYS")
+        }
         
         runlog = create_runlog(
             input_path=str(input_path),
@@ -227,6 +238,7 @@ Output Structure:
             figures,
             report_html,
             runlog,
+            write_csv=not args.no_csv,
         )
         
         logger.info("-" * 60)
@@ -5,8 +5,10 @@ Storyline 1 Configuration
 Defines sheet names, column definitions, and lookup dictionaries for code expansion.
 """
 
+import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List
 
 # ---------------------------------------------------------------------------
 # REQUIRED SHEETS (fail gracefully if missing)
@@ -31,6 +33,46 @@ OPTIONAL_SHEETS = [
     "QA_FOREIGN_KEYS",
 ]
 
+# ---------------------------------------------------------------------------
+# EXCEL READER
+# calamine (Rust) parses XLSX many times faster than openpyxl; pandas >= 2.2
+# exposes it as engine="calamine". Fall back to openpyxl when not installed.
+# ---------------------------------------------------------------------------
+
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+# Output workbooks are written with xlsxwriter when installed (it is listed in
+# requirements.txt); openpyxl remains the fallback. The xlsxwriter path writes
+# rows in order, so it runs in constant_memory mode (see io.write_outputs).
+try:
+    import xlsxwriter  # noqa: F401
+    EXCEL_WRITE_ENGINE = "xlsxwriter"
+except ImportError:
+    EXCEL_WRITE_ENGINE = "openpyxl"
+
+# Workbooks at least this big are parsed one sheet per thread (each thread
+# opening its own in-memory copy); below it the single pass is faster
+PARALLEL_READ_MIN_BYTES = 8 * 1024 * 1024
+
+# Parquet needs pyarrow. When installed, output tables are also written as
+# Parquet (zstd) next to the CSVs
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# With --cache, parsed sheets are kept per workbook under CACHE_DIR, keyed on
+# the file's mtime and size, so re-running on an unchanged workbook skips the
+# XLSX parse. Same XDG location as the converter's caches. Parquet when
+# pyarrow is installed, pickle otherwise.
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "pares_converter" / "storyline1"
+CACHE_FORMAT = "parquet" if PARQUET_AVAILABLE else "pickle"
+
 # ---------------------------------------------------------------------------
 # COLUMN DEFINITIONS
 # ---------------------------------------------------------------------------
@@ -60,6 +102,23 @@ PRIORITY_TOTAL_COL = "i_total"
 # Threat severity columns
 THREAT_SEVERITY_COLS = ["magnitud", "frequencia", "tendencia", "suma"]
 
+# Extra pd.read_excel options per sheet. usecols lists the columns the metrics
+# actually read from the wide TIDY sheets, so free-text comment columns are
+# never parsed; a listed column missing from a workbook is not an error.
+# No dtype= here: the numeric columns are coerced after loading because
+# field workbooks may hold text or blanks in them.
+SHEET_SCHEMA: Dict[str, Dict[str, Any]] = {
+    "TIDY_3_2_PRIORIZACION": {
+        "usecols": ["context_id", "mdv_id", "mdv_name", PRIORITY_TOTAL_COL] + PRIORITY_COMPONENT_COLS,
+    },
+    "TIDY_4_1_AMENAZAS": {
+        "usecols": ["context_id", "amenaza_id", "tipo_amenaza", "amenaza"] + THREAT_SEVERITY_COLS,
+    },
+    "TIDY_4_2_1_AMENAZA_MDV": {
+        "usecols": ["context_id", "amenaza_id", "tipo_amenaza", "amenaza", "mdv_id", "mdv_name"] + IMPACT_COLS,
+    },
+}
+
 # ---------------------------------------------------------------------------
 # OUTPUT TABLE NAMES
 # ---------------------------------------------------------------------------
@@ -157,49 +216,72 @@ CONFLICT_TYPE_CODES: Dict[str, str] = {
 
 # ---------------------------------------------------------------------------
 # HELPER FUNCTIONS FOR CODE EXPANSION
+# All lookup tables are merged (with normalised keys) once at import, and the
+# scalar helpers go through one memoised expand(kind, value); they only ever
+# see a handful of distinct codes. typed=True keeps 7 and 7.0 apart (they
+# expand to "7" and "7.0").
 # ---------------------------------------------------------------------------
 
+_EXPANSIONS: Dict[str, Dict[Any, str]] = {
+    "se": {k.upper(): v for k, v in SE_CODE_NAMES.items()},
+    "se_type": {k.upper(): v for k, v in SE_SERVICE_TYPES.items()},
+    "conflict": {k.upper(): v for k, v in CONFLICT_TYPE_CODES.items()},
+    "magnitud": dict(MAGNITUD_NAMES),
+    "frecuencia": dict(FRECUENCIA_NAMES),
+    "tendencia": dict(TENDENCIA_NAMES),
+}
+
+# Kinds keyed by text codes; the others are keyed by integer values
+_CODE_KINDS = frozenset({"se", "se_type", "conflict"})
+
+
+@lru_cache(maxsize=1024, typed=True)
+def expand(kind: str, value: Any) -> str:
+    """
+    Expand a code or value of the given kind to its descriptive name.
+    
+    Args:
+        kind: One of "se", "se_type", "conflict", "magnitud", "frecuencia", "tendencia"
+        value: Code (case/whitespace-insensitive) or numeric value
+        
+    Returns:
+        The name, the value itself if unknown, or "" if empty
+    """
+    names = _EXPANSIONS[kind]
+    if kind in _CODE_KINDS:
+        if not value:
+            return ""
+        key = value if isinstance(value, str) else str(value)
+        return names.get(key.strip().upper(), value)
+    try:
+        return names.get(int(value), str(value))
+    except (ValueError, TypeError):
+        return str(value) if value else ""
+
+
 def expand_se_code(code: str) -> str:
     """Expand ecosystem service code to full name."""
-    if not code:
-        return ""
-    code_upper = str(code).strip().upper()
-    return SE_CODE_NAMES.get(code_upper, code)
+    return expand("se", code)
 
 
 def expand_magnitud(value: int) -> str:
     """Expand magnitude value to descriptive name."""
-    try:
-        val = int(value)
-        return MAGNITUD_NAMES.get(val, str(value))
-    except (ValueError, TypeError):
-        return str(value) if value else ""
+    return expand("magnitud", value)
 
 
 def expand_frecuencia(value: int) -> str:
     """Expand frequency value to descriptive name."""
-    try:
-        val = int(value)
-        return FRECUENCIA_NAMES.get(val, str(value))
-    except (ValueError, TypeError):
-        return str(value) if value else ""
+    return expand("frecuencia", value)
 
 
 def expand_tendencia(value: int) -> str:
     """Expand trend value to descriptive name."""
-    try:
-        val = int(value)
-        return TENDENCIA_NAMES.get(val, str(value))
-    except (ValueError, TypeError):
-        return str(value) if value else ""
+    return expand("tendencia", value)
 
 
 def expand_conflict_type(code: str) -> str:
     """Expand conflict type code to full name."""
-    if not code:
-        return ""
-    code_upper = str(code).strip().upper()
-    return CONFLICT_TYPE_CODES.get(code_upper, code)
+    return expand("conflict", code)
 
 
 # Common abbreviations used in the domain
@@ -5,20 +5,78 @@ Storyline 1 I/O Module
 Handles loading Excel workbooks and writing outputs (CSV, Excel, figures, reports).
 """
 
+import hashlib
+import io
 import json
 import logging
+import os
+import shutil
+import tempfile
+import threading
 import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
-from .config import REQUIRED_SHEETS, OPTIONAL_SHEETS
+try:
+    import orjson  # Rust JSON encoder, native numpy/datetime support
+except ImportError:
+    orjson = None
+
+from .config import (
+    CACHE_DIR,
+    CACHE_FORMAT,
+    EXCEL_ENGINE,
+    EXCEL_WRITE_ENGINE,
+    OPTIONAL_SHEETS,
+    PARALLEL_READ_MIN_BYTES,
+    PARQUET_AVAILABLE,
+    REQUIRED_SHEETS,
+    SHEET_SCHEMA,
+)
 
 logger = logging.getLogger(__name__)
 
 
+# Workbooks kept open by load_sheet, least recently used first
+_OPEN_WORKBOOKS: "OrderedDict[Tuple[str, int], pd.ExcelFile]" = OrderedDict()
+_OPEN_WORKBOOKS_MAX = 4
+_open_workbooks_lock = threading.Lock()
+
+
+def _open_workbook(xlsx_path: str, mtime_ns: int) -> pd.ExcelFile:
+    """
+    Open (and keep) a workbook for repeated load_sheet calls.
+    
+    mtime_ns makes an edited file reopen; its older handle and any handle
+    evicted beyond _OPEN_WORKBOOKS_MAX are closed.
+    """
+    key = (xlsx_path, mtime_ns)
+    with _open_workbooks_lock:
+        xls = _OPEN_WORKBOOKS.pop(key, None)
+        if xls is None:
+            for stale in [k for k in _OPEN_WORKBOOKS if k[0] == xlsx_path]:
+                _OPEN_WORKBOOKS.pop(stale).close()
+            engine_kwargs = {"read_only": True, "data_only": True} if EXCEL_ENGINE == "openpyxl" else {}
+            xls = pd.ExcelFile(xlsx_path, engine=EXCEL_ENGINE, engine_kwargs=engine_kwargs)
+        _OPEN_WORKBOOKS[key] = xls
+        while len(_OPEN_WORKBOOKS) > _OPEN_WORKBOOKS_MAX:
+            _OPEN_WORKBOOKS.popitem(last=False)[1].close()
+    return xls
+
+
+def clear_workbook_cache() -> None:
+    """Close the workbook handles kept by load_sheet (for long-running processes)."""
+    with _open_workbooks_lock:
+        while _OPEN_WORKBOOKS:
+            _OPEN_WORKBOOKS.popitem()[1].close()
+
+
 def load_sheet(xlsx_path: str, sheet_name: str) -> pd.DataFrame:
     """
     Load a single sheet from an Excel workbook.
@@ -31,7 +89,8 @@ def load_sheet(xlsx_path: str, sheet_name: str) -> pd.DataFrame:
         DataFrame with sheet contents, or empty DataFrame if sheet not found
     """
     try:
-        df = pd.read_excel(xlsx_path, sheet_name=sheet_name, engine="openpyxl")
+        xls = _open_workbook(str(xlsx_path), Path(xlsx_path).stat().st_mtime_ns)
+        df = pd.read_excel(xls, sheet_name=sheet_name)
         logger.debug(f"Loaded sheet '{sheet_name}' with {len(df)} rows")
         return df
     except ValueError as e:
@@ -42,12 +101,140 @@ def load_sheet(xlsx_path: str, sheet_name: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def load_tables(xlsx_path: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+def _read_options(sheet_name: str) -> Dict[str, Any]:
+    """pd.read_excel keyword arguments for a sheet, from config.SHEET_SCHEMA."""
+    options = dict(SHEET_SCHEMA.get(sheet_name, {}))
+    if "usecols" in options:
+        # A callable instead of the list, so absent columns are simply skipped
+        options["usecols"] = frozenset(options["usecols"]).__contains__
+    return options
+
+
+def _read_sheets(xlsx_path: str) -> Dict[str, pd.DataFrame]:
+    """
+    Parse the required/optional sheets present in a workbook, opening it once.
+    
+    Uses calamine when available. The openpyxl fallback streams the file
+    (read_only) and returns cached formula values (data_only), so cell
+    styles and formulas are never materialised.
+    """
+    engine_kwargs = {"read_only": True, "data_only": True} if EXCEL_ENGINE == "openpyxl" else {}
+    with pd.ExcelFile(xlsx_path, engine=EXCEL_ENGINE, engine_kwargs=engine_kwargs) as xls:
+        wanted = [s for s in REQUIRED_SHEETS + OPTIONAL_SHEETS if s in xls.sheet_names]
+        workers = min(8, len(wanted), os.cpu_count() or 1)
+        if workers < 2 or Path(xlsx_path).stat().st_size < PARALLEL_READ_MIN_BYTES:
+            # One call for all plain sheets (a list of names returns a dict; an
+            # empty list is an error in pandas), then the ones with options
+            plain = [s for s in wanted if s not in SHEET_SCHEMA]
+            sheets = pd.read_excel(xls, sheet_name=plain) if plain else {}
+            for sheet_name in wanted:
+                if sheet_name in SHEET_SCHEMA:
+                    sheets[sheet_name] = pd.read_excel(xls, sheet_name=sheet_name, **_read_options(sheet_name))
+            return sheets
+    
+    # Large workbook: sheet XML parsing dominates, so parse sheets concurrently.
+    # Readers are not thread-safe, so every thread opens its own BytesIO copy.
+    raw = Path(xlsx_path).read_bytes()
+    
+    def _load(sheet_name: str) -> pd.DataFrame:
+        return pd.read_excel(
+            io.BytesIO(raw), sheet_name=sheet_name, engine=EXCEL_ENGINE, engine_kwargs=engine_kwargs,
+            **_read_options(sheet_name),
+        )
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(wanted, pool.map(_load, wanted)))
+
+
+def _cache_dir(xlsx_path: str) -> Path:
+    """
+    Cache directory for a workbook's parsed sheets.
+    
+    One folder per workbook (hash of its resolved path plus the reader
+    settings and pandas version), with a subfolder per version keyed on
+    mtime and size.
+    """
+    path = Path(xlsx_path).resolve()
+    stat = path.stat()
+    ident = f"{path}|{EXCEL_ENGINE}|{pd.__version__}|{sorted(SHEET_SCHEMA.items())!r}"
+    digest = hashlib.sha1(ident.encode("utf-8")).hexdigest()[:16]
+    return CACHE_DIR / digest / f"{stat.st_mtime_ns}_{stat.st_size}"
+
+
+def _read_cache(cache_dir: Path) -> Optional[Dict[str, pd.DataFrame]]:
+    """Load cached sheets, or None when there is no complete cache entry."""
+    manifest = cache_dir / "sheets.json"
+    if not manifest.exists():
+        return None
+    names = json.loads(manifest.read_text(encoding="utf-8"))
+    if CACHE_FORMAT == "parquet":
+        return {name: pd.read_parquet(cache_dir / f"{name}.parquet") for name in names}
+    return {name: pd.read_pickle(cache_dir / f"{name}.pkl") for name in names}
+
+
+def _write_cache(cache_dir: Path, sheets: Dict[str, pd.DataFrame]) -> None:
+    """
+    Store parsed sheets, then drop the entries for older versions of the workbook.
+    
+    The entry is written to a private temporary folder and renamed into
+    place, so concurrent runs never see (or delete) a half-written entry.
+    """
+    cache_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=cache_dir.parent))
+    try:
+        for name, df in sheets.items():
+            if CACHE_FORMAT == "parquet":
+                df.to_parquet(tmp_dir / f"{name}.parquet", compression="zstd", index=False)
+            else:
+                df.to_pickle(tmp_dir / f"{name}.pkl")
+        (tmp_dir / "sheets.json").write_text(json.dumps(list(sheets)), encoding="utf-8")
+        try:
+            os.replace(tmp_dir, cache_dir)
+        except OSError:
+            # Another run stored this version first
+            pass
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    for entry in cache_dir.parent.iterdir():
+        if entry != cache_dir and not entry.name.startswith("."):
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def _read_sheets_cached(xlsx_path: str) -> Dict[str, pd.DataFrame]:
+    """_read_sheets through the on-disk cache; cache failures fall back to the workbook."""
+    try:
+        cache_dir = _cache_dir(xlsx_path)
+        cached = _read_cache(cache_dir)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable sheet cache: {e}")
+        cache_dir, cached = None, None
+    if cached is not None:
+        logger.info(f"Loaded {len(cached)} sheets from cache: {cache_dir}")
+        return cached
+    
+    sheets = _read_sheets(xlsx_path)
+    if cache_dir is not None:
+        try:
+            _write_cache(cache_dir, sheets)
+        except Exception as e:
+            logger.warning(f"Could not cache parsed sheets: {e}")
+    return sheets
+
+
+def load_tables(
+    xlsx_path: str,
+    sheets: Optional[Dict[str, pd.DataFrame]] = None,
+    use_cache: bool = False,
+) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
     """
     Load all required and optional tables from an analysis-ready workbook.
     
     Args:
         xlsx_path: Path to the Excel file
+        sheets: Already-parsed sheets of the workbook; when given, the file
+            is not reopened
+        use_cache: Reuse/store the parsed sheets under config.CACHE_DIR
         
     Returns:
         Tuple of (tables_dict, warnings_list)
@@ -57,18 +244,19 @@ def load_tables(xlsx_path: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
     tables: Dict[str, pd.DataFrame] = {}
     warnings_list: List[str] = []
     
-    # Get available sheet names
-    try:
-        xls = pd.ExcelFile(xlsx_path, engine="openpyxl")
-        available_sheets = set(xls.sheet_names)
-    except Exception as e:
-        logger.error(f"Failed to open workbook: {e}")
-        raise
+    # Read the workbook (unless the caller already parsed it)
+    if sheets is None:
+        try:
+            sheets = _read_sheets_cached(xlsx_path) if use_cache else _read_sheets(xlsx_path)
+        except Exception as e:
+            logger.error(f"Failed to read workbook: {e}")
+            raise
+    available_sheets = set(sheets)
     
     # Load required sheets
     for sheet_name in REQUIRED_SHEETS:
         if sheet_name in available_sheets:
-            tables[sheet_name] = pd.read_excel(xls, sheet_name=sheet_name)
+            tables[sheet_name] = sheets[sheet_name]
             logger.info(f"Loaded required sheet: {sheet_name} ({len(tables[sheet_name])} rows)")
         else:
             tables[sheet_name] = pd.DataFrame()
@@ -79,7 +267,7 @@ def load_tables(xlsx_path: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
     # Load optional sheets (QA tables)
     for sheet_name in OPTIONAL_SHEETS:
         if sheet_name in available_sheets:
-            tables[sheet_name] = pd.read_excel(xls, sheet_name=sheet_name)
+            tables[sheet_name] = sheets[sheet_name]
             logger.info(f"Loaded optional sheet: {sheet_name} ({len(tables[sheet_name])} rows)")
         else:
             tables[sheet_name] = pd.DataFrame()
@@ -88,12 +276,45 @@ def load_tables(xlsx_path: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
     return tables, warnings_list
 
 
+def _write_workbook_xlsxwriter(xlsx_path: Path, tables: Dict[str, pd.DataFrame]) -> None:
+    """
+    Write one sheet per table straight through xlsxwriter.
+    
+    Skips pandas' per-cell ExcelCell pipeline. Rows are written in order, so
+    constant_memory mode applies (each row is flushed to disk once written).
+    Cells come out as with df.to_excel: the bold/bordered header, blank NaN,
+    "inf"/"-inf" text for infinities and formatted datetimes.
+    """
+    import xlsxwriter
+    
+    workbook = xlsxwriter.Workbook(str(xlsx_path), {
+        "constant_memory": True,
+        "nan_inf_to_errors": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    })
+    try:
+        header_format = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+        for table_name, df in tables.items():
+            # Truncate sheet name to 31 chars (Excel limit)
+            worksheet = workbook.add_worksheet(table_name[:31])
+            worksheet.write_row(0, 0, [str(c) for c in df.columns], header_format)
+            # Python scalars with NaN/NaT as None (blank cells) and infinities as
+            # text, like pandas' na_rep/inf_rep
+            values = df.astype(object).where(df.notna(), None).replace({np.inf: "inf", -np.inf: "-inf"})
+            for row_idx, row in enumerate(values.itertuples(index=False, name=None), start=1):
+                worksheet.write_row(row_idx, 0, row)
+    finally:
+        workbook.close()
+
+
 def write_outputs(
     outdir: str,
     tables_dict: Dict[str, pd.DataFrame],
     figures_dict: Optional[Dict[str, str]] = None,
     report_html: Optional[str] = None,
     runlog_dict: Optional[Dict[str, Any]] = None,
+    write_csv: bool = True,
+    write_parquet: Optional[bool] = None,
 ) -> Dict[str, str]:
     """
     Write all outputs to the specified directory.
@@ -104,6 +325,9 @@ def write_outputs(
         figures_dict: Dict of figure_name -> figure_path (already saved)
         report_html: HTML report string
         runlog_dict: Run log dictionary
+        write_csv: Write each table as tables/<name>.csv
+        write_parquet: Write each table as tables/<name>.parquet
+            (default: when pyarrow is installed)
         
     Returns:
         Dict mapping output type to path
@@ -120,36 +344,64 @@ def write_outputs(
     figures_dir.mkdir(parents=True, exist_ok=True)
     report_dir.mkdir(parents=True, exist_ok=True)
     
-    # Write CSV files
-    for table_name, df in tables_dict.items():
-        if df is not None and not df.empty:
+    if write_parquet is None:
+        write_parquet = PARQUET_AVAILABLE
+    
+    def _write_table(job: Tuple[str, pd.DataFrame]) -> Dict[str, str]:
+        table_name, df = job
+        paths: Dict[str, str] = {}
+        if write_csv:
             csv_path = tables_dir / f"{table_name}.csv"
             df.to_csv(csv_path, index=False, encoding="utf-8-sig")
-            logger.info(f"Wrote CSV: {csv_path}")
-            output_paths[f"csv_{table_name}"] = str(csv_path)
+            paths[f"csv_{table_name}"] = str(csv_path)
+        if write_parquet:
+            parquet_path = tables_dir / f"{table_name}.parquet"
+            try:
+                df.to_parquet(parquet_path, compression="zstd", index=False)
+                paths[f"parquet_{table_name}"] = str(parquet_path)
+            except Exception as e:
+                # e.g. object columns mixing numbers and text
+                logger.warning(f"Could not write Parquet for {table_name}: {e}")
+        return paths
     
-    # Write consolidated Excel workbook
     xlsx_path = outpath / "storyline1_outputs.xlsx"
-    
-    # Count non-empty tables
     non_empty_tables = {k: v for k, v in tables_dict.items() if v is not None and not v.empty}
     
+    def _write_workbook() -> None:
+        if EXCEL_WRITE_ENGINE == "xlsxwriter":
+            _write_workbook_xlsxwriter(xlsx_path, non_empty_tables or {
+                "README": pd.DataFrame({"message": ["No data was generated. Check input file and warnings."]}),
+            })
+        elif non_empty_tables:
+            with pd.ExcelWriter(xlsx_path, engine="openpyxl") as writer:
+                for table_name, df in non_empty_tables.items():
+                    # Truncate sheet name to 31 chars (Excel limit)
+                    sheet_name = table_name[:31] if len(table_name) > 31 else table_name
+                    df.to_excel(writer, sheet_name=sheet_name, index=False)
+        else:
+            # No non-empty tables - create a placeholder workbook
+            with pd.ExcelWriter(xlsx_path, engine="openpyxl") as writer:
+                pd.DataFrame({"message": ["No data was generated. Check input file and warnings."]}).to_excel(
+                    writer, sheet_name="README", index=False
+                )
+    
+    # Write the consolidated Excel workbook and the per-table files concurrently.
+    # The workbook (the slowest artifact) is submitted first; the table writers
+    # are mostly file I/O
+    workers = min(8, len(non_empty_tables) + 1, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        workbook_done = pool.submit(_write_workbook)
+        for paths in pool.map(_write_table, non_empty_tables.items()):
+            for key, path in paths.items():
+                logger.info(f"Wrote {key.split('_', 1)[0].upper()}: {path}")
+            output_paths.update(paths)
+        workbook_done.result()
+    
     if non_empty_tables:
-        with pd.ExcelWriter(xlsx_path, engine="openpyxl") as writer:
-            for table_name, df in non_empty_tables.items():
-                # Truncate sheet name to 31 chars (Excel limit)
-                sheet_name = table_name[:31] if len(table_name) > 31 else table_name
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
         logger.info(f"Wrote Excel workbook: {xlsx_path} ({len(non_empty_tables)} sheets)")
-        output_paths["xlsx"] = str(xlsx_path)
     else:
-        # No non-empty tables - create a placeholder workbook
-        with pd.ExcelWriter(xlsx_path, engine="openpyxl") as writer:
-            pd.DataFrame({"message": ["No data was generated. Check input file and warnings."]}).to_excel(
-                writer, sheet_name="README", index=False
-            )
         logger.warning(f"Wrote empty placeholder Excel workbook: {xlsx_path}")
-        output_paths["xlsx"] = str(xlsx_path)
+    output_paths["xlsx"] = str(xlsx_path)
     
     # Record figure paths (figures are written by plots.py)
     if figures_dict:
@@ -166,8 +418,15 @@ def write_outputs(
     # Write run log
     if runlog_dict:
         runlog_path = outpath / "runlog.json"
-        with open(runlog_path, "w", encoding="utf-8") as f:
-            json.dump(runlog_dict, f, indent=2, ensure_ascii=False, default=str)
+        if orjson is not None:
+            runlog_path.write_bytes(orjson.dumps(
+                runlog_dict,
+                default=str,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+            ))
+        else:
+            with open(runlog_path, "w", encoding="utf-8") as f:
+                json.dump(runlog_dict, f, indent=2, ensure_ascii=False, default=str)
         logger.info(f"Wrote run log: {runlog_path}")
         output_paths["runlog"] = str(runlog_path)
     
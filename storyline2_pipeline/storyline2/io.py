@@ -18,19 +18,28 @@ from .config import ALL_SHEETS, REQUIRED_SHEETS
 logger = logging.getLogger(__name__)
 
 
-def load_sheet(xlsx_path: str, sheet_name: str) -> pd.DataFrame:
+def load_sheet(
+    xlsx_path: str,
+    sheet_name: str,
+    sheets: Optional[Dict[str, pd.DataFrame]] = None,
+) -> pd.DataFrame:
     """
     Load a single sheet from an Excel file.
     
     Args:
         xlsx_path: Path to the Excel file
         sheet_name: Name of the sheet to load
+        sheets: Already-parsed sheets to take the DataFrame from
         
     Returns:
         DataFrame with the sheet contents, or empty DataFrame if not found
     """
     try:
-        df = pd.read_excel(xlsx_path, sheet_name=sheet_name, engine="openpyxl")
+        if sheets is not None:
+            # Shallow copy: the column renaming below must not leak into the shared dict
+            df = sheets[sheet_name].copy(deep=False)
+        else:
+            df = pd.read_excel(xlsx_path, sheet_name=sheet_name, engine="openpyxl")
         # Normalize column names
         df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
         logger.debug(f"Loaded sheet '{sheet_name}' with {len(df)} rows, {len(df.columns)} columns")
@@ -40,13 +49,19 @@ def load_sheet(xlsx_path: str, sheet_name: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def load_tables(xlsx_path: str, sheet_list: Optional[List[str]] = None) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+def load_tables(
+    xlsx_path: str,
+    sheet_list: Optional[List[str]] = None,
+    sheets: Optional[Dict[str, pd.DataFrame]] = None,
+) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
     """
     Load multiple sheets from an Excel file.
     
     Args:
         xlsx_path: Path to the Excel file
         sheet_list: List of sheet names to load (default: ALL_SHEETS from config)
+        sheets: Already-parsed sheets of the workbook; when given, the file
+            is not reopened
         
     Returns:
         Tuple of (dict mapping sheet name to DataFrame, list of warnings)
@@ -59,8 +74,11 @@ def load_tables(xlsx_path: str, sheet_list: Optional[List[str]] = None) -> Tuple
     
     # Get available sheets
     try:
-        xl = pd.ExcelFile(xlsx_path, engine="openpyxl")
-        available_sheets = xl.sheet_names
+        if sheets is not None:
+            available_sheets = list(sheets)
+        else:
+            xl = pd.ExcelFile(xlsx_path, engine="openpyxl")
+            available_sheets = xl.sheet_names
         logger.info(f"Excel file has {len(available_sheets)} sheets")
     except Exception as e:
         logger.error(f"Failed to open Excel file: {e}")
@@ -69,7 +87,7 @@ def load_tables(xlsx_path: str, sheet_list: Optional[List[str]] = None) -> Tuple
     # Load each requested sheet
     for sheet_name in sheet_list:
         if sheet_name in available_sheets:
-            df = load_sheet(xlsx_path, sheet_name)
+            df = load_sheet(xlsx_path, sheet_name, sheets)
             tables[sheet_name] = df
             logger.info(f"Loaded {sheet_name}: {len(df)} rows")
         else:
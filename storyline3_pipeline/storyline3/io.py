@@ -9,10 +9,18 @@ from .config import REQUIRED_SHEETS, OPTIONAL_SHEETS
 
 logger = logging.getLogger(__name__)
 
-def load_sheet(xlsx_path: str, sheet_name: str) -> pd.DataFrame:
+def load_sheet(
+    xlsx_path: str,
+    sheet_name: str,
+    sheets: Optional[Dict[str, pd.DataFrame]] = None,
+) -> pd.DataFrame:
     """Safe load a sheet from an Excel file."""
     try:
-        df = pd.read_excel(xlsx_path, sheet_name=sheet_name, engine="openpyxl")
+        if sheets is not None:
+            # Shallow copy: the column renaming below must not leak into the shared dict
+            df = sheets[sheet_name].copy(deep=False)
+        else:
+            df = pd.read_excel(xlsx_path, sheet_name=sheet_name, engine="openpyxl")
         # Normalize column names for consistent processing
         df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
         return df
@@ -20,14 +28,23 @@ def load_sheet(xlsx_path: str, sheet_name: str) -> pd.DataFrame:
         logger.warning(f"Could not load sheet {sheet_name}: {e}")
         return pd.DataFrame()
 
-def load_tables(xlsx_path: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
-    """Load all relevant sheets and return tables plus warnings."""
+def load_tables(
+    xlsx_path: str,
+    sheets: Optional[Dict[str, pd.DataFrame]] = None,
+) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+    """Load all relevant sheets and return tables plus warnings.
+
+    ``sheets`` may hold the already-parsed workbook so it is not reopened.
+    """
     tables = {}
     warnings = []
     
     try:
-        xl = pd.ExcelFile(xlsx_path, engine="openpyxl")
-        available_sheets = xl.sheet_names
+        if sheets is not None:
+            available_sheets = list(sheets)
+        else:
+            xl = pd.ExcelFile(xlsx_path, engine="openpyxl")
+            available_sheets = xl.sheet_names
     except Exception as e:
         logger.error(f"Failed to open Excel file: {e}")
         raise ValueError(f"Cannot open Excel file: {e}")
@@ -35,7 +52,7 @@ def load_tables(xlsx_path: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
     # Load required sheets
     for sheet in REQUIRED_SHEETS:
         if sheet in available_sheets:
-            df = load_sheet(xlsx_path, sheet)
+            df = load_sheet(xlsx_path, sheet, sheets)
             tables[sheet] = df
         else:
             tables[sheet] = pd.DataFrame()
@@ -44,7 +61,7 @@ def load_tables(xlsx_path: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
     # Load optional sheets
     for sheet in OPTIONAL_SHEETS:
         if sheet in available_sheets:
-            df = load_sheet(xlsx_path, sheet)
+            df = load_sheet(xlsx_path, sheet, sheets)
             tables[sheet] = df
         else:
             tables[sheet] = pd.DataFrame()
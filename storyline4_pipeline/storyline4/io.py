@@ -8,7 +8,7 @@ import logging
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
 
@@ -17,19 +17,28 @@ from .config import REQUIRED_SHEETS, OPTIONAL_SHEETS
 logger = logging.getLogger(__name__)
 
 
-def load_sheet(xlsx_path: str, sheet_name: str) -> pd.DataFrame:
+def load_sheet(
+    xlsx_path: str,
+    sheet_name: str,
+    sheets: Optional[Dict[str, pd.DataFrame]] = None,
+) -> pd.DataFrame:
     """
     Safe load a sheet from an Excel file.
     
     Args:
         xlsx_path: Path to Excel file
         sheet_name: Name of sheet to load
+        sheets: Already-parsed sheets to take the DataFrame from
         
     Returns:
         DataFrame with normalized column names, or empty DataFrame on error
     """
     try:
-        df = pd.read_excel(xlsx_path, sheet_name=sheet_name, engine="openpyxl")
+        if sheets is not None:
+            # Shallow copy: the column renaming below must not leak into the shared dict
+            df = sheets[sheet_name].copy(deep=False)
+        else:
+            df = pd.read_excel(xlsx_path, sheet_name=sheet_name, engine="openpyxl")
         # Normalize column names for consistent processing
         df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
         return df
@@ -38,12 +47,17 @@ def load_sheet(xlsx_path: str, sheet_name: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def load_tables(xlsx_path: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+def load_tables(
+    xlsx_path: str,
+    sheets: Optional[Dict[str, pd.DataFrame]] = None,
+) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
     """
     Load all relevant sheets and return tables plus warnings.
     
     Args:
         xlsx_path: Path to Excel file
+        sheets: Already-parsed sheets of the workbook; when given, the file
+            is not reopened
         
     Returns:
         Tuple of (tables dict, warnings list)
@@ -52,8 +66,11 @@ def load_tables(xlsx_path: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
     warnings = []
     
     try:
-        xl = pd.ExcelFile(xlsx_path, engine="openpyxl")
-        available_sheets = xl.sheet_names
+        if sheets is not None:
+            available_sheets = list(sheets)
+        else:
+            xl = pd.ExcelFile(xlsx_path, engine="openpyxl")
+            available_sheets = xl.sheet_names
     except Exception as e:
         logger.error(f"Failed to open Excel file: {e}")
         raise ValueError(f"Cannot open Excel file: {e}")
@@ -61,7 +78,7 @@ def load_tables(xlsx_path: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
     # Load required sheets
     for sheet in REQUIRED_SHEETS:
         if sheet in available_sheets:
-            df = load_sheet(xlsx_path, sheet)
+            df = load_sheet(xlsx_path, sheet, sheets)
             tables[sheet] = df
             logger.info(f"Loaded required sheet {sheet}: {len(df)} rows")
         else:
@@ -72,7 +89,7 @@ def load_tables(xlsx_path: str) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
     # Load optional sheets
     for sheet in OPTIONAL_SHEETS:
         if sheet in available_sheets:
-            df = load_sheet(xlsx_path, sheet)
+            df = load_sheet(xlsx_path, sheet, sheets)
             tables[sheet] = df
             logger.info(f"Loaded optional sheet {sheet}: {len(df)} rows")
         else:
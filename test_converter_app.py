@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Behaviour checks for pares_converter/app/main.py helpers."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, ".")
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pares_converter.app import main
+
+
+def test_qa_total_skips_missing_counts():
+    # qa_validate emits NaN counts for tables whose columns are missing
+    tables = {
+        "QA_MISSING_IDS": pd.DataFrame({"missing": [2, np.nan], "note": ["", "col_missing"]}),
+        "QA_FOREIGN_KEYS": pd.DataFrame({"missing_fk": [np.nan], "note": ["missing_columns"]}),
+        "QA_PK_DUPLICATES": pd.DataFrame(),
+    }
+    assert main._qa_total(tables, "QA_MISSING_IDS", "missing") == 2
+    assert main._qa_total(tables, "QA_FOREIGN_KEYS", "missing_fk") == 0
+    assert main._qa_total(tables, "QA_PK_DUPLICATES", "duplicate_rows") == 0
+    assert main._qa_total(tables, "QA_ABSENT", "missing") == 0
+
+
+def test_lifespan_does_not_start_the_process_pool():
+    # Spawned workers re-import the caller's __main__; a plain TestClient
+    # session must not start them unless PARES_WARM_POOL asks for it
+    from fastapi.testclient import TestClient
+
+    assert not main.WARM_POOL_AT_STARTUP
+    with TestClient(main.app) as client:
+        assert client.get("/health").status_code == 200
+        assert main._PROCESS_POOL is None
+
+
+def test_spool_upload_copies_and_hashes_in_one_thread_hop(tmp_path, monkeypatch):
+    import asyncio
+    import hashlib
+    import io
+
+    from starlette.datastructures import UploadFile
+
+    payload = bytes(range(256)) * ((3 * main.UPLOAD_CHUNK_SIZE) // 256 + 7)
+    calls = []
+    to_thread = asyncio.to_thread
+
+    async def counting_to_thread(fn, *args):
+        calls.append(fn)
+        return await to_thread(fn, *args)
+
+    monkeypatch.setattr(main.asyncio, "to_thread", counting_to_thread)
+    digest = hashlib.blake2b(digest_size=16)
+    upload = UploadFile(io.BytesIO(payload), filename="book.xlsx")
+    dest = asyncio.run(main.spool_upload(upload, tmp_path / "book.xlsx", digest=digest))
+
+    assert dest.read_bytes() == payload
+    assert digest.hexdigest() == hashlib.blake2b(payload, digest_size=16).hexdigest()
+    assert len(calls) == 1
+
+
+def test_spool_upload_enforces_the_size_limit(tmp_path, monkeypatch):
+    import asyncio
+    import io
+
+    from starlette.datastructures import UploadFile
+
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", main.UPLOAD_CHUNK_SIZE + 10)
+    upload = UploadFile(io.BytesIO(b"x" * (main.UPLOAD_CHUNK_SIZE + 11)), filename="book.xlsx")
+    with pytest.raises(main.UploadTooLarge):
+        asyncio.run(main.spool_upload(upload, tmp_path / "book.xlsx"))
+    assert not (tmp_path / "book.xlsx").exists()
+
+    upload = UploadFile(io.BytesIO(b"x" * (main.UPLOAD_CHUNK_SIZE + 10)), filename="book.xlsx")
+    assert asyncio.run(main.spool_upload(upload, tmp_path / "book.xlsx")).stat().st_size == main.UPLOAD_CHUNK_SIZE + 10
+
+
+@pytest.mark.parametrize("path", ["/validate", "/convert", "/analyze/storyline/1", "/api/dashboard"])
+def test_chunked_upload_over_the_limit_is_rejected(monkeypatch, path):
+    # No Content-Length on a chunked body, so only spool_upload can catch it
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 1000)
+    boundary = "pares-test-boundary"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"book.xlsx\"\r\n"
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + b"x" * 5000 + f"\r\n--{boundary}--\r\n".encode()
+
+    def chunks():
+        for start in range(0, len(body), 512):
+            yield body[start:start + 512]
+
+    with TestClient(main.app) as client:
+        response = client.post(path, content=chunks(),
+                               headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    assert response.status_code == 413
+    assert "tamaño máximo" in response.json()["error"]
+
+
+def test_sheet_names_closes_the_calamine_workbook(tmp_path, monkeypatch):
+    calamine = pytest.importorskip("python_calamine")
+    book = tmp_path / "book.xlsx"
+    with pd.ExcelWriter(book, engine="openpyxl") as writer:
+        pd.DataFrame({"a": [1]}).to_excel(writer, sheet_name="LOOKUP_GEO", index=False)
+        pd.DataFrame({"b": [2]}).to_excel(writer, sheet_name="TIDY_4_1_AMENAZAS", index=False)
+    opened = []
+    from_path = calamine.CalamineWorkbook.from_path
+
+    class Recorder:
+        @staticmethod
+        def from_path(path):
+            opened.append(from_path(path))
+            return opened[-1]
+
+    monkeypatch.setattr(main, "CalamineWorkbook", Recorder)
+    assert main._sheet_names(book) == ["LOOKUP_GEO", "TIDY_4_1_AMENAZAS"]
+    assert len(opened) == 1
+    with pytest.raises(Exception):
+        opened[0].get_sheet_by_index(0)
+
+
+def test_convert_compiles_and_writes_off_the_event_loop(monkeypatch):
+    import asyncio
+
+    from fastapi.testclient import TestClient
+
+    on_loop = {}
+
+    def loop_running():
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return True
+
+    def fake_compile(input_path, strict, copy_raw):
+        on_loop["compile"] = loop_running()
+        return {"LOOKUP_GEO": pd.DataFrame({"geo_id": ["G1"]})}
+
+    def fake_output(tables):
+        on_loop["write"] = loop_running()
+        return b"xlsx", "G1", 0, len(tables)
+
+    monkeypatch.setattr(main, "compile_workbook", fake_compile)
+    monkeypatch.setattr(main, "_convert_output", fake_output)
+    monkeypatch.setattr(main, "UPLOAD_CACHE", main.UploadCache(1 << 20))
+    with TestClient(main.app) as client:
+        response = client.post("/convert", files={"file": ("book.xlsx", b"not really a workbook")})
+    assert response.status_code == 200
+    assert response.headers["X-Converter-GeoId"] == "G1"
+    assert on_loop == {"compile": False, "write": False}
+
+
+def test_run_in_process_pool_runs_in_a_spawned_worker(monkeypatch):
+    import asyncio
+
+    monkeypatch.setenv("PARES_ANALYSIS_WORKERS", "1")
+    try:
+        assert asyncio.run(main.run_in_process_pool(pow, 2, 10)) == 1024
+        assert main._PROCESS_POOL is not None
+    finally:
+        if main._PROCESS_POOL is not None:
+            main._PROCESS_POOL.shutdown()
+        main._PROCESS_POOL = None
+
+
+def test_broken_process_pool_is_shut_down_and_replaced(monkeypatch):
+    import asyncio
+    from concurrent.futures import Executor, Future
+    from concurrent.futures.process import BrokenProcessPool
+
+    class DeadPool(Executor):
+        shutdown_calls = []
+
+        def submit(self, fn, *args, **kwargs):
+            future = Future()
+            future.set_exception(BrokenProcessPool("worker died"))
+            return future
+
+        def shutdown(self, wait=True, *, cancel_futures=False):
+            self.shutdown_calls.append((wait, cancel_futures))
+
+    monkeypatch.setattr(main, "_PROCESS_POOL", DeadPool())
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(main.run_in_process_pool(pow, 2, 10))
+    assert DeadPool.shutdown_calls == [(False, True)]
+    assert main._PROCESS_POOL is None
+
+
+@pytest.mark.parametrize("value, expected", [("1", True), ("true", True), ("Yes", True),
+                                             ("0", False), ("false", False), ("", False)])
+def test_warm_pool_flag_parses_leniently(value, expected):
+    import os
+    import subprocess
+
+    out = subprocess.run(
+        [sys.executable, "-c", "from pares_converter.app import main; print(main.WARM_POOL_AT_STARTUP)"],
+        env=dict(os.environ, PARES_WARM_POOL=value), capture_output=True, text=True, check=True,
+    )
+    assert out.stdout.strip() == str(expected)
+
+
+def test_storyline5_figures_do_not_change_the_plan(tmp_path):
+    # Figures render on a side thread while the monitoring plan is built
+    workbook = Path("FINAL_tv_ZA_analysis_ready_20260114_1026_01.xlsx")
+    with_figures = main._run_storyline5(workbook, tmp_path / "a", 10, True, False, "", "json")
+    without = main._run_storyline5(workbook, tmp_path / "b", 10, False, False, "", "json")
+    assert with_figures["success"] and without["success"]
+    assert with_figures["figures_count"] > 0 and without["figures_count"] == 0
+    for key in ("tables_count", "indicators_count", "bundles_overall", "bundles_by_grupo"):
+        assert with_figures[key] == without[key], key
+    assert len(list((tmp_path / "a" / "figures").glob("*.png"))) == with_figures["figures_count"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
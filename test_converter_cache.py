@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Behaviour checks for the converter's on-disk caches."""
+import os
+import sys
+
+sys.path.insert(0, ".")
+
+import pandas as pd
+import pytest
+
+from pares_converter.app import converter, dashboard_generator
+
+
+def _fake_compile(calls):
+    def compile_workbook(input_path, strict=True, copy_raw=True):
+        calls.append(input_path)
+        return {"LOOKUP_GEO": pd.DataFrame({"geo_id": ["G1"]})}
+    return compile_workbook
+
+
+def test_compile_workbook_cached_reuses_and_rebuilds(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(converter, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(converter, "compile_workbook", _fake_compile(calls))
+    src = tmp_path / "db.xlsx"
+    src.write_bytes(b"workbook")
+
+    first = converter.compile_workbook_cached(str(src))
+    second = converter.compile_workbook_cached(str(src))
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first["LOOKUP_GEO"], second["LOOKUP_GEO"])
+
+    # An entry pickled against a module that no longer exists (e.g. after a
+    # pandas upgrade) is discarded and rebuilt instead of crashing
+    (entry,) = (tmp_path / "cache").glob("*.pkl")
+    entry.write_bytes(b"cmodule_that_was_removed\nThing\n.")
+    third = converter.compile_workbook_cached(str(src))
+    assert len(calls) == 2
+    pd.testing.assert_frame_equal(third["LOOKUP_GEO"], first["LOOKUP_GEO"])
+
+    # Truncated entry
+    entry.write_bytes(entry.read_bytes()[:10])
+    converter.compile_workbook_cached(str(src))
+    assert len(calls) == 3
+
+
+def test_compile_workbook_cached_survives_cache_failures(tmp_path, monkeypatch):
+    calls = []
+    cache = tmp_path / "cache"
+    monkeypatch.setattr(converter, "CACHE_DIR", cache)
+    monkeypatch.setattr(converter, "compile_workbook", _fake_compile(calls))
+    src = tmp_path / "db.xlsx"
+    src.write_bytes(b"workbook")
+
+    # A failed dump leaves neither an entry nor its temp file behind
+    def failing_dump(obj, f, protocol=None):
+        f.write(b"partial")
+        raise TypeError("cannot pickle")
+
+    with monkeypatch.context() as m:
+        m.setattr(converter.pickle, "dump", failing_dump)
+        assert list(converter.compile_workbook_cached(str(src))) == ["LOOKUP_GEO"]
+    assert list(cache.iterdir()) == []
+
+    # Failing to touch a good entry does not throw it away
+    converter.compile_workbook_cached(str(src))
+    assert len(calls) == 2
+
+    def failing_utime(*args, **kwargs):
+        raise PermissionError("read-only cache")
+
+    monkeypatch.setattr(converter.os, "utime", failing_utime)
+    converter.compile_workbook_cached(str(src))
+    assert len(calls) == 2
+    assert len(list(cache.glob("*.pkl"))) == 1
+
+
+def test_malformed_cache_size_falls_back_to_default():
+    import subprocess
+
+    env = dict(os.environ, PARES_CACHE_MB="lots")
+    out = subprocess.run(
+        [sys.executable, "-c", "from pares_converter.app import converter; print(converter.CACHE_MAX_BYTES)"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    assert int(out.stdout) == 512 << 20
+
+
+def test_prune_cache_drops_least_recently_used(tmp_path):
+    for i in range(5):
+        path = tmp_path / f"{i}.pkl"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, ns=(i * 10**9, i * 10**9))
+    (tmp_path / "keep.txt").write_bytes(b"x" * 1000)
+
+    converter.prune_cache(tmp_path, "*.pkl", max_bytes=250)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["3.pkl", "4.pkl", "keep.txt"]
+
+
+def test_dashboard_bundle_cache_is_opt_in(tmp_path, monkeypatch):
+    workbook = "FINAL_ECO_EPG_analysis_ready.xlsx"
+    monkeypatch.setattr(dashboard_generator, "CACHE_DIR", tmp_path / "default")
+
+    # Default: nothing is written outside output_dir
+    dashboard_generator.generate_dashboard(workbook, str(tmp_path / "out0"))
+    assert not (tmp_path / "default").exists()
+
+    cache = tmp_path / "bundles"
+    dashboard_generator.generate_dashboard(workbook, str(tmp_path / "out1"), cache_dir=str(cache))
+    assert len(list(cache.glob("*.bundle.json"))) == 1
+
+    # Served from the cache, the bundle is unchanged
+    monkeypatch.setattr(dashboard_generator, "build_bundle", lambda *a, **k: pytest.fail("bundle rebuilt"))
+    dashboard_generator.generate_dashboard(workbook, str(tmp_path / "out2"), cache_dir=str(cache))
+    assert (tmp_path / "out1" / "bundle.json").read_bytes() == (tmp_path / "out2" / "bundle.json").read_bytes()
+
+
+def test_dashboard_bundle_cache_write_failure_leaves_no_temp_file(tmp_path, monkeypatch):
+    dumps_json = dashboard_generator.dumps_json
+    calls = []
+
+    def failing_first_dump(obj):
+        calls.append(obj)
+        if len(calls) == 1:
+            raise TypeError("not serializable")
+        return dumps_json(obj)
+
+    monkeypatch.setattr(dashboard_generator, "dumps_json", failing_first_dump)
+    cache = tmp_path / "bundles"
+    dashboard_generator.generate_dashboard("FINAL_ECO_EPG_analysis_ready.xlsx", str(tmp_path / "out"),
+                                           cache_dir=str(cache))
+    assert list(cache.iterdir()) == []
+    assert (tmp_path / "out" / "bundle.json").exists()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
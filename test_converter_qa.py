@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Behaviour checks for the converter's QA pass (compile_workbook on the sample database)."""
+import sys
+
+sys.path.insert(0, ".")
+
+import pandas as pd
+import pytest
+
+from pares_converter.app import converter
+
+SAMPLE_DATABASE = "sample_database_general_TIERRAVIVA.xlsx"
+
+
+@pytest.fixture(scope="module")
+def compiled():
+    return converter.compile_workbook(SAMPLE_DATABASE, strict=False)
+
+
+def test_qa_key_tables_match_compiled_schema(compiled):
+    # Every keyed table leads with its primary key, and every FK link names real columns
+    for table, pk in converter.QA_PK.items():
+        assert isinstance(pk, tuple)
+        assert list(compiled[table].columns[:len(pk)]) == list(pk), table
+    for tbl, fk, lookup, lookup_pk in converter.QA_FK_SPECS:
+        assert fk in compiled[tbl].columns, (tbl, fk)
+        assert lookup_pk in compiled[lookup].columns, (lookup, lookup_pk)
+
+    fk_rows = compiled["QA_FOREIGN_KEYS"]
+    assert sorted(zip(fk_rows["table"], fk_rows["fk"])) == sorted(
+        (tbl, fk) for tbl, fk, _, _ in converter.QA_FK_SPECS)
+    assert sorted(compiled["QA_PK_DUPLICATES"]["table"]) == sorted(converter.QA_PK)
+
+
+def test_output_tables_keep_their_id_dtypes(compiled):
+    # QA categorizes ID columns on private copies; the written tables stay object/string
+    for name, df in compiled.items():
+        if name.startswith(("LOOKUP_", "TIDY_")):
+            cats = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+            assert not cats, (name, cats)
+
+
+def test_categorize_id_columns_leaves_inputs_alone():
+    geo = pd.DataFrame({"geo_id": ["G1", "G2"]})
+    ctx = pd.DataFrame({"context_id": ["C1"], "geo_id": ["G3"]})
+    tables = {"LOOKUP_GEO": geo, "LOOKUP_CONTEXT": ctx}
+    out = converter.categorize_id_columns(tables, {"LOOKUP_GEO": ["geo_id"]}, {},
+                                          [("LOOKUP_CONTEXT", "geo_id", "LOOKUP_GEO", "geo_id")])
+    assert tables == {"LOOKUP_GEO": geo, "LOOKUP_CONTEXT": ctx}
+    assert geo["geo_id"].dtype == object or pd.api.types.is_string_dtype(geo["geo_id"])
+    assert not isinstance(ctx["geo_id"].dtype, pd.CategoricalDtype)
+    assert list(out["LOOKUP_CONTEXT"]["geo_id"].cat.categories) == ["G1", "G2", "G3"]
+
+
+def test_qa_reports_missing_columns():
+    tables = {
+        "LOOKUP_GEO": pd.DataFrame({"geo_id": ["G1"]}),
+        "LOOKUP_CONTEXT": pd.DataFrame({"context_id": ["C1"]}),
+    }
+    pk = converter.qa_pk_duplicates(tables, {"LOOKUP_GEO": ["geo_id"], "LOOKUP_CONTEXT": ["context_id", "absent"]})
+    fk = converter.qa_fk(tables, [("LOOKUP_CONTEXT", "geo_id", "LOOKUP_GEO", "geo_id")])
+    assert pk.set_index("table").loc["LOOKUP_CONTEXT", "note"] == "missing_pk_columns"
+    assert fk["note"].tolist() == ["missing_columns"]
+
+
+def test_qa_validate_counts_dangling_string_keys():
+    tables = {
+        "LOOKUP_GEO": pd.DataFrame({"geo_id": ["G1", "G2", None]}),
+        "LOOKUP_CONTEXT": pd.DataFrame({"context_id": ["C1", "C2", "C3", "C4"],
+                                        "geo_id": ["G1", "G9", None, "G2"]}),
+    }
+    _, _, fk = converter.qa_validate(tables, {}, {}, [("LOOKUP_CONTEXT", "geo_id", "LOOKUP_GEO", "geo_id")])
+    assert fk["missing_fk"].tolist() == [1]
+
+    tables["LOOKUP_GEO"] = tables["LOOKUP_GEO"].iloc[:0]
+    _, _, fk = converter.qa_validate(tables, {}, {}, [("LOOKUP_CONTEXT", "geo_id", "LOOKUP_GEO", "geo_id")])
+    assert fk["missing_fk"].tolist() == [3]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
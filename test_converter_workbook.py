@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""write_workbook output: values round-trip and the header matches pandas' to_excel."""
+import sys
+
+sys.path.insert(0, ".")
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from pares_converter.app import converter
+
+
+def test_write_workbook_keeps_values_and_header_style(tmp_path):
+    tables = {
+        "TIDY_EXAMPLE": pd.DataFrame({
+            "geo_id": ["G1", "G2", None],
+            "score": [1.5, np.nan, 3.0],
+            "fecha": pd.to_datetime(["2024-01-02", None, "2024-03-04"]),
+        }),
+        "QA_A_VERY_LONG_SHEET_NAME_THAT_OVERFLOWS": pd.DataFrame({"n": [0]}),
+    }
+    out = tmp_path / "out.xlsx"
+    converter.write_workbook(str(out), tables)
+
+    wb = load_workbook(out)
+    assert wb.sheetnames == ["TIDY_EXAMPLE", "QA_A_VERY_LONG_SHEET_NAME_T..."]
+    header = wb["TIDY_EXAMPLE"][1]
+    assert [c.value for c in header] == ["geo_id", "score", "fecha"]
+    # Same header styling as a plain to_excel (bold + thin border on pandas < 3)
+    ref = tmp_path / "ref.xlsx"
+    tables["TIDY_EXAMPLE"].to_excel(ref, index=False)
+    ref_header = load_workbook(ref).active[1]
+    assert [(c.font.b, c.border.left.style) for c in header] == \
+        [(c.font.b, c.border.left.style) for c in ref_header]
+    wb.close()
+
+    back = pd.read_excel(out, sheet_name="TIDY_EXAMPLE")
+    pd.testing.assert_frame_equal(back, tables["TIDY_EXAMPLE"].astype({"fecha": back["fecha"].dtype}),
+                                  check_dtype=False)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
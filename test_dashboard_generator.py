@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Behaviour checks for pares_converter/app/dashboard_generator.py."""
+import json
+import sys
+
+sys.path.insert(0, ".")
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pares_converter.app import dashboard_generator
+
+
+def test_bundle_json_keeps_nan_values():
+    bundle = {"kpis": {"mean": float("nan"), "n": np.int64(3), "share": np.float64(np.nan)},
+              "rows": [1.5, None]}
+    text = dashboard_generator.dumps_json(bundle).decode("utf-8")
+    assert text == json.dumps(bundle, ensure_ascii=False, indent=2, cls=dashboard_generator.NumpyEncoder)
+    assert '"mean": NaN' in text and '"share": NaN' in text
+    assert f"const BUNDLE = {text};" in dashboard_generator.generate_dashboard_html(bundle)
+
+
+def test_missing_context_ids_keep_their_per_extractor_values(tmp_path):
+    # Blank ids are not normalized at load time: each extractor renders them as before
+    book = tmp_path / "book.xlsx"
+    ids = [None, "C1", "nan"]  # read_excel treats a literal "nan" cell as missing too
+    with pd.ExcelWriter(book, engine="openpyxl") as writer:
+        pd.DataFrame({"context_id": ids, "elemento_se": ["a", "b", "c"], "mdv_name": ["m", "n", "o"]}).to_excel(
+            writer, sheet_name="TIDY_3_5_SE_MDV", index=False)
+        pd.DataFrame({"context_id": ids, "amenaza": ["t1", "t1", "t2"]}).to_excel(
+            writer, sheet_name="TIDY_4_1_AMENAZAS", index=False)
+        pd.DataFrame({"context_id": ids, "amenaza": ["t1", "t1", "t2"], "nr_familias": [1, 2, 3]}).to_excel(
+            writer, sheet_name="TIDY_4_2_1_AMENAZA_MDV", index=False)
+        pd.DataFrame({"context_id": ids, "nombre_actor": ["x", "y", "z"]}).to_excel(
+            writer, sheet_name="TIDY_5_1_ACTORES", index=False)
+        pd.DataFrame({"context_id": ids, "ecosistema": ["e1", "e2", "e3"]}).to_excel(
+            writer, sheet_name="TIDY_3_4_ECOSISTEMAS", index=False)
+
+    with pd.ExcelFile(book) as xl:
+        bundle = dashboard_generator.build_bundle(xl, book.name)
+    assert [c["context_id"] for c in bundle["contexts"]] == [""]
+    assert bundle["kpis"] == {"": {"n_services": 0, "n_livelihoods": 0, "n_threats": 2, "n_actors": 0}}
+    assert [r["context_id"] for r in bundle["threats"]["amenazas"]] == ["0", "C1", "0"]
+    assert [r["context_id"] for r in bundle["actors"]] == [0, "C1", 0]
+    assert [r["context_id"] for r in bundle["ecosystems"]] == ["", "C1", ""]
+    assert [r["context_id"] for r in bundle["lifelines"]["se_mdv"]] == ["", "C1", ""]
+
+
+def test_context_labels_read_grupo_from_either_lookup_sheet(tmp_path):
+    book = tmp_path / "book.xlsx"
+    with pd.ExcelWriter(book, engine="openpyxl") as writer:
+        pd.DataFrame({"context_id": ["C1", "C2"], "geo_id": ["G1", "G2"], "grupo": ["Mujeres", "Hombres"],
+                      "fecha_iso": ["2024-01-01", "2024-02-01"]}).to_excel(
+            writer, sheet_name="LOOKUP_CONTEXT", index=False)
+        pd.DataFrame({"geo_id": ["G1", "G2"], "paisaje": ["P", "P"], "admin0": ["X", "X"]}).to_excel(
+            writer, sheet_name="LOOKUP_GEO", index=False)
+
+    with pd.ExcelFile(book) as xl:
+        contexts = dashboard_generator.build_bundle(xl, book.name)["contexts"]
+    assert [(c["grupo"], c["admin0"], c["label"]) for c in contexts] == [
+        ("Mujeres", "X", "P — Mujeres — 2024-01"),
+        ("Hombres", "X", "P — Hombres — 2024-02"),
+    ]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
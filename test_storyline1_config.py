@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""The memoised storyline1 expand_* helpers give the same answers as the original lookups."""
+import math
+import sys
+
+sys.path.insert(0, "storyline1_pipeline")
+
+import pytest
+
+from storyline1 import config
+
+
+def _code_lookup(names):
+    def lookup(code):
+        if not code:
+            return ""
+        return names.get(str(code).strip().upper(), code)
+    return lookup
+
+
+def _value_lookup(names):
+    def lookup(value):
+        try:
+            return names.get(int(value), str(value))
+        except (ValueError, TypeError):
+            return str(value) if value else ""
+    return lookup
+
+
+HELPERS = [
+    (config.expand_se_code, _code_lookup(config.SE_CODE_NAMES), config.SE_CODE_NAMES),
+    (config.expand_conflict_type, _code_lookup(config.CONFLICT_TYPE_CODES), config.CONFLICT_TYPE_CODES),
+    (config.expand_magnitud, _value_lookup(config.MAGNITUD_NAMES), config.MAGNITUD_NAMES),
+    (config.expand_frecuencia, _value_lookup(config.FRECUENCIA_NAMES), config.FRECUENCIA_NAMES),
+    (config.expand_tendencia, _value_lookup(config.TENDENCIA_NAMES), config.TENDENCIA_NAMES),
+]
+
+
+@pytest.mark.parametrize("helper, reference, names", HELPERS, ids=lambda h: getattr(h, "__name__", ""))
+def test_expand_helpers_match_the_plain_lookups(helper, reference, names):
+    values = [None, "", 0, 0.0, float("nan"), "zzz", 99, "3", 7, 7.0, True]
+    for key in names:
+        values += [key, str(key), f"  {str(key).lower()} "]
+        if isinstance(key, int):
+            values += [float(key), key + 0.6]
+    # Called twice so the second answer comes from the cache
+    for value in values * 2:
+        got, want = helper(value), reference(value)
+        if isinstance(want, float) and math.isnan(want):
+            assert isinstance(got, float) and math.isnan(got), value
+        else:
+            assert (got, type(got)) == (want, type(want)), value
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Behaviour checks for storyline1/io.py (workbook writers, caches, runlog)."""
+import os
+import sys
+
+sys.path.insert(0, "storyline1_pipeline")
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from storyline1 import io as s1io
+
+
+def _mixed_table() -> pd.DataFrame:
+    return pd.DataFrame({
+        "name": ["a", None, "c", "d"],
+        "count": [1, 2, 3, 4],
+        "score": [1.5, np.nan, np.inf, -np.inf],
+        "when": pd.to_datetime(["2024-01-01", None, "2024-03-05 12:30:00", "2023-12-31 00:00:00"], format="mixed"),
+    })
+
+
+def test_xlsxwriter_workbook_matches_to_excel(tmp_path):
+    pytest.importorskip("xlsxwriter")
+    tables = {"mixed": _mixed_table(), "x" * 40: pd.DataFrame({"v": [1]})}
+    
+    direct = tmp_path / "direct.xlsx"
+    s1io._write_workbook_xlsxwriter(direct, tables)
+    reference = tmp_path / "reference.xlsx"
+    with pd.ExcelWriter(reference, engine="openpyxl") as writer:
+        for name, df in tables.items():
+            df.to_excel(writer, sheet_name=name[:31], index=False)
+    
+    got = pd.read_excel(direct, sheet_name=None)
+    expected = pd.read_excel(reference, sheet_name=None)
+    assert list(got) == list(expected) == ["mixed", "x" * 31]
+    for name in expected:
+        pd.testing.assert_frame_equal(got[name], expected[name])
+    assert got["mixed"]["when"].iloc[0] == pd.Timestamp("2024-01-01")
+    assert got["mixed"]["score"].tolist()[2:] == [np.inf, -np.inf]
+
+
+def test_default_write_engine_matches_openpyxl_output(tmp_path, monkeypatch):
+    pytest.importorskip("xlsxwriter")
+    assert s1io.EXCEL_WRITE_ENGINE == "xlsxwriter"
+    tables = {"mixed": _mixed_table(), "counts": pd.DataFrame({"v": range(5)})}
+    
+    default_paths = s1io.write_outputs(str(tmp_path / "default"), tables, write_parquet=False)
+    monkeypatch.setattr(s1io, "EXCEL_WRITE_ENGINE", "openpyxl")
+    openpyxl_paths = s1io.write_outputs(str(tmp_path / "openpyxl"), tables, write_parquet=False)
+    
+    got = pd.read_excel(default_paths["xlsx"], sheet_name=None)
+    expected = pd.read_excel(openpyxl_paths["xlsx"], sheet_name=None)
+    assert list(got) == list(expected)
+    for name in expected:
+        pd.testing.assert_frame_equal(got[name], expected[name])
+
+
+def _small_workbook(path) -> None:
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        pd.DataFrame({"geo_id": ["G1"], "pais": ["X"]}).to_excel(writer, sheet_name="LOOKUP_GEO", index=False)
+        pd.DataFrame({"context_id": ["C1", "C2"], "amenaza_id": ["A1", "A2"], "suma": [3, 5],
+                      "comentario": ["x", "y"]}).to_excel(writer, sheet_name="TIDY_4_1_AMENAZAS", index=False)
+
+
+def test_sheet_cache_round_trip_and_invalidation(tmp_path, monkeypatch):
+    monkeypatch.setattr(s1io, "CACHE_DIR", tmp_path / "cache")
+    xlsx = tmp_path / "in.xlsx"
+    _small_workbook(xlsx)
+    
+    # Off by default
+    plain, _ = s1io.load_tables(str(xlsx))
+    assert not (tmp_path / "cache").exists()
+    
+    first, _ = s1io.load_tables(str(xlsx), use_cache=True)
+    entries = list((tmp_path / "cache").glob("*/*"))
+    assert len(entries) == 1 and not entries[0].name.startswith(".")
+    
+    # Served from the cache: the workbook is not parsed again
+    real_read = s1io._read_sheets
+    monkeypatch.setattr(s1io, "_read_sheets", lambda path: pytest.fail("workbook re-parsed"))
+    second, _ = s1io.load_tables(str(xlsx), use_cache=True)
+    for name in plain:
+        pd.testing.assert_frame_equal(first[name], plain[name])
+        pd.testing.assert_frame_equal(second[name], plain[name])
+    
+    # An edited workbook is re-parsed and replaces the old entry
+    monkeypatch.setattr(s1io, "_read_sheets", real_read)
+    _small_workbook(xlsx)
+    stat = xlsx.stat()
+    os.utime(xlsx, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    s1io.load_tables(str(xlsx), use_cache=True)
+    entries_after = list((tmp_path / "cache").glob("*/*"))
+    assert len(entries_after) == 1 and entries_after != entries
+
+
+def test_sheet_cache_write_tolerates_existing_entry(tmp_path, monkeypatch):
+    monkeypatch.setattr(s1io, "CACHE_DIR", tmp_path / "cache")
+    xlsx = tmp_path / "in.xlsx"
+    _small_workbook(xlsx)
+    sheets = s1io._read_sheets(str(xlsx))
+    cache_dir = s1io._cache_dir(str(xlsx))
+    # A concurrent run stored the same version first
+    s1io._write_cache(cache_dir, sheets)
+    s1io._write_cache(cache_dir, sheets)
+    assert sorted(p.name for p in cache_dir.parent.iterdir()) == [cache_dir.name]
+    assert list(s1io._read_cache(cache_dir)) == list(sheets)
+
+
+def test_load_sheet_closes_evicted_and_stale_workbooks(tmp_path, monkeypatch):
+    opened = []
+    
+    class FakeExcelFile:
+        def __init__(self, path, **kwargs):
+            self.path, self.closed = path, False
+            opened.append(self)
+        
+        def close(self):
+            self.closed = True
+    
+    monkeypatch.setattr(s1io.pd, "ExcelFile", FakeExcelFile)
+    monkeypatch.setattr(s1io.pd, "read_excel", lambda xls, sheet_name: pd.DataFrame({"a": [1]}))
+    s1io.clear_workbook_cache()
+    
+    paths = []
+    for i in range(s1io._OPEN_WORKBOOKS_MAX + 1):
+        path = tmp_path / f"{i}.xlsx"
+        path.write_bytes(b"x")
+        paths.append(path)
+        s1io.load_sheet(str(path), "S")
+    s1io.load_sheet(str(paths[-1]), "S")  # reused, not reopened
+    assert len(opened) == len(paths)
+    assert [x.closed for x in opened] == [True] + [False] * (len(paths) - 1)
+    
+    # Editing a file closes its old handle
+    stat = paths[-1].stat()
+    os.utime(paths[-1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    s1io.load_sheet(str(paths[-1]), "S")
+    assert opened[len(paths) - 1].closed and not opened[-1].closed
+    
+    s1io.clear_workbook_cache()
+    assert all(x.closed for x in opened)
+
+
+@pytest.mark.parametrize("engine", ["openpyxl", "xlsxwriter"])
+def test_write_outputs_writes_only_non_empty_tables(tmp_path, monkeypatch, engine):
+    if engine == "xlsxwriter":
+        pytest.importorskip("xlsxwriter")
+    monkeypatch.setattr(s1io, "EXCEL_WRITE_ENGINE", engine)
+    tables = {"mixed": _mixed_table(), "empty": pd.DataFrame(), "missing": None,
+              "counts": pd.DataFrame({"v": range(5)})}
+    
+    paths = s1io.write_outputs(str(tmp_path / "full"), tables, write_parquet=False)
+    assert sorted(p.name for p in (tmp_path / "full" / "tables").iterdir()) == ["counts.csv", "mixed.csv"]
+    assert {k for k in paths if k.startswith("csv_")} == {"csv_mixed", "csv_counts"}
+    assert pd.ExcelFile(paths["xlsx"]).sheet_names == ["mixed", "counts"]
+    
+    paths = s1io.write_outputs(str(tmp_path / "none"), {"empty": pd.DataFrame()}, write_parquet=False)
+    assert list((tmp_path / "none" / "tables").iterdir()) == []
+    assert pd.ExcelFile(paths["xlsx"]).sheet_names == ["README"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""Storylines 2-5: load_tables(sheets=...) must match reading the file and leave the dict untouched."""
+import importlib
+import sys
+
+for n in (2, 3, 4, 5):
+    sys.path.insert(0, f"storyline{n}_pipeline")
+
+import pandas as pd
+import pytest
+
+WORKBOOK = "FINAL_ECO_EPG_analysis_ready.xlsx"
+
+
+@pytest.mark.parametrize("sid", [2, 3, 4, 5])
+def test_preloaded_sheets_are_not_mutated(sid):
+    io_mod = importlib.import_module(f"storyline{sid}.io")
+    sheets = pd.read_excel(WORKBOOK, sheet_name=None)
+    # Headers as typed in the field templates; load_sheet normalises them
+    for df in sheets.values():
+        df.columns = [f" {str(c).upper()}" for c in df.columns]
+    headers = {name: list(df.columns) for name, df in sheets.items()}
+
+    from_dict, _ = io_mod.load_tables(WORKBOOK, sheets=sheets)
+    from_file, _ = io_mod.load_tables(WORKBOOK)
+
+    assert {name: list(df.columns) for name, df in sheets.items()} == headers
+    assert list(from_dict) == list(from_file)
+    for name in from_file:
+        pd.testing.assert_frame_equal(from_dict[name], from_file[name])
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))